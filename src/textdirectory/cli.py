@@ -16,10 +16,14 @@ available_transformations = helpers.get_available_transformations()
 @click.version_option(package_name='textdirectory')
 @click.option('--directory', help='The directory containing text files', type=str)
 @click.option('--output_file', help='The file to aggregate to', type=str)
-@click.option('--filetype', help='The file type to look for.', default='txt', type=str)
+@click.option('--filetype', help='The file type(s) to look for (e.g. txt or txt,md).', default='txt', type=str)
 @click.option('--encoding', help='The encoding of the files.', default='utf8', type=str)
 @click.option('--recursive', help='Recursion', type=bool)
 @click.option('--disable_tqdm', help='Disable progress bar', default=False, type=bool)
+@click.option('--jobs', help='The number of parallel workers for loading files', default=1, type=int)
+@click.option('--sample', help='Only load a random sample of this many files', default=None, type=int)
+@click.option('--seed', help='The seed of the sample', default=None, type=int)
+@click.option('--stratify', help='Sample every directory in proportion to its files', default=False, type=bool)
 @click.option('--filters', help=f'The filters you want to apply. Filters: {available_filters}', type=str)
 @click.option(
     '--transformations',
@@ -33,6 +37,10 @@ def main(
     encoding: str,
     recursive: bool,
     disable_tqdm: bool,
+    jobs: int,
+    sample: int | None,
+    seed: int | None,
+    stratify: bool,
     filters: str | None,
     transformations: str | None,
 ) -> int:
@@ -74,8 +82,10 @@ def main(
         disable_tqdm = False
 
     try:
-        td = textdirectory.TextDirectory(directory=directory, encoding=encoding, disable_tqdm=disable_tqdm)
-        td.load_files(recursive=recursive, filetype=filetype)
+        td = textdirectory.TextDirectory(
+            directory=directory, encoding=encoding, disable_tqdm=disable_tqdm, workers=jobs
+        )
+        td.load_files(recursive=recursive, filetype=filetype, sample=sample, seed=seed, stratify=stratify)
     except NotADirectoryError:
         click.echo('The directory could not be found.')
         sys.exit(1)
@@ -0,0 +1,115 @@
+"""Discovery module: finds the text files in a directory."""
+
+import os
+from collections.abc import Iterable, Iterator
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import NamedTuple
+
+from textdirectory.metadataindex import FileSignature
+
+
+class DiscoveredFile(NamedTuple):
+    """A file found during discovery, with the stat data collected on the way."""
+
+    path: Path
+    signature: FileSignature
+
+
+def parse_filetypes(filetype: str | Iterable[str]) -> list[str]:
+    """
+    :param filetype: one or more filetypes (e.g. txt, 'txt,md' or ['txt', 'md']); '*' matches any extension
+    :type filetype: str
+    :return: a list of extensions without leading dots
+    :type return: list
+    """
+
+    if isinstance(filetype, str):
+        filetype = filetype.split(',')
+
+    return [extension.strip().lstrip('.') for extension in filetype if extension.strip()]
+
+
+def _matches_any(name: str, relative_path: str, patterns: Iterable[str]) -> bool:
+    """Whether a name or a relative path matches any of the glob patterns."""
+    return any(fnmatch(name, pattern) or fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def discover_files(
+    directory: str | Path,
+    recursive: bool = True,
+    filetype: str | Iterable[str] = 'txt',
+    include: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+    min_size: int | None = None,
+    max_size: int | None = None,
+) -> Iterator[DiscoveredFile]:
+    """
+    Walk a directory with os.scandir and yield matching files as they are found.
+
+    Glob patterns are matched against the name and the path relative to the directory. Directories matching an
+    exclude pattern are pruned, i.e. they are never entered. Symlinked directories are not followed.
+
+    :param directory: the directory to search
+    :type directory: str
+    :param recursive: recursive search
+    :type recursive: bool
+    :param filetype: one or more filetypes to look for (e.g. txt or ['txt', 'md']); '*' matches any extension
+    :type filetype: str
+    :param include: glob patterns; if given, files need to match one of them
+    :type include: list
+    :param exclude: glob patterns for files and directories to skip
+    :type exclude: list
+    :param min_size: the minimum size of a file in bytes
+    :type min_size: int
+    :param max_size: the maximum size of a file in bytes
+    :type max_size: int
+    :return: an iterator over the discovered files (in directory order, not sorted)
+    :type return: iterator
+    """
+
+    extensions = parse_filetypes(filetype)
+    name_patterns = ['*.*' if extension == '*' else f'*.{extension}' for extension in extensions]
+    include = list(include) if include else []
+    exclude = list(exclude) if exclude else []
+
+    # (directory, its path relative to the root) pairs still to be walked
+    pending = [(str(directory), '')]
+
+    while pending:
+        current, relative_directory = pending.pop()
+
+        with os.scandir(current) as entries:
+            for entry in entries:
+                relative_path = f'{relative_directory}{entry.name}'
+
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not _matches_any(entry.name, relative_path, exclude):
+                        pending.append((entry.path, f'{relative_path}/'))
+                    continue
+
+                if not any(fnmatch(entry.name, pattern) for pattern in name_patterns):
+                    continue
+
+                if exclude and _matches_any(entry.name, relative_path, exclude):
+                    continue
+
+                if include and not _matches_any(entry.name, relative_path, include):
+                    continue
+
+                try:
+                    if not entry.is_file():
+                        continue
+                    # Cached by the DirEntry, so that size filters need no second os.stat
+                    stat = entry.stat()
+                except OSError:
+                    # Broken symlinks and files removed during the walk
+                    continue
+
+                if min_size is not None and stat.st_size < min_size:
+                    continue
+
+                if max_size is not None and stat.st_size > max_size:
+                    continue
+
+                yield DiscoveredFile(Path(entry.path), FileSignature(stat.st_size, stat.st_mtime_ns, stat.st_ino))
@@ -0,0 +1,184 @@
+"""Engine module: a pipeline that reads, transforms, and writes items in overlapping stages."""
+
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from queue import Empty, Full, Queue
+from typing import Any, NamedTuple
+
+from textdirectory.helpers import POOLS
+
+# The number of items each stage may hold; together with the items being transformed, this bounds the memory
+DEFAULT_QUEUE_SIZE = 16
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+class _Failure(NamedTuple):
+    """An exception raised in the reader thread, passed on to the pipeline."""
+
+    exception: BaseException
+
+
+def _put(queue: 'Queue[Any]', value: Any, stop: threading.Event) -> bool:
+    """Put a value on a bounded queue, giving up once the pipeline stops; whether the value was put."""
+    while not stop.is_set():
+        try:
+            queue.put(value, timeout=_POLL_INTERVAL)
+            return True
+        except Full:
+            continue
+
+    return False
+
+
+def _get(queue: 'Queue[Any]', stop: threading.Event) -> Any:
+    """Get a value from a queue, returning _DONE once the pipeline stops."""
+    while not stop.is_set():
+        try:
+            return queue.get(timeout=_POLL_INTERVAL)
+        except Empty:
+            continue
+
+    return _DONE
+
+
+def _read(items: Iterable[Any], read: Callable[[Any], Any] | None, queue: 'Queue[Any]', stop: threading.Event) -> None:
+    """The reader stage: read every item and queue (item, data) pairs."""
+    try:
+        for item in items:
+            if not _put(queue, (item, item if read is None else read(item)), stop):
+                return
+    except BaseException as exception:
+        _put(queue, _Failure(exception), stop)
+    else:
+        _put(queue, _DONE, stop)
+
+
+def _write(
+    queue: 'Queue[Any]', write: Callable[[Any, Any], None], stop: threading.Event, errors: list[BaseException]
+) -> None:
+    """The writer stage: write (item, result) pairs until the pipeline is done."""
+    try:
+        while (value := _get(queue, stop)) is not _DONE:
+            write(*value)
+    except BaseException as exception:
+        errors.append(exception)
+        stop.set()
+
+
+def _iter_read(queue: 'Queue[Any]', stop: threading.Event) -> Iterator[tuple[Any, Any]]:
+    """The (item, data) pairs of the reader stage, re-raising its exceptions."""
+    while (value := _get(queue, stop)) is not _DONE:
+        if isinstance(value, _Failure):
+            raise value.exception
+        yield value
+
+
+def _iter_transformed(
+    pairs: Iterable[tuple[Any, Any]],
+    transform: Callable[[Any], Any],
+    workers: int,
+    ordered: bool,
+    queue_size: int,
+    pool: str,
+) -> Iterator[tuple[Any, Any]]:
+    """The transformation stage: (item, result) pairs, in the order of the items if ordered."""
+    if workers <= 1:
+        for item, data in pairs:
+            yield item, transform(data)
+        return
+
+    executor = POOLS[pool](max_workers=workers)
+    # Futures in the order they were submitted (dicts keep their insertion order)
+    pending: dict[Future[Any], Any] = {}
+
+    try:
+        for item, data in pairs:
+            pending[executor.submit(transform, data)] = item
+            if len(pending) >= queue_size:
+                yield from _pop_finished(pending, ordered)
+
+        while pending:
+            yield from _pop_finished(pending, ordered)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _pop_finished(pending: dict['Future[Any]', Any], ordered: bool) -> Iterator[tuple[Any, Any]]:
+    """Wait for the first submitted (if ordered) or any finished future(s), and remove them from pending."""
+    if ordered:
+        future = next(iter(pending))
+        yield pending.pop(future), future.result()
+        return
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield pending.pop(future), future.result()
+
+
+def run_pipeline(
+    items: Iterable[Any],
+    read: Callable[[Any], Any] | None,
+    transform: Callable[[Any], Any],
+    write: Callable[[Any, Any], None],
+    workers: int = 1,
+    ordered: bool = True,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    pool: str = 'thread',
+) -> None:
+    """
+    Read, transform, and write items in three overlapping stages. A reader thread reads the items ahead, a pool of
+    workers transforms them, and a writer thread writes the results; the stages are connected by bounded queues, so
+    that at most about three times queue_size items are held at once. The first exception of any stage stops the
+    pipeline and is raised.
+
+    :param items: the items to process (e.g. file records)
+    :type items: iterable
+    :param read: reads an item (e.g. the text of a file); called in the reader thread. If None, the items are
+        transformed as they are (the items are always iterated in the reader thread)
+    :type read: callable
+    :param transform: transforms what was read; it has to be picklable (module-level) for a process pool
+    :type transform: callable
+    :param write: called with every item and its result in the writer thread
+    :type write: callable
+    :param workers: the number of transformation workers; 1 transforms in the calling thread
+    :type workers: int
+    :param ordered: write the results in the order of the items; otherwise as soon as they are ready
+    :type ordered: bool
+    :param queue_size: the number of items each stage may hold
+    :type queue_size: int
+    :param pool: [process, thread] the kind of pool of the transformation workers
+    :type pool: str
+    """
+
+    if pool not in POOLS:
+        raise ValueError(f'Unknown pool {pool!r}; expected one of {list(POOLS)}.')
+
+    if queue_size < 1:
+        raise ValueError(f'The queues need room for at least one item, not {queue_size}.')
+
+    stop = threading.Event()
+    read_queue: Queue[Any] = Queue(maxsize=queue_size)
+    write_queue: Queue[Any] = Queue(maxsize=queue_size)
+    errors: list[BaseException] = []
+
+    reader = threading.Thread(target=_read, args=(items, read, read_queue, stop), daemon=True)
+    writer = threading.Thread(target=_write, args=(write_queue, write, stop, errors), daemon=True)
+    reader.start()
+    writer.start()
+
+    try:
+        for result in _iter_transformed(_iter_read(read_queue, stop), transform, workers, ordered, queue_size, pool):
+            if not _put(write_queue, result, stop):
+                break
+        _put(write_queue, _DONE, stop)
+        writer.join()
+    finally:
+        stop.set()
+        reader.join()
+        writer.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,356 @@
+"""File table module: a columnar store for the file records of a TextDirectory."""
+
+import copy
+import operator
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sequence
+from itertools import compress, repeat
+from pathlib import Path
+from typing import Any, overload
+
+from textdirectory.metadataindex import FileSignature
+from textdirectory.textstore import TextStore
+
+# Metadata stored in integer columns; -1 marks a value that has not been collected (False in a record)
+INTEGER_FIELDS = ('characters', 'tokens', 'types', 'size', 'lines')
+# Keys derived from the signature of a file (taken when it was discovered); they cannot be set
+SIGNATURE_KEYS = ('mtime',)
+HASH_SIZE = 16
+_NO_HASH = bytes(HASH_SIZE)
+# Shown instead of a transformed text that is not in memory, so that displaying a record does not read it back
+SPILLED_TEXT = '<spilled to disk>'
+
+
+class FileRecord(MutableMapping[str, Any]):
+    """A dict-like view on one row of a FileTable.
+
+    Reading and writing keys reads and writes the columns of the table, so records behave like the plain dicts
+    used before. Copies (copy.copy, copy.deepcopy, dict(record)) are plain dicts. Comparisons look at the
+    transformed text last, so that a spilled text is only read back when everything else is equal.
+    """
+
+    __slots__ = ('table', 'file_id')
+
+    def __init__(self, table: 'FileTable', file_id: int) -> None:
+        self.table = table
+        self.file_id = file_id
+
+    def __getitem__(self, key: str) -> Any:
+        return self.table.get_value(self.file_id, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.table.set_value(self.file_id, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError('Keys cannot be removed from a file record.')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.keys())
+
+    def __len__(self) -> int:
+        return len(self.table.keys())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FileRecord) and other.table is self.table and other.file_id == self.file_id:
+            return True
+
+        if not isinstance(other, Mapping):
+            return NotImplemented
+
+        # keys() ends with transformed_text, so that all() stops before reading it back for a different record
+        keys = self.table.keys()
+        return len(keys) == len(other) and all(key in other and self[key] == other[key] for key in keys)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict(load_spilled=False))
+
+    def to_dict(self, load_spilled: bool = True) -> dict[str, Any]:
+        """
+        :param load_spilled: read a transformed text that was spilled to disk back; otherwise it is shown as
+            SPILLED_TEXT (e.g. to print the record)
+        :type load_spilled: bool
+        :return: the record as a plain dict
+        :type return: dict
+        """
+
+        record = {key: self[key] for key in self.table.keys() if key != 'transformed_text'}
+        texts = self.table.texts
+        if load_spilled or self.file_id not in texts:
+            record['transformed_text'] = self['transformed_text']
+        else:
+            text = texts.peek(self.file_id)
+            record['transformed_text'] = SPILLED_TEXT if text is None else text
+
+        return record
+
+    def __copy__(self) -> dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict[str, Any]:
+        return copy.deepcopy(dict(self), memo)
+
+
+class FileTable:
+    """Column-oriented file records.
+
+    Paths are split into a shared directory (stored once per directory) and a filename; integer metadata and
+    signatures live in arrays; content hashes are stored as raw bytes. Indexing the table returns a FileRecord.
+    The modification time of a record (mtime, in seconds) is read from its signature. Transformed texts are kept in
+    a TextStore, which can hold them within a memory budget.
+    """
+
+    def __init__(self, texts: TextStore | None = None) -> None:
+        """
+        :param texts: the store of the transformed texts (default: a store without a memory budget)
+        :type texts: TextStore
+        """
+
+        self.directories: list[str] = []
+        self._directory_ids: dict[str, int] = {}
+        self.parents = array('I')
+        self.names: list[str] = []
+        self.integers: dict[str, array[int]] = {field: array('q') for field in INTEGER_FIELDS}
+        self.hashes = bytearray()
+        self.signatures: dict[str, array[int]] = {field: array('q') for field in FileSignature._fields}
+        self.extras: dict[str, list[Any]] = {}
+        self.texts = TextStore() if texts is None else texts
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @overload
+    def __getitem__(self, file_id: int) -> FileRecord: ...
+
+    @overload
+    def __getitem__(self, file_id: slice) -> list[FileRecord]: ...
+
+    def __getitem__(self, file_id: int | slice) -> FileRecord | list[FileRecord]:
+        # Slices return a list of records, as slicing the former list of dicts did
+        if isinstance(file_id, slice):
+            return [FileRecord(self, i) for i in range(len(self))[file_id]]
+
+        if file_id < 0:
+            file_id += len(self)
+
+        if not 0 <= file_id < len(self):
+            raise IndexError('file id out of range')
+
+        return FileRecord(self, file_id)
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        for file_id in range(len(self)):
+            yield FileRecord(self, file_id)
+
+    def __eq__(self, other: object) -> bool:
+        if other is self:
+            return True
+
+        if isinstance(other, (FileTable, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other, strict=True))
+
+        return NotImplemented
+
+    def keys(self) -> list[str]:
+        """
+        :return: the keys of every record, in the order of the former dict records
+        :type return: list
+        """
+        return ['path', 'filename', *INTEGER_FIELDS, 'hash', *SIGNATURE_KEYS, *self.extras, 'transformed_text']
+
+    def append(self, record: Mapping[str, Any], signature: FileSignature | None = None) -> int:
+        """
+        :param record: the record to add; it needs at least a path
+        :type record: dict
+        :param signature: the signature of the file
+        :type signature: FileSignature
+        :return: the id of the new record
+        :type return: int
+        """
+
+        file_id = len(self)
+        path = Path(record['path'])
+
+        directory = str(path.parent)
+        if directory not in self._directory_ids:
+            self._directory_ids[directory] = len(self.directories)
+            self.directories.append(directory)
+
+        self.parents.append(self._directory_ids[directory])
+        self.names.append(path.name)
+
+        for column in self.integers.values():
+            column.append(-1)
+        self.hashes += _NO_HASH
+        for extra in self.extras.values():
+            extra.append(False)
+
+        for field, value in zip(FileSignature._fields, signature or (-1, -1, -1), strict=True):
+            self.signatures[field].append(value)
+
+        for key, value in record.items():
+            if key not in ('path', 'filename', *SIGNATURE_KEYS):
+                self.set_value(file_id, key, value)
+
+        return file_id
+
+    def get_value(self, file_id: int, key: str) -> Any:
+        """
+        :param file_id: the id of the record
+        :type file_id: int
+        :param key: the key of the value
+        :type key: str
+        :return: the value
+        """
+
+        if key == 'path':
+            return Path(self.directories[self.parents[file_id]], self.names[file_id])
+        if key == 'filename':
+            return self.names[file_id]
+        if key in self.integers:
+            value = self.integers[key][file_id]
+            return False if value == -1 else value
+        if key == 'hash':
+            digest = bytes(self.hashes[file_id * HASH_SIZE : (file_id + 1) * HASH_SIZE])
+            return False if digest == _NO_HASH else digest.hex()
+        if key == 'mtime':
+            mtime_ns = self.signatures['mtime_ns'][file_id]
+            return False if mtime_ns == -1 else mtime_ns / 1e9
+        if key == 'transformed_text':
+            return self.texts.get(file_id) if file_id in self.texts else False
+        if key in self.extras:
+            return self.extras[key][file_id]
+
+        raise KeyError(key)
+
+    def set_value(self, file_id: int, key: str, value: Any) -> None:
+        """
+        :param file_id: the id of the record
+        :type file_id: int
+        :param key: the key of the value; unknown keys add a column
+        :type key: str
+        :param value: the value
+        """
+
+        if key in ('path', 'filename'):
+            raise TypeError(f'{key!r} cannot be changed; it identifies the file.')
+        elif key in SIGNATURE_KEYS:
+            raise TypeError(f'{key!r} cannot be changed; it is part of the signature of the file.')
+        elif key in self.integers:
+            if value is not False and (not isinstance(value, int) or isinstance(value, bool)):
+                raise TypeError(f'{key!r} is an integer column; it cannot hold {value!r}.')
+            self.integers[key][file_id] = -1 if value is False else value
+        elif key == 'hash':
+            digest = _NO_HASH if value is False else bytes.fromhex(value)
+            if len(digest) != HASH_SIZE:
+                raise ValueError(f'A hash has {HASH_SIZE} bytes, not {len(digest)}: {value!r}')
+            self.hashes[file_id * HASH_SIZE : (file_id + 1) * HASH_SIZE] = digest
+        elif key == 'transformed_text':
+            if value is False:
+                self.texts.discard(file_id)
+            else:
+                self.texts.set(file_id, value)
+        else:
+            if key not in self.extras:
+                self.extras[key] = [False] * len(self)
+            self.extras[key][file_id] = value
+
+    def get_signature(self, file_id: int) -> FileSignature:
+        """
+        :param file_id: the id of the record
+        :type file_id: int
+        :return: the signature the file had when its metadata was collected
+        :type return: FileSignature
+        """
+        return FileSignature(*(self.signatures[field][file_id] for field in FileSignature._fields))
+
+    def set_signature(self, file_id: int, signature: FileSignature) -> None:
+        """
+        :param file_id: the id of the record
+        :type file_id: int
+        :param signature: the new signature of the file
+        :type signature: FileSignature
+        """
+        for field, value in zip(FileSignature._fields, signature, strict=True):
+            self.signatures[field][file_id] = value
+
+    def index(self, record: Mapping[str, Any]) -> int:
+        """
+        :param record: a record or an equal dict
+        :type record: dict
+        :return: the id of the record
+        :type return: int
+        """
+
+        if isinstance(record, FileRecord) and record.table is self:
+            return record.file_id
+
+        for file_id, own_record in enumerate(self):
+            if own_record == record:
+                return file_id
+
+        raise ValueError('The record is not in the file table.')
+
+    def get_column(self, key: str) -> Sequence[Any]:
+        """
+        :param key: an integer column, a signature field, or an extra column
+        :type key: str
+        :return: the raw column, indexed by file id (missing integers are -1, missing extras False)
+        :type return: sequence
+        """
+
+        if key in self.integers:
+            return self.integers[key]
+        if key in self.signatures:
+            return self.signatures[key]
+        if key in self.extras:
+            return self.extras[key]
+
+        raise KeyError(key)
+
+    def select(
+        self, file_ids: Iterable[int], key: str, minimum: float | None = None, maximum: float | None = None
+    ) -> list[int]:
+        """
+        Select the file ids whose integer column (or signature field) value lies within the (inclusive) bounds.
+
+        The comparison runs as a chain of C-level map/compress calls over the column, without a Python loop.
+
+        :param file_ids: the ids to select from (e.g. an aggregation); their order is kept
+        :type file_ids: iterable
+        :param key: an integer column (characters, tokens, types, size, lines), a signature field (mtime_ns, inode), or an
+            extra column of numbers
+        :type key: str
+        :param minimum: the smallest value to keep
+        :type minimum: float
+        :param maximum: the largest value to keep
+        :type maximum: float
+        :return: the selected ids
+        :type return: list
+        """
+
+        column = self.get_column(key)
+        selected = list(file_ids)
+
+        if minimum is not None:
+            selected = list(compress(selected, map(operator.le, repeat(minimum), map(column.__getitem__, selected))))
+
+        if maximum is not None:
+            selected = list(compress(selected, map(operator.ge, repeat(maximum), map(column.__getitem__, selected))))
+
+        return selected
+
+    def nbytes(self) -> int:
+        """
+        :return: the approximate memory used by the columns (excluding transformed texts and extras)
+        :type return: int
+        """
+
+        columns = [self.parents, *self.integers.values(), *self.signatures.values()]
+        return (
+            sum(column.itemsize * len(column) for column in columns)
+            + len(self.hashes)
+            + sum(len(name) for name in self.names)
+            + sum(len(directory) for directory in self.directories)
+        )
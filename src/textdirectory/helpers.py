@@ -1,11 +1,30 @@
 """Helpers module."""
 
 import copy
+import heapq
+import math
+import operator
+import random
 import re
-from collections import Counter
-from collections.abc import Callable
+import statistics
+from collections import Counter, deque
+from collections.abc import Callable, Hashable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
 from typing import Any
 
+POOLS: dict[str, Callable[..., Executor]] = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}
+
+# Filter cost classes, cheapest first; filters of the class 'barrier' (e.g. sampling) are never reordered
+FILTER_COSTS = ('filename', 'stat', 'metadata', 'index', 'content', 'similarity')
+
+# Files that are streamed are read this many characters at a time
+FILE_CHUNK_SIZE = 1 << 20
+
+_EXHAUSTED = object()
+
 
 def tabulate_flat_list_of_dicts(list_of_dicts: list[dict[str, Any]], max_length: int = 25) -> str:
     """
@@ -117,6 +136,241 @@ def simple_tokenizer(string: str, regular_expression: str = r'\w+') -> list[str]
     return tokens
 
 
+def count_tokens(string: str, regular_expression: str = r'\w+') -> int:
+    """
+    :param string: a string
+    :type string: str
+    :param regular_expression: the pattern a token has to match
+    :type regular_expression: str
+    :return: the number of tokens simple_tokenizer would return, without building the list
+    :type return: int
+    """
+
+    if not regular_expression:
+        return string.count(' ') + 1
+
+    return sum(1 for _ in re.finditer(regular_expression, string))
+
+
+def parallel_map(
+    function: Callable[[Any], Any],
+    items: Iterable[Any],
+    workers: int = 1,
+    pool: str = 'process',
+    chunksize: int | None = None,
+) -> Iterator[Any]:
+    """
+    Map a function over items in a process or thread pool, yielding the results in the order of the items.
+
+    :param function: the function to apply; it has to be picklable (module-level) for a process pool
+    :type function: callable
+    :param items: the items to process
+    :type items: iterable
+    :param workers: the number of workers; 1 maps serially without a pool
+    :type workers: int
+    :param pool: [process, thread] the kind of pool to use
+    :type pool: str
+    :param chunksize: the number of items sent to a process at once; estimated if not given
+    :type chunksize: int
+    :return: an iterator over the results
+    :type return: iterator
+    """
+
+    if pool not in POOLS:
+        raise ValueError(f'Unknown pool {pool!r}; expected one of {list(POOLS)}.')
+
+    if workers <= 1:
+        return map(function, items)
+
+    items = list(items)
+
+    if chunksize is None:
+        # Several chunks per worker balance the load; batching keeps the IPC overhead low for tiny files
+        chunksize = max(1, min(1024, len(items) // (workers * 4)))
+
+    return _pool_map(POOLS[pool], function, items, workers, chunksize)
+
+
+def _pool_map(
+    executor_class: Callable[..., Executor],
+    function: Callable[[Any], Any],
+    items: list[Any],
+    workers: int,
+    chunksize: int,
+) -> Iterator[Any]:
+    """Run Executor.map inside a generator, so that the pool lives as long as the results are consumed."""
+    with executor_class(max_workers=workers) as executor:
+        yield from executor.map(function, items, chunksize=chunksize)
+
+
+def iter_file_chunks(
+    path: str | Path, encoding: str = 'utf8', chunk_size: int = FILE_CHUNK_SIZE, max_chunk_size: int | None = None
+) -> Iterator[str]:
+    """
+    Like chunk_text, but for files of any size: the file is read chunk_size characters at a time, and every chunk
+    ends after its last line break (or, in a chunk without line breaks, after its last space or tab), so that
+    neither lines nor words are split. A read without any of them is carried over and joined with the next one.
+    Joining the chunks gives the text of the file.
+
+    :param path: path to a textfile
+    :type path: str
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :param chunk_size: the number of characters read at once
+    :type chunk_size: int
+    :param max_chunk_size: the longest chunk to build while looking for whitespace (default: 64 * chunk_size); a
+        longer run of characters without whitespace raises a ValueError
+    :type max_chunk_size: int
+    :return: an iterator over the chunks
+    :type return: iterator
+    """
+
+    if max_chunk_size is None:
+        max_chunk_size = 64 * chunk_size
+
+    carry = ''
+
+    with open(path, encoding=encoding, errors='ignore') as f:
+        while chunk := f.read(chunk_size):
+            text = carry + chunk
+            cut = text.rfind('\n') + 1 or max(text.rfind(' '), text.rfind('\t')) + 1
+            carry = text[cut:]
+
+            if len(carry) > max_chunk_size:
+                raise ValueError(
+                    f'{path} has more than {max_chunk_size} characters without whitespace; it cannot be split safely.'
+                )
+
+            if cut:
+                yield text[:cut]
+
+    if carry:
+        yield carry
+
+
+def reservoir_sample(items: Iterable[Any], k: int, rng: random.Random | None = None) -> list[Any]:
+    """
+    Draw a uniform sample without replacement from an iterable of unknown length in a single pass, keeping only k
+    items in memory. Instead of drawing a random number per item, the number of items to skip until the next
+    replacement is drawn (Li's Algorithm L), so that long streams are mostly skipped over.
+
+    :param items: the items to sample from
+    :type items: iterable
+    :param k: the size of the sample; all items are returned if there are fewer
+    :type k: int
+    :param rng: the random number generator (default: a new one)
+    :type rng: random.Random
+    :return: the sample (in no particular order)
+    :type return: list
+    """
+
+    if rng is None:
+        rng = random.Random()
+
+    iterator = iter(items)
+    reservoir = list(islice(iterator, k))
+    if len(reservoir) < k or k <= 0:
+        return reservoir
+
+    # 1 - random() lies in (0, 1], so that its logarithm is defined
+    weight = math.exp(math.log(1.0 - rng.random()) / k)
+    while weight < 1.0:
+        skip = int(math.log(1.0 - rng.random()) / math.log(1.0 - weight))
+        item = next(islice(iterator, skip, None), _EXHAUSTED)
+        if item is _EXHAUSTED:
+            break
+        reservoir[rng.randrange(k)] = item
+        weight *= math.exp(math.log(1.0 - rng.random()) / k)
+
+    return reservoir
+
+
+def stratified_sample(
+    items: Iterable[Any],
+    k: int,
+    key: Callable[[Any], Hashable],
+    rng: random.Random | None = None,
+    budget: int | None = None,
+) -> list[Any]:
+    """
+    Draw a stratified sample from an iterable of unknown length in a single pass. Every item gets a random key, and
+    only the items whose key lies below a threshold are kept; whenever more than budget items are kept, the threshold
+    is lowered so that half of them remain. Memory is thus bounded by budget items (and a counter per stratum),
+    however many strata there are. The kept items of a stratum are a uniform sample of it. Once the sizes of the
+    strata are known, the sample is allocated to them in proportion to their sizes (largest remainder) and filled
+    with the items with the smallest keys. A stratum with fewer kept items than its share, which is only likely for
+    shares of about one item, passes the rest on to the strata with the next largest remainders.
+
+    :param items: the items to sample from
+    :type items: iterable
+    :param k: the size of the sample; all items are returned if there are fewer
+    :type k: int
+    :param key: a function returning the stratum of an item (e.g. its directory)
+    :type key: callable
+    :param rng: the random number generator (default: a new one)
+    :type rng: random.Random
+    :param budget: the number of items kept while sampling (default and minimum: 10 * k)
+    :type budget: int
+    :return: the sample, grouped by stratum in the order the strata were first seen
+    :type return: list
+    """
+
+    if rng is None:
+        rng = random.Random()
+
+    if k <= 0:
+        return []
+
+    budget = max(budget or 0, 10 * k)
+    threshold = 1.0
+    kept: dict[Hashable, list[tuple[float, Any]]] = {}
+    kept_count = 0
+    counts: Counter[Hashable] = Counter()
+
+    for item in items:
+        stratum = key(item)
+        counts[stratum] += 1
+        random_key = rng.random()
+        if random_key >= threshold:
+            continue
+
+        kept.setdefault(stratum, []).append((random_key, item))
+        kept_count += 1
+        if kept_count > budget:
+            keys = (random_key for entries in kept.values() for random_key, _ in entries)
+            threshold = heapq.nsmallest(budget // 2 + 1, keys)[-1]
+            kept = {
+                stratum: below
+                for stratum, entries in kept.items()
+                if (below := [entry for entry in entries if entry[0] < threshold])
+            }
+            kept_count = sum(map(len, kept.values()))
+
+    total = sum(counts.values())
+    if total <= k:
+        return [item for stratum in counts for _, item in kept[stratum]]
+
+    available = {stratum: len(kept.get(stratum, ())) for stratum in counts}
+    quotas = {stratum: k * count / total for stratum, count in counts.items()}
+    allocation = {stratum: min(int(quota), available[stratum]) for stratum, quota in quotas.items()}
+    by_remainder = sorted(quotas, key=lambda stratum: quotas[stratum] - int(quotas[stratum]), reverse=True)
+
+    # At least k items are kept, so every pass hands out at least one of the missing places
+    missing = k - sum(allocation.values())
+    while missing:
+        for stratum in by_remainder:
+            if missing and allocation[stratum] < available[stratum]:
+                allocation[stratum] += 1
+                missing -= 1
+
+    return [
+        item
+        for stratum in counts
+        if allocation[stratum]
+        for _, item in heapq.nsmallest(allocation[stratum], kept[stratum], key=operator.itemgetter(0))
+    ]
+
+
 def estimate_spacy_max_length(override: float | bool = False, tokenizer_only: bool = False) -> float:
     """Returns a somewhat sensible suggestions for max_length."""
     if override:
@@ -142,11 +396,28 @@ def estimate_spacy_max_length(override: float | bool = False, tokenizer_only: bo
     return estimated_max_length
 
 
+def count_types_and_tokens(string: str, regular_expression: str = r'\w+') -> tuple[int, int]:
+    """
+    :param string: a string
+    :type string: str
+    :param regular_expression: the token pattern
+    :type regular_expression: str
+    :return: the number of types (distinct tokens) and of tokens; no token list is built
+    :type return: tuple
+    """
+
+    types: set[str] = set()
+    tokens = 0
+    for match in re.finditer(regular_expression, string):
+        types.add(match.group())
+        tokens += 1
+
+    return len(types), tokens
+
+
 def type_token_ratio(text: str) -> float:
     """Returns a simple rounded type-token ratio of a text."""
-    tokens = simple_tokenizer(text)
-    no_types = len(Counter(tokens))
-    no_tokens = len(tokens)
+    no_types, no_tokens = count_types_and_tokens(text)
 
     if no_tokens == 0:
         return 0.0
@@ -154,6 +425,129 @@ def type_token_ratio(text: str) -> float:
     return round(no_types / no_tokens, 2)
 
 
+def moving_average_type_token_ratio(tokens: Iterable[str], window: int = 500) -> float:
+    """
+    The moving-average type-token ratio (MATTR): the mean type-token ratio of all windows of window tokens. Unlike
+    the plain ratio, it does not fall as texts get longer. The tokens are streamed; only one window is kept.
+
+    :param tokens: the tokens of a text
+    :type tokens: iterable
+    :param window: the number of tokens per window
+    :type window: int
+    :return: the MATTR; texts shorter than a window get their plain type-token ratio (0.0 without tokens)
+    :type return: float
+    """
+
+    if window < 1:
+        raise ValueError(f'The window needs at least one token, not {window}.')
+
+    current: deque[str] = deque()
+    counts: Counter[str] = Counter()
+    ratio_sum = 0.0
+    windows = 0
+
+    for token in tokens:
+        current.append(token)
+        counts[token] += 1
+
+        if len(current) > window:
+            dropped = current.popleft()
+            counts[dropped] -= 1
+            if not counts[dropped]:
+                del counts[dropped]
+
+        if len(current) == window:
+            ratio_sum += len(counts) / window
+            windows += 1
+
+    if windows:
+        return ratio_sum / windows
+
+    return len(counts) / len(current) if current else 0.0
+
+
+def iter_file_tokens(
+    path: str | Path, encoding: str = 'utf8', chunk_size: int = FILE_CHUNK_SIZE, regular_expression: str = r'\w+'
+) -> Iterator[str]:
+    """
+    :param path: path to a textfile
+    :type path: str
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :param chunk_size: the number of characters read at once
+    :type chunk_size: int
+    :param regular_expression: the token pattern
+    :type regular_expression: str
+    :return: an iterator over the tokens of the file, read in chunks so that long files need not fit in memory
+    :type return: iterator
+    """
+
+    pattern = re.compile(regular_expression)
+    carry = ''
+
+    with open(path, encoding=encoding, errors='ignore') as f:
+        while chunk := f.read(chunk_size):
+            text = carry + chunk
+            carry = ''
+            for match in pattern.finditer(text):
+                # A token at the end of the chunk might continue in the next one
+                if match.end() == len(text):
+                    carry = match.group()
+                    break
+                yield match.group()
+
+    if carry:
+        yield carry
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """
+    :param sorted_values: values in ascending order
+    :type sorted_values: list
+    :param p: the percentile (0 to 100)
+    :type p: float
+    :return: the percentile, interpolated linearly between the closest values (as numpy.percentile does)
+    :type return: float
+    """
+
+    if not sorted_values:
+        raise statistics.StatisticsError('percentile requires at least one data point')
+
+    if not 0 <= p <= 100:
+        raise ValueError(f'The percentile needs to lie between 0 and 100, not {p}.')
+
+    position = p / 100 * (len(sorted_values) - 1)
+    below = int(position)
+    above = min(below + 1, len(sorted_values) - 1)
+
+    return sorted_values[below] + (sorted_values[above] - sorted_values[below]) * (position - below)
+
+
+def outlier_bounds(values: Sequence[float], threshold: float = 3.0, method: str = 'mad') -> tuple[float, ...]:
+    """
+    :param values: the values
+    :type values: list
+    :param threshold: how many spreads a value may lie from the center
+    :type threshold: float
+    :param method: [sigma, mad] mean and standard deviation, or median and median absolute deviation (scaled by
+        1.4826, so that it estimates the standard deviation of normally distributed values)
+    :type method: str
+    :return: the center, the spread, and the lowest and highest value that are not outliers
+    :type return: tuple
+    """
+
+    if method == 'sigma':
+        center = statistics.fmean(values)
+        spread = statistics.pstdev(values, center)
+    elif method == 'mad':
+        center = statistics.median(values)
+        spread = 1.4826 * statistics.median([abs(value - center) for value in values])
+    else:
+        raise ValueError(f'Unknown method {method!r}; expected sigma or mad.')
+
+    return center, spread, center - threshold * spread, center + threshold * spread
+
+
 def get_human_from_docstring(doc: str) -> dict[str, str]:
     """
     :param doc: if True, also return the 'human name'
@@ -214,6 +608,103 @@ def coerce_args_by_signature(func: Callable[..., Any], args: list[Any]) -> list[
     return coerced
 
 
+def get_filter_cost(filter_name: str) -> str:
+    """
+    :param filter_name: the name of a filter
+    :type filter_name: str
+    :return: the cost class from the filter's docstring (one of FILTER_COSTS, or 'barrier')
+    :type return: str
+    """
+
+    from textdirectory.textdirectory import TextDirectory
+
+    doc = getattr(TextDirectory, filter_name).__doc__ or ''
+    match = re.search(r':cost:\s*(\w+)', doc)
+
+    return match.group(1) if match else 'barrier'
+
+
+def format_size(num_bytes: float) -> str:
+    """
+    :param num_bytes: a number of bytes
+    :type num_bytes: float
+    :return: a human readable size (e.g. 1.5 MB)
+    :type return: str
+    """
+
+    for unit in ('B', 'kB', 'MB', 'GB', 'TB'):
+        if num_bytes < 1024 or unit == 'TB':
+            break
+        num_bytes /= 1024
+
+    return f'{num_bytes:.0f} {unit}' if unit == 'B' else f'{num_bytes:.1f} {unit}'
+
+
+def to_timestamp(value: float | str | datetime) -> float:
+    """
+    :param value: a POSIX timestamp, a datetime, or an ISO 8601 string (e.g. 2024-01-31 or 2024-01-31T12:00)
+    :type value: float
+    :return: the POSIX timestamp; naive datetimes are taken as local time
+    :type return: float
+    """
+
+    if isinstance(value, datetime):
+        return value.timestamp()
+
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value).timestamp()
+
+    return float(value)
+
+
+def to_nanoseconds_bound(seconds: float, upper: bool = False) -> int:
+    """
+    Convert a bound in seconds to integer nanoseconds exactly. Timestamps in nanoseconds (e.g. 1.7e18) have more
+    digits than a float holds, so multiplying the bound by 1e9 would select different values than comparing
+    nanoseconds / 1e9 with it, as file records show modification times.
+
+    :param seconds: a bound in seconds
+    :type seconds: float
+    :param upper: whether it is an upper (inclusive) bound; otherwise a lower (inclusive) one
+    :type upper: bool
+    :return: the smallest (or, for an upper bound, largest) number of nanoseconds n with n / 1e9 within the bound
+    :type return: int
+    """
+
+    # n / 1e9 grows monotonically with n, and the estimate is off by a few hundred nanoseconds at most
+    nanoseconds = int(seconds * 1e9)
+    if upper:
+        while nanoseconds / 1e9 <= seconds:
+            nanoseconds += 1
+        while nanoseconds / 1e9 > seconds:
+            nanoseconds -= 1
+    else:
+        while nanoseconds / 1e9 >= seconds:
+            nanoseconds -= 1
+        while nanoseconds / 1e9 < seconds:
+            nanoseconds += 1
+
+    return nanoseconds
+
+
+def load_keywords(path: str | Path, encoding: str = 'utf8') -> list[str]:
+    """
+    :param path: path to a keyword file with one keyword per line; blank lines and lines starting with # are ignored
+    :type path: str
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :return: the keywords
+    :type return: list
+    """
+
+    with open(path, encoding=encoding) as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith('#')]
+
+
 def get_available_filters(get_human_name: bool = False) -> list[Any]:
     """
     :param get_human_name: if True, also return the 'human name'
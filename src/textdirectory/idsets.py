@@ -0,0 +1,194 @@
+"""Id sets module: compact sets and sequences of file ids."""
+
+import zlib
+from array import array
+from collections.abc import Iterable, Iterator
+from itertools import accumulate
+from typing import overload
+
+# The positions of the set bits of every byte value
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+
+class Bitmap:
+    """An immutable set of file ids, stored as the bits of an integer.
+
+    Set operations (|, &, -) run on whole machine words, so combining the selections of large corpora is cheap.
+    Iterating yields the ids in ascending order.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits: int = 0) -> None:
+        """
+        :param bits: an integer whose set bits are the ids
+        :type bits: int
+        """
+        self.bits = bits
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> 'Bitmap':
+        """
+        :param ids: file ids; duplicates are ignored
+        :type ids: iterable
+        :return: a bitmap of the ids
+        :type return: Bitmap
+        """
+
+        ids = list(ids)
+        if not ids:
+            return cls()
+
+        # Setting bits in a bytearray is linear; or-ing shifted integers would copy the whole integer per id
+        data = bytearray(max(ids) // 8 + 1)
+        for file_id in ids:
+            data[file_id >> 3] |= 1 << (file_id & 7)
+
+        return cls(int.from_bytes(data, 'little'))
+
+    def __iter__(self) -> Iterator[int]:
+        data = self.bits.to_bytes(self.nbytes, 'little')
+        for index, byte in enumerate(data):
+            if byte:
+                base = index * 8
+                for bit in _BYTE_BITS[byte]:
+                    yield base + bit
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __contains__(self, file_id: object) -> bool:
+        return isinstance(file_id, int) and file_id >= 0 and bool(self.bits >> file_id & 1)
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        return Bitmap(self.bits | other.bits)
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        return Bitmap(self.bits & other.bits)
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        return Bitmap(self.bits & ~other.bits)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Bitmap):
+            return self.bits == other.bits
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __repr__(self) -> str:
+        return f'Bitmap({len(self)} ids)'
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes needed to store the bitmap."""
+        return (self.bits.bit_length() + 7) // 8
+
+    def to_list(self) -> list[int]:
+        """
+        :return: the ids in ascending order
+        :type return: list
+        """
+        return list(self)
+
+
+class PackedIds:
+    """An immutable, compressed sequence of file ids, used to store saved aggregation states.
+
+    Ascending ids (the usual case, since filters keep the file order) are stored as the gaps between them, in the
+    smallest array type that fits, and zlib-compressed when that helps; runs of neighbouring files compress to
+    almost nothing. Other sequences (e.g. random samples) are stored as compressed ids. Unpacking only uses C-level
+    operations and is linear in the number of ids. Indexing, slicing, and concatenating (+) behave like a list of
+    the ids and return plain ids and lists.
+    """
+
+    __slots__ = ('count', 'delta', 'typecode', 'compressed', 'data')
+
+    def __init__(self, count: int, delta: bool, typecode: str, compressed: bool, data: bytes) -> None:
+        self.count = count
+        self.delta = delta
+        self.typecode = typecode
+        self.compressed = compressed
+        self.data = data
+
+    @classmethod
+    def pack(cls, ids: Iterable[int]) -> 'PackedIds':
+        """
+        :param ids: file ids, in any order
+        :type ids: iterable
+        :return: the packed ids
+        :type return: PackedIds
+        """
+
+        ids = list(ids)
+        delta = all(a < b for a, b in zip(ids, ids[1:], strict=False))
+        values = [b - a for a, b in zip([0, *ids], ids, strict=False)] if delta else ids
+
+        largest = max(values, default=0)
+        typecode = 'B' if largest < 1 << 8 else 'H' if largest < 1 << 16 else 'I' if largest < 1 << 32 else 'Q'
+        data = array(typecode, values).tobytes()
+
+        compressed_data = zlib.compress(data, 1)
+        if len(compressed_data) < len(data):
+            return cls(len(ids), delta, typecode, True, compressed_data)
+
+        return cls(len(ids), delta, typecode, False, data)
+
+    def to_list(self) -> list[int]:
+        """
+        :return: the ids, in their original order
+        :type return: list
+        """
+
+        values = array(self.typecode)
+        values.frombytes(zlib.decompress(self.data) if self.compressed else self.data)
+
+        if self.delta:
+            return list(accumulate(values))
+
+        return values.tolist()
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_list())
+
+    def __len__(self) -> int:
+        return self.count
+
+    @overload
+    def __getitem__(self, index: int) -> int: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[int]: ...
+
+    def __getitem__(self, index: int | slice) -> int | list[int]:
+        # Indexing and slicing unpack the ids, like the lists stored before
+        return self.to_list()[index]
+
+    def __add__(self, other: Iterable[int]) -> list[int]:
+        return self.to_list() + list(other)
+
+    def __radd__(self, other: Iterable[int]) -> list[int]:
+        return list(other) + self.to_list()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PackedIds):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f'PackedIds({self.count} ids in {self.nbytes} bytes)'
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes the packed ids occupy."""
+        return len(self.data)
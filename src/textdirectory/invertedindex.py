@@ -0,0 +1,278 @@
+"""Inverted index module: a persistent term index for filtering without reading the files."""
+
+import re
+import sqlite3
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable
+from functools import partial, reduce
+from pathlib import Path
+from types import TracebackType
+from typing import NamedTuple
+
+from textdirectory import helpers
+from textdirectory.metadataindex import FileSignature
+
+# Query syntax: parentheses, quoted phrases, and everything else up to whitespace
+_QUERY_TOKEN = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+_OPERATORS = ('AND', 'OR', 'NOT')
+
+
+class IndexUpdate(NamedTuple):
+    """The keys of the documents affected by InvertedIndex.update()."""
+
+    indexed: list[str]
+    removed: list[str]
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    :param text: a text
+    :type text: str
+    :return: the lowercased word tokens (\\w+) of the text; these are the terms of the index
+    :type return: list
+    """
+    return helpers.simple_tokenizer(text.lower())
+
+
+def index_file(path: str | Path, encoding: str = 'utf8') -> dict[str, 'array[int]']:
+    """
+    :param path: path to a textfile
+    :type path: str
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :return: the token positions of every term in the file
+    :type return: dict
+    """
+
+    with open(path, encoding=encoding, errors='ignore') as f:
+        tokens = tokenize(f.read())
+
+    positions: defaultdict[str, array[int]] = defaultdict(partial(array, 'I'))
+    for position, token in enumerate(tokens):
+        positions[token].append(position)
+
+    return dict(positions)
+
+
+class InvertedIndex:
+    """A SQLite file that maps terms to the documents (and token positions) they occur in.
+
+    Documents are identified by keys (relative paths) and carry the signature they had when they were indexed, so
+    that update() only reads new and changed files. Terms are lowercased word tokens; term, phrase, and boolean
+    queries are answered from the postings without reading any file.
+    """
+
+    DEFAULT_FILENAME = '.textdirectory_terms.sqlite'
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        :param path: path to the index file; it is created if it does not exist
+        :type path: str
+        """
+
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript(
+            'CREATE TABLE IF NOT EXISTS documents '
+            '(doc_id INTEGER PRIMARY KEY, key TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, inode INTEGER);'
+            'CREATE TABLE IF NOT EXISTS postings '
+            '(term TEXT, doc_id INTEGER, positions BLOB, PRIMARY KEY (term, doc_id)) WITHOUT ROWID;'
+            'CREATE INDEX IF NOT EXISTS postings_doc_id ON postings (doc_id);'
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> 'InvertedIndex':
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0])
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.connection.close()
+
+    def get_documents(self) -> dict[str, int]:
+        """
+        :return: the doc ids of all indexed documents by key
+        :type return: dict
+        """
+        return dict(self.connection.execute('SELECT key, doc_id FROM documents'))
+
+    def update(
+        self,
+        files: Iterable[tuple[str, Path, FileSignature]],
+        encoding: str = 'utf8',
+        workers: int = 1,
+        pool: str = 'process',
+    ) -> IndexUpdate:
+        """
+        Bring the index in line with a set of files: new and changed files are (re-)indexed, and documents that are
+        not among the files any more are removed.
+
+        :param files: (key, path, signature) tuples of all files that should be in the index
+        :type files: iterable
+        :param encoding: the encoding of the files
+        :type encoding: str
+        :param workers: the number of parallel workers for reading files
+        :type workers: int
+        :param pool: [process, thread] the kind of worker pool
+        :type pool: str
+        :return: the keys of the indexed and of the removed documents
+        :type return: IndexUpdate
+        """
+
+        stored = {
+            key: (doc_id, FileSignature(size, mtime_ns, inode))
+            for doc_id, key, size, mtime_ns, inode in self.connection.execute('SELECT * FROM documents')
+        }
+        current = {key: (path, signature) for key, path, signature in files}
+
+        removed = [key for key in stored if key not in current]
+        to_index = [key for key, (_, signature) in current.items() if key not in stored or stored[key][1] != signature]
+
+        with self.connection:
+            for key in [*removed, *(key for key in to_index if key in stored)]:
+                self.connection.execute('DELETE FROM postings WHERE doc_id = ?', (stored[key][0],))
+            self.connection.executemany('DELETE FROM documents WHERE key = ?', ((key,) for key in removed))
+
+            # Postings are written as the files are indexed, so that only a few documents are held in memory
+            indexed = helpers.parallel_map(
+                partial(index_file, encoding=encoding),
+                [current[key][0] for key in to_index],
+                workers=workers,
+                pool=pool,
+            )
+            for key, positions in zip(to_index, indexed, strict=True):
+                doc_id = stored[key][0] if key in stored else None
+                cursor = self.connection.execute(
+                    'INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)', (doc_id, key, *current[key][1])
+                )
+                self.connection.executemany(
+                    'INSERT INTO postings VALUES (?, ?, ?)',
+                    ((term, cursor.lastrowid, term_positions.tobytes()) for term, term_positions in positions.items()),
+                )
+
+        return IndexUpdate(to_index, removed)
+
+    def _get_postings(self, term: str) -> dict[int, bytes]:
+        """The packed positions of a term by doc id."""
+        return dict(self.connection.execute('SELECT doc_id, positions FROM postings WHERE term = ?', (term,)))
+
+    def search_term(self, term: str) -> set[int]:
+        """
+        :param term: a word; it is lowercased
+        :type term: str
+        :return: the doc ids of the documents containing the term
+        :type return: set
+        """
+
+        terms = tokenize(term)
+        if len(terms) != 1:
+            return self.search_phrase(term)
+
+        return {doc_id for (doc_id,) in self.connection.execute('SELECT doc_id FROM postings WHERE term = ?', terms)}
+
+    def search_phrase(self, phrase: str) -> set[int]:
+        """
+        :param phrase: a sequence of words; they are lowercased, and everything but word characters is ignored
+        :type phrase: str
+        :return: the doc ids of the documents containing the words in this order, next to each other
+        :type return: set
+        """
+
+        terms = tokenize(phrase)
+        if not terms:
+            raise ValueError(f'The phrase {phrase!r} contains no words.')
+
+        postings = [self._get_postings(term) for term in terms]
+        candidates = reduce(set.intersection, (set(term_postings) for term_postings in postings))
+
+        if len(terms) == 1:
+            return candidates
+
+        matches = set()
+        for doc_id in candidates:
+            # The start positions at which the i-th term of the phrase occurs at its place
+            starts: set[int] | None = None
+            for offset, term_postings in enumerate(postings):
+                positions = array('I')
+                positions.frombytes(term_postings[doc_id])
+                term_starts = {position - offset for position in positions}
+                starts = term_starts if starts is None else starts & term_starts
+                if not starts:
+                    break
+
+            if starts:
+                matches.add(doc_id)
+
+        return matches
+
+    def search(self, query: str) -> set[int]:
+        """
+        Run a boolean query: terms, "quoted phrases", AND, OR, NOT, and parentheses. Operators need to be
+        uppercase; neighbouring terms without an operator are combined with AND, which binds more closely than OR.
+
+        :param query: the query, e.g. 'ship AND (space OR "deep sea") NOT whale'
+        :type query: str
+        :return: the doc ids of the matching documents
+        :type return: set
+        """
+
+        tokens = _QUERY_TOKEN.findall(query)
+        position = 0
+
+        def peek() -> str | None:
+            return tokens[position] if position < len(tokens) else None
+
+        def parse_or() -> set[int]:
+            nonlocal position
+            result = parse_and()
+            while peek() == 'OR':
+                position += 1
+                result = result | parse_and()
+            return result
+
+        def parse_and() -> set[int]:
+            nonlocal position
+            result = parse_not()
+            while peek() not in (None, 'OR', ')'):
+                if peek() == 'AND':
+                    position += 1
+                result = result & parse_not()
+            return result
+
+        def parse_not() -> set[int]:
+            nonlocal position
+            if peek() == 'NOT':
+                position += 1
+                return set(self.get_documents().values()) - parse_not()
+            return parse_atom()
+
+        def parse_atom() -> set[int]:
+            nonlocal position
+            token = peek()
+            if token is None or token in (*_OPERATORS, ')'):
+                raise ValueError(f'Invalid query {query!r}: expected a term at {token or "the end"!r}.')
+
+            position += 1
+            if token == '(':
+                result = parse_or()
+                if peek() != ')':
+                    raise ValueError(f'Invalid query {query!r}: missing closing parenthesis.')
+                position += 1
+                return result
+            if token.startswith('"'):
+                return self.search_phrase(token.strip('"'))
+            return self.search_term(token)
+
+        result = parse_or()
+        if position != len(tokens):
+            raise ValueError(f'Invalid query {query!r}: unexpected {tokens[position]!r}.')
+
+        return result
@@ -0,0 +1,131 @@
+"""Metadata index module: a persistent cache of file metadata between runs."""
+
+import json
+import os
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+from types import TracebackType
+from typing import Any, NamedTuple
+
+
+class FileSignature(NamedTuple):
+    """What identifies an unchanged file: if any of these differ, its metadata is collected again."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def get_signature(path: str | Path) -> FileSignature:
+    """
+    :param path: path to a file
+    :type path: str
+    :return: the signature of the file
+    :type return: FileSignature
+    """
+
+    stat = os.stat(path)
+    return FileSignature(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def _dump_metadata(metadata: dict[str, Any]) -> str:
+    """The metadata as JSON, leaving out the values JSON cannot represent (so that they are collected again)."""
+    try:
+        return json.dumps(metadata)
+    except (TypeError, ValueError):
+        serializable = {}
+        for field, value in metadata.items():
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            serializable[field] = value
+
+        return json.dumps(serializable)
+
+
+class MetadataIndex:
+    """A SQLite sidecar file that maps file keys (relative paths) to their signature and metadata.
+
+    Metadata values are stored as JSON, so custom extractors need to return JSON-serializable values for their
+    results to be cached; other values are left out, and files with such values are scanned again on every run.
+    """
+
+    DEFAULT_FILENAME = '.textdirectory_index.sqlite'
+    # Keys per lookup query; SQLite allows 999 parameters per statement in older versions
+    BATCH_SIZE = 500
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        :param path: path to the index file; it is created if it does not exist
+        :type path: str
+        """
+
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS files '
+            '(key TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, metadata TEXT)'
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> 'MetadataIndex':
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.connection.execute('SELECT COUNT(*) FROM files').fetchone()[0])
+
+    def load(self, keys: Iterable[str] | None = None) -> dict[str, tuple[FileSignature, dict[str, Any]]]:
+        """
+        :param keys: only load the entries of these keys (default: all); they are looked up in batches, so that
+            only their metadata is decoded
+        :type keys: iterable
+        :return: the entries by key; one query is much faster than a lookup per file on large corpora
+        :type return: dict
+        """
+
+        if keys is None:
+            rows = self.connection.execute('SELECT * FROM files').fetchall()
+        else:
+            rows = []
+            keys = list(keys)
+            for start in range(0, len(keys), self.BATCH_SIZE):
+                batch = keys[start : start + self.BATCH_SIZE]
+                placeholders = ', '.join('?' * len(batch))
+                rows += self.connection.execute(f'SELECT * FROM files WHERE key IN ({placeholders})', batch)
+
+        return {
+            key: (FileSignature(size, mtime_ns, inode), json.loads(metadata))
+            for key, size, mtime_ns, inode, metadata in rows
+        }
+
+    def store(self, entries: Iterable[tuple[str, FileSignature, dict[str, Any]]]) -> None:
+        """
+        :param entries: (key, signature, metadata) tuples to insert or replace
+        :type entries: iterable
+        """
+
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+            ((key, *signature, _dump_metadata(metadata)) for key, signature, metadata in entries),
+        )
+        self.connection.commit()
+
+    def remove(self, keys: Iterable[str]) -> None:
+        """
+        :param keys: the keys of the entries to remove
+        :type keys: iterable
+        """
+
+        self.connection.executemany('DELETE FROM files WHERE key = ?', ((key,) for key in keys))
+        self.connection.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.connection.close()
@@ -0,0 +1,95 @@
+"""Scanner module: collects the metadata of a text file in a single pass."""
+
+import hashlib
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+from textdirectory.helpers import count_types_and_tokens
+
+# The metadata fields every scan produces, in the order they appear in a file record
+METADATA_FIELDS = ('characters', 'tokens', 'types', 'size', 'lines', 'hash')
+
+MetadataExtractor = Callable[[str], Any]
+
+# Content hashes are BLAKE2b digests of the raw bytes; BLAKE2b is the fastest hash in the standard library
+HASH_DIGEST_SIZE = 16
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path: str | Path) -> str:
+    """
+    :param path: path to a file
+    :type path: str
+    :return: the content hash of the file (as in its metadata), read in chunks so that large files fit in memory
+    :type return: str
+    """
+
+    digest = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def decode_text(raw: bytes, encoding: str = 'utf8') -> str:
+    """
+    Decode bytes the way reading the file in text mode would.
+
+    :param raw: the raw content of a file
+    :type raw: bytes
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :return: the decoded text, with undecodable bytes dropped and line breaks normalized to \\n
+    :type return: str
+    """
+
+    text = raw.decode(encoding, errors='ignore')
+
+    # Universal newlines, as in open(); the check avoids two copies for files without \r
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    return text
+
+
+def scan_file(
+    path: Path, encoding: str = 'utf8', extractors: Mapping[str, MetadataExtractor] | None = None
+) -> dict[str, Any]:
+    """
+    Read a file once and collect all of its metadata.
+
+    Extractors are called with the decoded text and their results are stored under their name. They need to be
+    picklable (e.g. module-level functions) when the scan runs in a process pool.
+
+    :param path: path to a textfile
+    :type path: Path
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :param extractors: additional metadata extractors, by name
+    :type extractors: dict
+    :return: the metadata of the file
+    :type return: dict
+    """
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    text = decode_text(raw, encoding)
+    types, tokens = count_types_and_tokens(text)
+
+    metadata: dict[str, Any] = {
+        'characters': len(text),
+        'tokens': tokens,
+        'types': types,
+        'size': len(raw),
+        'lines': text.count('\n') + (1 if text and not text.endswith('\n') else 0),
+        'hash': hashlib.blake2b(raw, digest_size=HASH_DIGEST_SIZE).hexdigest(),
+    }
+
+    if extractors:
+        for name, extractor in extractors.items():
+            metadata[name] = extractor(text)
+
+    return metadata
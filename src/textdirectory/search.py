@@ -0,0 +1,250 @@
+"""Search module: finding strings in texts and files."""
+
+import codecs
+import mmap
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+# Files are searched for regular expressions in chunks of this many characters; matches up to CHUNK_OVERLAP
+# characters long are found even if they span two chunks
+CHUNK_SIZE = 1 << 20
+CHUNK_OVERLAP = 1 << 12
+
+
+def file_contains(path: str | Path, needle: bytes) -> bool:
+    """
+    Search a file for a byte string without reading it into memory: the file is memory-mapped, and the search stops
+    at the first match.
+
+    :param path: path to a file
+    :type path: str
+    :param needle: the bytes to look for
+    :type needle: bytes
+    :return: whether the file contains the needle
+    :type return: bool
+    """
+
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped.find(needle) != -1
+        except ValueError:
+            # Empty files cannot be mapped
+            return not needle
+
+
+def _is_valid_utf8(data: 'mmap.mmap | bytes', chunk_size: int = CHUNK_SIZE) -> bool:
+    """Whether the data is valid UTF-8, decoded in chunks so that only one chunk is copied at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for start in range(0, len(data), chunk_size):
+            decoder.decode(data[start : start + chunk_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+
+    return True
+
+
+def file_contains_utf8(path: str | Path, needle: bytes) -> bool:
+    """
+    Search a UTF-8 text file for an encoded string, with the same result as searching its decoded text (where
+    undecodable bytes are dropped). The raw bytes are searched as in file_contains; a miss in a file that is not
+    valid UTF-8 is checked again on the decoded text, since dropping invalid bytes can join a match.
+
+    :param path: path to a textfile
+    :type path: str
+    :param needle: the UTF-8 encoded string to look for (without line breaks)
+    :type needle: bytes
+    :return: whether the decoded text of the file contains the string
+    :type return: bool
+    """
+
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped.find(needle) != -1:
+                    return True
+                if _is_valid_utf8(mapped):
+                    return False
+                return needle.decode('utf-8') in mapped[:].decode('utf-8', errors='ignore')
+        except ValueError:
+            # Empty files cannot be mapped
+            return not needle
+
+
+def file_matches(
+    path: str | Path,
+    pattern: re.Pattern[str],
+    encoding: str = 'utf8',
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> bool:
+    """
+    Search a file for a regular expression, reading it in overlapping chunks so that only chunk_size + overlap
+    characters are in memory at any time. The search stops at the first match.
+
+    Matches longer than overlap characters are only found if they lie within a single chunk.
+
+    :param path: path to a textfile
+    :type path: str
+    :param pattern: a compiled regular expression
+    :type pattern: re.Pattern
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :param chunk_size: the number of characters read at once
+    :type chunk_size: int
+    :param overlap: the number of characters carried over from one chunk to the next
+    :type overlap: int
+    :return: whether the pattern matches anywhere in the file
+    :type return: bool
+    """
+
+    with open(path, encoding=encoding, errors='ignore') as f:
+        window = f.read(chunk_size)
+        at_file_start = True
+
+        while True:
+            chunk = f.read(chunk_size)
+            match = pattern.search(window, 0 if at_file_start else 1)
+
+            if not chunk:
+                return match is not None
+
+            # A match ending at (or right before) the end of the window might depend on what follows (e.g. $ or \b);
+            # it is searched again, with that context, in the next window
+            if match is not None and match.end() < len(window) - 1:
+                return True
+
+            # The carried-over tail keeps one extra character, so that ^ and lookbehinds see what precedes it; the
+            # search starts after that character
+            tail_size = overlap + 2
+            at_file_start = at_file_start and len(window) <= tail_size
+            window = window[-tail_size:] + chunk
+
+
+class KeywordAutomaton:
+    """An Aho-Corasick automaton over a list of keywords.
+
+    The automaton is built once; searching a text then takes a single pass over its characters, however many
+    keywords there are. Matching is case-sensitive, like filter_by_contains.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        """
+        :param keywords: the keywords to search for; duplicates are ignored
+        :type keywords: iterable
+        """
+
+        self.keywords = list(dict.fromkeys(keywords))
+
+        if not self.keywords:
+            raise ValueError('At least one keyword is needed.')
+
+        if '' in self.keywords:
+            raise ValueError('Keywords cannot be empty.')
+
+        # The trie: the transitions of every state, and the keywords (by index) that end in it
+        self._goto: list[dict[str, int]] = [{}]
+        self._outputs: list[list[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append(index)
+
+        # Failure links point to the longest proper suffix that is also in the trie. They are set breadth-first, so
+        # the outputs of a suffix are complete before they are inherited.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+        self._alphabet = frozenset(char for keyword in self.keywords for char in keyword)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def __repr__(self) -> str:
+        return f'KeywordAutomaton({len(self.keywords)} keywords, {len(self._goto)} states)'
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, str]]:
+        """
+        :param text: the text to search
+        :type text: str
+        :return: an iterator over (start position, keyword) pairs, in the order in which the matches end
+        :type return: iterator
+        """
+
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        alphabet = self._alphabet
+        keywords = self.keywords
+        state = 0
+
+        for position, char in enumerate(text):
+            # A character that is in no keyword ends every partial match
+            if char not in alphabet:
+                state = 0
+                continue
+
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for index in outputs[state]:
+                keyword = keywords[index]
+                yield position - len(keyword) + 1, keyword
+
+    def find(self, text: str) -> set[str]:
+        """
+        :param text: the text to search
+        :type text: str
+        :return: the keywords that occur in the text
+        :type return: set
+        """
+
+        found: set[str] = set()
+        for _, keyword in self.iter_matches(text):
+            found.add(keyword)
+            if len(found) == len(self.keywords):
+                break
+
+        return found
+
+    def contains_any(self, text: str) -> bool:
+        """
+        :param text: the text to search
+        :type text: str
+        :return: whether any keyword occurs in the text; the search stops at the first match
+        :type return: bool
+        """
+        return next(self.iter_matches(text), None) is not None
+
+    def contains_all(self, text: str) -> bool:
+        """
+        :param text: the text to search
+        :type text: str
+        :return: whether every keyword occurs in the text; the search stops once all are found
+        :type return: bool
+        """
+        return len(self.find(text)) == len(self.keywords)
@@ -0,0 +1,189 @@
+"""Similarity module: MinHash signatures and locality-sensitive hashing for near-duplicate detection."""
+
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import Iterable
+from hashlib import blake2b
+from pathlib import Path
+
+NUM_HASHES = 128
+# 32 bands of 4 rows: documents with a Jaccard similarity of about 0.42 or more become candidates
+BANDS = 32
+# From this similarity on, LSH finds (nearly) all matches (at 0.6: 98.8 %); below it, all signatures are compared
+LSH_MIN_THRESHOLD = 0.6
+SHINGLE_SIZE = 5
+
+_HASH_RANGE = 1 << 64
+
+
+def shingle_hashes(text: str, shingle_size: int = SHINGLE_SIZE) -> set[int]:
+    """
+    :param text: a text; it is lowercased and its whitespace normalized
+    :type text: str
+    :param shingle_size: the number of characters per shingle
+    :type shingle_size: int
+    :return: 64-bit hashes of the character shingles of the text (stable across processes and runs)
+    :type return: set
+    """
+
+    normalized = ' '.join(text.lower().split()).encode('utf-8')
+    count = max(1, len(normalized) - shingle_size + 1)
+
+    return {
+        int.from_bytes(blake2b(normalized[i : i + shingle_size], digest_size=8).digest(), 'little')
+        for i in range(count)
+    }
+
+
+def minhash(text: str, num_hashes: int = NUM_HASHES, shingle_size: int = SHINGLE_SIZE) -> list[int]:
+    """
+    A MinHash signature computed with one permutation hashing: the hash range is split into num_hashes bins and the
+    smallest hash of each bin is kept, which takes a single pass over the shingles. Empty bins borrow from the next
+    non-empty bin (densification), so that signatures can be compared bin by bin.
+
+    :param text: a text
+    :type text: str
+    :param num_hashes: the length of the signature
+    :type num_hashes: int
+    :param shingle_size: the number of characters per shingle
+    :type shingle_size: int
+    :return: the signature
+    :type return: list
+    """
+
+    bin_size = _HASH_RANGE // num_hashes
+    minima: list[int | None] = [None] * num_hashes
+
+    for shingle_hash in shingle_hashes(text, shingle_size):
+        index, value = divmod(shingle_hash, bin_size)
+        index = min(index, num_hashes - 1)
+        current = minima[index]
+        if current is None or value < current:
+            minima[index] = value
+
+    # Every text has at least one shingle, so at least one bin is filled
+    filled = [index for index, value in enumerate(minima) if value is not None]
+    signature: list[int] = []
+    for index, minimum in enumerate(minima):
+        if minimum is None:
+            # The next filled bin (wrapping around); the distance keeps borrowed values apart from real ones
+            position = bisect_right(filled, index)
+            source = filled[position] if position < len(filled) else filled[0]
+            borrowed = minima[source]
+            assert borrowed is not None
+            minimum = borrowed + (source - index) % num_hashes * bin_size
+        signature.append(minimum)
+
+    return signature
+
+
+def minhash_file(path: str | Path, encoding: str = 'utf8') -> list[int]:
+    """
+    :param path: path to a textfile
+    :type path: str
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :return: the MinHash signature of the file
+    :type return: list
+    """
+
+    with open(path, encoding=encoding, errors='ignore') as f:
+        return minhash(f.read())
+
+
+def estimate_jaccard(signature: list[int], other: list[int]) -> float:
+    """
+    :param signature: a MinHash signature
+    :type signature: list
+    :param other: another MinHash signature of the same length
+    :type other: list
+    :return: the estimated Jaccard similarity of the shingles of both texts
+    :type return: float
+    """
+    return sum(a == b for a, b in zip(signature, other, strict=True)) / len(signature)
+
+
+class LSHIndex:
+    """Locality-sensitive hashing over MinHash signatures.
+
+    Signatures are split into bands; documents that agree on all rows of at least one band share a bucket and become
+    candidates. A query only looks at the buckets of its own bands, so it does not grow with the number of documents
+    (beyond the candidates it returns).
+    """
+
+    def __init__(self, bands: int = BANDS) -> None:
+        """
+        :param bands: the number of bands; the signature length needs to be a multiple of it
+        :type bands: int
+        """
+
+        self.bands = bands
+        self.buckets: defaultdict[tuple[int, tuple[int, ...]], list[int]] = defaultdict(list)
+        self.signatures: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self.signatures
+
+    def _bands(self, signature: list[int]) -> list[tuple[int, tuple[int, ...]]]:
+        rows = len(signature) // self.bands
+        return [(band, tuple(signature[band * rows : (band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, item_id: int, signature: list[int]) -> None:
+        """
+        :param item_id: the id of the document (e.g. a file id)
+        :type item_id: int
+        :param signature: its MinHash signature
+        :type signature: list
+        """
+
+        if item_id in self.signatures:
+            self.remove(item_id)
+
+        self.signatures[item_id] = signature
+        for key in self._bands(signature):
+            self.buckets[key].append(item_id)
+
+    def remove(self, item_id: int) -> None:
+        """
+        :param item_id: the id of a document in the index
+        :type item_id: int
+        """
+
+        for key in self._bands(self.signatures.pop(item_id)):
+            self.buckets[key].remove(item_id)
+
+    def query(self, signature: list[int], threshold: float = 0.0) -> set[int]:
+        """
+        :param signature: a MinHash signature
+        :type signature: list
+        :param threshold: the minimum estimated Jaccard similarity of the results
+        :type threshold: float
+        :return: the ids of the documents sharing a bucket with the signature and meeting the threshold
+        :type return: set
+        """
+
+        candidates = {item_id for key in self._bands(signature) for item_id in self.buckets.get(key, [])}
+        return {item_id for item_id in candidates if estimate_jaccard(signature, self.signatures[item_id]) >= threshold}
+
+    def candidate_pairs(self, item_ids: Iterable[int] | None = None) -> set[tuple[int, int]]:
+        """
+        Pairs that link every document to the first (smallest) document of each bucket it is in. This finds the
+        clusters of near-duplicates while staying linear in the bucket sizes, even for large clusters.
+
+        :param item_ids: only consider these documents (default: all)
+        :type item_ids: iterable
+        :return: (smaller id, larger id) pairs
+        :type return: set
+        """
+
+        wanted = None if item_ids is None else set(item_ids)
+        pairs: set[tuple[int, int]] = set()
+
+        for bucket in self.buckets.values():
+            members = sorted({item_id for item_id in bucket if wanted is None or item_id in wanted})
+            pairs.update((members[0], member) for member in members[1:])
+
+        return pairs
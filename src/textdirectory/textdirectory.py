@@ -1,49 +1,165 @@
 """Main module."""
 
+import codecs
 import difflib
-import os
+import operator
 import random
-import statistics
-from collections.abc import Callable, Iterator
-from functools import wraps
+import re
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from datetime import datetime
+from functools import partial, reduce, wraps
+from itertools import combinations, groupby
 from pathlib import Path
 from typing import Any, NamedTuple
 
 from tqdm import tqdm
 
-from textdirectory import helpers, transformations
+from textdirectory import engine, helpers, transformations
+from textdirectory.discovery import DiscoveredFile, discover_files
+from textdirectory.filetable import SIGNATURE_KEYS, FileRecord, FileTable
+from textdirectory.idsets import Bitmap, PackedIds
+from textdirectory.invertedindex import IndexUpdate, InvertedIndex
+from textdirectory.metadataindex import FileSignature, MetadataIndex, get_signature
+from textdirectory.scanner import METADATA_FIELDS, MetadataExtractor, hash_file, scan_file
+from textdirectory.search import KeywordAutomaton, file_contains_utf8, file_matches
+from textdirectory.similarity import LSH_MIN_THRESHOLD, LSHIndex, estimate_jaccard, minhash, minhash_file
+from textdirectory.textstore import TextStore, TextStoreStats
+from textdirectory.tfidf import TfidfModel, count_terms
+
+
+class PathPredicate(NamedTuple):
+    """A content predicate that inspects the file itself instead of its decoded text (e.g. a byte search).
+
+    A file passes if the function returns expected. Path predicates built from module-level functions can be
+    evaluated in worker processes.
+    """
+
+    function: Callable[[Path], bool]
+    expected: bool = True
+
+
+ContentPredicate = Callable[[str], bool] | PathPredicate
+
+
+def _get_signature_if_exists(path: Path) -> FileSignature | None:
+    """The signature of a file, or None if it does not exist (any more)."""
+    try:
+        return get_signature(path)
+    except FileNotFoundError:
+        return None
+
+
+def _mattr_within(path: Path, minimum: float, maximum: float, window: int = 500, encoding: str = 'utf8') -> bool:
+    """Whether the moving-average type-token ratio of a textfile lies within the bounds."""
+    mattr = helpers.moving_average_type_token_ratio(helpers.iter_file_tokens(path, encoding), window)
+    return minimum <= mattr <= maximum
+
+
+def _count_passed_path_predicates(path: Path, predicates: list[PathPredicate]) -> int:
+    """
+    :param path: path to a textfile
+    :param predicates: a chain of path predicates
+    :return: the number of predicates the file passes before the first one it fails
+    """
+    for passed, predicate in enumerate(predicates):
+        if predicate.function(path) != predicate.expected:
+            return passed
+
+    return len(predicates)
 
 
 class AggregationState(NamedTuple):
     """A saved aggregation state (checkpoint).
 
     Behaves like the ``[aggregation, applied_filters]`` list used before 0.4.1, so
-    ``state[0]`` and ``state[1]`` keep working.
+    ``state[0]`` and ``state[1]`` keep working. The aggregation is stored packed; it
+    compares equal to the list of file ids it holds.
     """
 
-    aggregation: list[int]
+    aggregation: PackedIds
     applied_filters: list[str]
 
 
+class RefreshResult(NamedTuple):
+    """The file ids affected by TextDirectory.refresh()."""
+
+    added: list[int]
+    removed: list[int]
+    modified: list[int]
+
+
+class FilterStep(NamedTuple):
+    """One step of a filter plan."""
+
+    filter: list[Any]
+    cost: str
+    estimated_io: int
+
+
 class TextDirectory:
+    # Values that are computed after loading, kept in the file records and cached in the metadata index
+    CACHED_FIELDS = ('minhash', 'ttr')
+
+    # The metrics filter_by_percentile and filter_by_outliers work on
+    DISTRIBUTION_METRICS = ('characters', 'tokens', 'size', 'ttr')
+
+    # The filters filter_content can fuse into a single pass, and the methods that build their predicates
+    CONTENT_PREDICATES = {
+        'filter_by_contains': '_contains_predicate',
+        'filter_by_not_contains': '_not_contains_predicate',
+        'filter_by_contains_any': '_contains_any_predicate',
+        'filter_by_contains_all': '_contains_all_predicate',
+        'filter_by_contains_none': '_contains_none_predicate',
+        'filter_by_regex': '_regex_predicate',
+        'filter_by_not_regex': '_not_regex_predicate',
+        'filter_by_similar_documents': '_similar_documents_predicate',
+        'filter_by_type_token_ratio': '_type_token_ratio_predicate',
+        'filter_by_mattr': '_mattr_predicate',
+    }
+
     def __init__(
-        self, directory: str | Path, encoding: str = 'utf8', autoload: bool = False, disable_tqdm: bool = False
+        self,
+        directory: str | Path,
+        encoding: str = 'utf8',
+        autoload: bool = False,
+        disable_tqdm: bool = False,
+        workers: int = 1,
+        pool: str = 'process',
+        text_memory_budget: int | None = None,
     ) -> None:
         """
         :param directory: path to the text directory
         :type directory: str
+        :param workers: the default number of parallel workers for reading files
+        :type workers: int
+        :param pool: [process, thread] the kind of worker pool
+        :type pool: str
+        :param text_memory_budget: the number of bytes transformed texts may occupy in memory; the least recently
+            used texts beyond it are compressed and spilled to a temporary directory (default: no limit)
+        :type text_memory_budget: int
         """
 
         self.directory = Path(directory)
-        self.files: list[dict[str, Any]] = []
-        self.filenames: list[str] = []
+        self.files = FileTable(TextStore(text_memory_budget))
         self.aggregation: list[int] = []
         self.staged_transformations: list[list[Any]] = []
+        self.staged_filters: list[list[Any]] = []
         self.applied_filters: list[str] = []
         self.aggregation_states: list[AggregationState] = []
         self.current_state = 0
+        self.metadata_extractors: dict[str, MetadataExtractor] = {}
+        self.metadata_index: MetadataIndex | None = None
+        self.inverted_index: InvertedIndex | None = None
+        self._inverted_index_ids: dict[int, int] = {}
+        self.lsh_index = LSHIndex()
+        self.tfidf: TfidfModel | None = None
+        self._tfidf_rows: dict[int, int] = {}
+        self.tombstones: set[int] = set()
+        self._load_options: dict[str, Any] | None = None
         self.encoding = encoding
         self.disable_tqdm = disable_tqdm
+        self.workers = workers
+        self.pool = pool
 
         if not self.directory.exists():
             raise NotADirectoryError(f'The directory {self.directory} does not exist.')
@@ -54,22 +170,29 @@ class TextDirectory:
         if autoload:
             self.load_files()
 
-    def __iter__(self) -> Iterator[dict[str, Any]]:
+    def __iter__(self) -> Iterator[FileRecord]:
         # A generator, so that nested or concurrent iterations do not share a cursor
         yield from self.get_aggregation()
 
     def __str__(self) -> str:
-        aggregation = helpers.tabulate_flat_list_of_dicts(list(self.get_aggregation()))
+        aggregation = helpers.tabulate_flat_list_of_dicts(
+            [file.to_dict(load_spilled=False) for file in self.get_aggregation()]
+        )
         staged_transformations = self.staged_transformations
 
         return f'{aggregation}\nStaged Transformation: {staged_transformations}'
 
     def __repr__(self) -> str:
-        return f'TextDirectory: {len(self.files)} files in {self.directory}.'
+        return f'TextDirectory: {len(self.files) - len(self.tombstones)} files in {self.directory}.'
+
+    @property
+    def filenames(self) -> list[str]:
+        """The filenames of all files, in the order of self.files."""
+        return self.files.names
 
     def save_aggregation_state(self) -> None:
         """Saves the current self.aggregation state."""
-        self.aggregation_states.append(AggregationState(list(self.aggregation), list(self.applied_filters)))
+        self.aggregation_states.append(AggregationState(PackedIds.pack(self.aggregation), list(self.applied_filters)))
         self.current_state = len(self.aggregation_states) - 1
 
     def load_aggregation_state(self, state: int = 0) -> None:
@@ -84,40 +207,118 @@ class TextDirectory:
         previous_aggregation = self.aggregation_states[state]
 
         # Copies, so that continuing to filter does not rewrite the saved state
-        self.aggregation = list(previous_aggregation.aggregation)
+        self.aggregation = previous_aggregation.aggregation.to_list()
         self.applied_filters = list(previous_aggregation.applied_filters)
         self.current_state = state
 
-    def get_aggregation(self) -> Iterator[dict[str, Any]]:
+    def _combine_aggregation_states(
+        self, name: str, combine: Callable[[Bitmap, Bitmap], Bitmap], states: tuple[int, ...]
+    ) -> None:
+        """
+        Combine saved states with a set operation, make the result the current aggregation, and save it.
+
+        :param name: the label recorded in applied_filters
+        :param combine: the set operation
+        :param states: the states to combine
+        """
+
+        if len(states) < 2:
+            raise ValueError(f'{name} needs at least two states, got {len(states)}.')
+
+        for state in states:
+            if state not in range(len(self.aggregation_states)):
+                raise ValueError(
+                    f'There is no saved state {state}. Saved states: 0 to {len(self.aggregation_states) - 1}.'
+                )
+
+        bitmaps = [Bitmap.from_ids(self.aggregation_states[state].aggregation) for state in states]
+        combined = reduce(combine, bitmaps)
+
+        # Set operations ignore order and duplicates; the result is in file order
+        self.aggregation = combined.to_list()
+        self.applied_filters = [f'{name}({", ".join(map(str, states))})']
+        self.save_aggregation_state()
+
+    def union_aggregation_states(self, *states: int) -> None:
+        """
+        Make the files that are in any of the given states the current aggregation (saved as a new state).
+
+        :param states: the states to combine
+        :type states: int
+        """
+        self._combine_aggregation_states('union_aggregation_states', operator.or_, states)
+
+    def intersect_aggregation_states(self, *states: int) -> None:
+        """
+        Make the files that are in all of the given states the current aggregation (saved as a new state).
+
+        :param states: the states to combine
+        :type states: int
+        """
+        self._combine_aggregation_states('intersect_aggregation_states', operator.and_, states)
+
+    def subtract_aggregation_states(self, *states: int) -> None:
+        """
+        Make the files of the first state that are in none of the other states the current aggregation (saved as a
+        new state), e.g. subtract_aggregation_states(2, 5) for "state 2 minus state 5".
+
+        :param states: the state to subtract from, followed by the states to subtract
+        :type states: int
+        """
+        self._combine_aggregation_states('subtract_aggregation_states', operator.sub, states)
+
+    def get_state_memory_report(self) -> list[dict[str, Any]]:
+        """
+        :return: one row per saved state with its number of files and the bytes its packed aggregation occupies,
+            compared to the bytes a plain list of ids would need (8 bytes per entry, not counting the ints)
+        :type return: list
+        """
+
+        return [
+            {
+                'state': i,
+                'files': len(state.aggregation),
+                'bytes': state.aggregation.nbytes,
+                'list_bytes': 8 * len(state.aggregation),
+                'applied_filters': len(state.applied_filters),
+            }
+            for i, state in enumerate(self.aggregation_states)
+        ]
+
+    def get_aggregation(self) -> Iterator[FileRecord]:
         """A generator that provides the current aggregation."""
         for file_id in self.aggregation:
             yield self.files[file_id]
 
-    def set_aggregation(self, aggregation: list[dict[str, Any]]) -> None:
+    def set_aggregation(self, aggregation: Iterable[Mapping[str, Any]]) -> None:
         """Set the aggregation."""
-        # Files are looked up by identity; a linear search per file would be quadratic
-        file_ids = {id(file): file_id for file_id, file in enumerate(self.files)}
-
-        self.aggregation = []
-        for file in tqdm(aggregation, disable=self.disable_tqdm):
-            file_id = file_ids.get(id(file))
-            if file_id is None:
-                # Not one of our file records (e.g. a copy): fall back to an equality search
-                file_id = self.files.index(file)
+        # File records know their id; copies fall back to an equality search
+        self.aggregation = [self.files.index(file) for file in tqdm(aggregation, disable=self.disable_tqdm)]
 
-            self.aggregation.append(file_id)
+    def _ensure_metadata(self, key: str) -> None:
+        """Collect the metadata a filter depends on for the files in the aggregation that lack it.
 
-    def _require_metadata(self, key: str) -> None:
-        """Raise if the loaded files lack the metadata a filter depends on.
+        Files loaded with fast=True have no metadata until a filter needs it. It is only collected for the files
+        still in the aggregation, and then kept in their records.
 
         :param key: the metadata key a filter needs (e.g. characters)
         :type key: str
         """
-        if any(file[key] is False for file in self.get_aggregation()):
-            raise ValueError(
-                f"This filter needs the '{key}' metadata, which was not collected because the files "
-                'were loaded with fast=True. Reload them with load_files(fast=False).'
-            )
+        missing = [
+            file_id for file_id in dict.fromkeys(self.aggregation) if self.files[file_id].get(key, False) is False
+        ]
+
+        if not missing:
+            return
+
+        metadata = self._collect_metadata(
+            [self.files[file_id]['path'] for file_id in missing],
+            [self.files.get_signature(file_id) for file_id in missing],
+            self.workers,
+        )
+
+        for file_id, file_metadata in zip(missing, metadata, strict=True):
+            self.files[file_id].update(file_metadata)
 
     def filter(filter: Callable[..., Any]) -> Callable[..., Any]:  # type: ignore[misc]
         """A wrapper for filters."""
@@ -151,9 +352,354 @@ class TextDirectory:
         :return: the files length in tokens
         """
         with path.open(encoding=self.encoding, errors='ignore') as f:
-            # Replace all line breaks with spaces
-            fr = f.read().replace('\n', ' ')
-            return len(helpers.simple_tokenizer(fr))
+            return helpers.count_tokens(f.read())
+
+    def get_file_metadata(self, path: Path) -> dict[str, Any]:
+        """
+        :param path: path to a textfile
+        :return: the files metadata (characters, tokens, size, lines, hash, and registered extractors)
+        """
+        return scan_file(path, self.encoding, self.metadata_extractors)
+
+    def register_metadata_extractor(self, name: str, extractor: MetadataExtractor) -> None:
+        """
+        Register an extractor that runs in the same pass as the built-in metadata when files are loaded.
+
+        :param name: the key the result is stored under in the file records
+        :type name: str
+        :param extractor: a callable that receives the text of a file
+        :type extractor: callable
+        """
+
+        reserved = (*METADATA_FIELDS, *SIGNATURE_KEYS, *self.CACHED_FIELDS, 'path', 'filename', 'transformed_text')
+        if name in reserved:
+            raise ValueError(f'{name!r} is a built-in file record key and cannot be used for an extractor.')
+
+        self.metadata_extractors[name] = extractor
+
+    def open_metadata_index(self, path: str | Path | None = None) -> MetadataIndex:
+        """
+        Open (or create) a persistent index that caches the metadata of unchanged files between runs.
+
+        :param path: path to the index file (default: a hidden file in the text directory)
+        :type path: str
+        :return: the opened index
+        :type return: MetadataIndex
+        """
+
+        if self.metadata_index is not None:
+            self.metadata_index.close()
+
+        if path is None:
+            path = self.directory / MetadataIndex.DEFAULT_FILENAME
+
+        self.metadata_index = MetadataIndex(path)
+        return self.metadata_index
+
+    def open_inverted_index(self, path: str | Path | None = None, workers: int | None = None) -> InvertedIndex:
+        """
+        Open (or create) a persistent term index of the loaded files and bring it up to date. Once it is open,
+        filter_by_term, filter_by_phrase, and filter_by_query are answered from the index without reading the files;
+        load_files and refresh keep it up to date.
+
+        :param path: path to the index file (default: a hidden file in the text directory)
+        :type path: str
+        :param workers: the number of parallel workers indexing new files (default: self.workers)
+        :type workers: int
+        :return: the opened index
+        :type return: InvertedIndex
+        """
+
+        if self.inverted_index is not None:
+            self.inverted_index.close()
+
+        if path is None:
+            path = self.directory / InvertedIndex.DEFAULT_FILENAME
+
+        self.inverted_index = InvertedIndex(path)
+        self.update_inverted_index(workers)
+
+        return self.inverted_index
+
+    def update_inverted_index(self, workers: int | None = None) -> IndexUpdate:
+        """
+        Index new and changed files and drop removed ones; unchanged files are not read.
+
+        :param workers: the number of parallel workers indexing files (default: self.workers)
+        :type workers: int
+        :return: the keys of the indexed and of the removed files
+        :type return: IndexUpdate
+        """
+
+        if self.inverted_index is None:
+            raise ValueError('There is no inverted index; open one with open_inverted_index() first.')
+
+        if workers is None:
+            workers = self.workers
+
+        file_ids = {
+            self._index_key(self.files[file_id]['path']): file_id
+            for file_id in range(len(self.files))
+            if file_id not in self.tombstones
+        }
+
+        update = self.inverted_index.update(
+            (
+                (key, self.files[file_id]['path'], self.files.get_signature(file_id))
+                for key, file_id in file_ids.items()
+            ),
+            encoding=self.encoding,
+            workers=workers,
+            pool=self.pool,
+        )
+
+        self._inverted_index_ids = {
+            doc_id: file_ids[key] for key, doc_id in self.inverted_index.get_documents().items() if key in file_ids
+        }
+
+        return update
+
+    def _filter_by_inverted_index(self, doc_ids: set[int]) -> None:
+        """
+        :param doc_ids: the documents of the inverted index that match
+        """
+        file_ids = {self._inverted_index_ids[doc_id] for doc_id in doc_ids if doc_id in self._inverted_index_ids}
+        self.aggregation = [file_id for file_id in self.aggregation if file_id in file_ids]
+
+    def _get_inverted_index(self) -> InvertedIndex:
+        if self.inverted_index is None:
+            raise ValueError('This filter needs an inverted index; open one with open_inverted_index() first.')
+
+        return self.inverted_index
+
+    def build_tfidf(self, workers: int | None = None, batch_size: int | None = None) -> TfidfModel:
+        """
+        Build a TF-IDF model of the files in the aggregation. The files are read once, in parallel batches, and their
+        term counts are streamed into a sparse matrix.
+
+        :param workers: the number of parallel workers reading files (default: self.workers)
+        :type workers: int
+        :param batch_size: the number of files per batch handed to a worker (default: chosen by helpers.parallel_map)
+        :type batch_size: int
+        :return: the model; it is also kept in self.tfidf
+        :type return: TfidfModel
+        """
+
+        if workers is None:
+            workers = self.workers
+
+        file_ids = list(dict.fromkeys(self.aggregation))
+        paths = [self.files[file_id]['path'] for file_id in file_ids]
+        counts = helpers.parallel_map(
+            partial(count_terms, encoding=self.encoding), paths, workers=workers, pool=self.pool, chunksize=batch_size
+        )
+
+        model = TfidfModel.build(
+            zip(
+                (self._index_key(path) for path in paths),
+                tqdm(counts, total=len(paths), disable=self.disable_tqdm),
+                strict=True,
+            )
+        )
+        model.signatures = [list(self.files.get_signature(file_id)) for file_id in file_ids]
+        self._set_tfidf(model)
+
+        return model
+
+    def save_tfidf(self, path: str | Path | None = None) -> None:
+        """
+        Store the TF-IDF model, so that later runs can query it without reading the files again.
+
+        :param path: the file to write (default: a hidden file in the text directory)
+        :type path: str
+        """
+        self._get_tfidf().save(self.directory / TfidfModel.DEFAULT_FILENAME if path is None else path)
+
+    def load_tfidf(self, path: str | Path | None = None) -> TfidfModel:
+        """
+        Load a TF-IDF model stored with save_tfidf. Documents that changed since the model was built are left out.
+
+        :param path: the file to read (default: a hidden file in the text directory)
+        :type path: str
+        :return: the model; it is also kept in self.tfidf
+        :type return: TfidfModel
+        """
+
+        model = TfidfModel.load(self.directory / TfidfModel.DEFAULT_FILENAME if path is None else path)
+        self._set_tfidf(model)
+
+        return model
+
+    def _set_tfidf(self, model: TfidfModel) -> None:
+        """Use a TF-IDF model, mapping its rows to the files that are loaded and unchanged."""
+        file_ids = {
+            self._index_key(self.files[file_id]['path']): file_id
+            for file_id in range(len(self.files))
+            if file_id not in self.tombstones
+        }
+
+        self.tfidf = model
+        self._tfidf_rows = {}
+        for row, key in enumerate(model.keys):
+            file_id = file_ids.get(key)
+            if file_id is not None and model.signatures[row] == list(self.files.get_signature(file_id)):
+                self._tfidf_rows[file_id] = row
+
+    def _get_tfidf(self) -> TfidfModel:
+        if self.tfidf is None:
+            raise ValueError('There is no TF-IDF model; build one with build_tfidf() or load one with load_tfidf().')
+
+        return self.tfidf
+
+    def most_similar(self, reference: int | str | Path, k: int = 10) -> list[tuple[int, float]]:
+        """
+        Find the files in the aggregation that are most similar to a reference (by the cosine similarity of their
+        TF-IDF vectors). Needs a TF-IDF model (see build_tfidf); only the files sharing terms with the reference are
+        scored.
+
+        :param reference: a file id, or the path to a file; the reference itself is not returned
+        :type reference: int
+        :param k: the number of files to return
+        :type k: int
+        :return: (file id, similarity) pairs, most similar first
+        :type return: list
+        """
+
+        model = self._get_tfidf()
+
+        if isinstance(reference, int):
+            reference_id: int | None = reference
+            reference_path = self.files[reference]['path']
+        else:
+            reference_path = Path(reference)
+            reference_id = next(
+                (
+                    file_id
+                    for file_id, row in self._tfidf_rows.items()
+                    if model.keys[row] == self._index_key(reference_path)
+                ),
+                None,
+            )
+
+        if reference_id in self._tfidf_rows:
+            vector = model.get_row(self._tfidf_rows[reference_id])
+        else:
+            vector = model.vectorize(count_terms(reference_path, encoding=self.encoding))
+
+        file_ids = {row: file_id for file_id, row in self._tfidf_rows.items()}
+        rows = [
+            self._tfidf_rows[file_id]
+            for file_id in set(self.aggregation) - {reference_id}
+            if file_id in self._tfidf_rows
+        ]
+
+        return [(file_ids[row], score) for row, score in model.most_similar(vector, k, rows)]
+
+    def similar_pairs(self, threshold: float = 0.5, block_size: int = 1000) -> list[tuple[int, int, float]]:
+        """
+        All pairs of files in the aggregation whose TF-IDF vectors have a cosine similarity of at least threshold,
+        computed as a blocked sparse matrix product. Needs a TF-IDF model (see build_tfidf).
+
+        :param threshold: the minimum cosine similarity
+        :type threshold: float
+        :param block_size: the number of files per block
+        :type block_size: int
+        :return: (file id, other file id, similarity) triples
+        :type return: list
+        """
+
+        model = self._get_tfidf()
+        file_ids = {row: file_id for file_id, row in self._tfidf_rows.items()}
+        rows = [self._tfidf_rows[file_id] for file_id in set(self.aggregation) if file_id in self._tfidf_rows]
+
+        return [
+            (file_ids[row], file_ids[other], score)
+            for row, other, score in model.iter_similar_pairs(threshold, rows, block_size)
+        ]
+
+    def _index_key(self, path: Path) -> str:
+        """
+        :param path: path to a textfile
+        :return: the key of the file in the metadata index; relative, so that the corpus can be moved
+        """
+        try:
+            return path.relative_to(self.directory).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _collect_metadata(
+        self, files: list[Path], signatures: list[FileSignature], workers: int
+    ) -> list[dict[str, Any]]:
+        """
+        Scan the given files, reusing the metadata index for files whose signature did not change.
+
+        :param files: paths to textfiles
+        :param signatures: the signatures of the files, taken before scanning
+        :param workers: the number of parallel workers
+        :return: the metadata of each file, in the order of files
+        """
+
+        metadata: list[dict[str, Any]] = [{} for _ in files]
+        to_scan = list(range(len(files)))
+
+        if self.metadata_index is not None:
+            fields = [*METADATA_FIELDS, *self.metadata_extractors]
+            keys = [self._index_key(file) for file in files]
+            cached = self.metadata_index.load(keys)
+            to_scan = []
+
+            for i, key in enumerate(keys):
+                entry = cached.get(key)
+
+                if entry is not None and entry[0] == signatures[i] and all(field in entry[1] for field in fields):
+                    metadata[i] = entry[1]
+                else:
+                    to_scan.append(i)
+
+        # One read per file for all metadata; results arrive in the order of to_scan
+        scan = partial(scan_file, encoding=self.encoding, extractors=self.metadata_extractors)
+        scanned = helpers.parallel_map(scan, [files[i] for i in to_scan], workers=workers, pool=self.pool)
+
+        for i, file_metadata in zip(to_scan, tqdm(scanned, total=len(to_scan), disable=self.disable_tqdm), strict=True):
+            metadata[i] = file_metadata
+
+        if self.metadata_index is not None and to_scan:
+            self.metadata_index.store((self._index_key(files[i]), signatures[i], metadata[i]) for i in to_scan)
+
+        return metadata
+
+    def _get_metadata(
+        self, files: list[Path], signatures: list[FileSignature], fast: bool, workers: int
+    ) -> list[dict[str, Any]]:
+        """
+        :param files: paths to textfiles
+        :param signatures: the signatures of the files
+        :param fast: skip the metadata collection
+        :param workers: the number of parallel workers
+        :return: the metadata of each file, in the order of files
+        """
+        if fast:
+            # The size is known from discovery, so that the stat filters need no metadata
+            empty = dict.fromkeys([*METADATA_FIELDS, *self.metadata_extractors], False)
+            return [empty | {'size': signature.size} for signature in signatures]
+
+        return self._collect_metadata(files, signatures, workers)
+
+    def _discover_files(self, **options: Any) -> Iterator[DiscoveredFile]:
+        """
+        :param options: the discovery options (see discovery.discover_files)
+        :return: an iterator over all matching files with their signatures, as they are found
+        """
+
+        # The index (and its journal) must not be loaded as a text file itself
+        exclude = list(options.pop('exclude', None) or [])
+        if self.metadata_index is not None:
+            exclude.append(f'{self.metadata_index.path.name}*')
+        if self.inverted_index is not None:
+            exclude.append(f'{self.inverted_index.path.name}*')
+        exclude.append(TfidfModel.DEFAULT_FILENAME)
+
+        return discover_files(self.directory, exclude=exclude, **options)
 
     def get_text(self, file_id: int) -> str:
         """
@@ -162,8 +708,9 @@ class TextDirectory:
         """
 
         # Checked against the sentinel, so that an empty transformation result is returned as-is
-        if self.files[file_id]['transformed_text'] is not False:
-            return self.files[file_id]['transformed_text']
+        transformed_text = self.files[file_id]['transformed_text']
+        if transformed_text is not False:
+            return transformed_text
         else:
             with self.files[file_id]['path'].open(encoding=self.encoding, errors='ignore') as f:
                 return f.read()
@@ -172,61 +719,100 @@ class TextDirectory:
         self,
         recursive: bool = True,
         sort: bool = True,
-        filetype: str = 'txt',
+        filetype: str | list[str] = 'txt',
         fast: bool = False,
         skip_checkpoint: bool = False,
+        workers: int | None = None,
+        metadata_index: bool | str | Path = False,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        min_kb: float | None = None,
+        max_kb: float | None = None,
+        sample: int | None = None,
+        seed: int | None = None,
+        stratify: bool = False,
     ) -> None:
         """
         :param recursive: recursive search
         :type recursive: bool
         :param sort: sort the files by name
         :type sort: bool
-        :param filetype: filetype to look for (e.g. txt)
+        :param filetype: filetype(s) to look for (e.g. txt, 'txt,md' or ['txt', 'md']); '*' for any
         :type filetype: str
-        :param fast: load files faster without getting metadata
+        :param fast: load files faster by deferring the metadata collection until a filter needs it
         :type fast: bool
+        :param workers: the number of parallel workers collecting metadata (default: self.workers)
+        :type workers: int
+        :param metadata_index: True or a path to reuse the metadata of unchanged files from a persistent index
+        :type metadata_index: bool
+        :param include: glob patterns (name or relative path); only matching files are loaded
+        :type include: list
+        :param exclude: glob patterns (name or relative path); matching files and directories are skipped
+        :type exclude: list
+        :param min_kb: the minimum number of kB a file needs to have
+        :type min_kb: float
+        :param max_kb: the maximum number of kB a file is allowed to have
+        :type max_kb: float
+        :param sample: only load a random sample of this many files, drawn while the directory is walked
+        :type sample: int
+        :param seed: the seed of the sample
+        :type seed: int
+        :param stratify: sample every directory in proportion to the number of its files; up to 10 * sample files
+            (and a counter per directory) are kept in memory while the directory is walked
+        :type stratify: bool
         """
 
-        if recursive:
-            if filetype == '*':
-                files = list(self.directory.glob('**/*.*'))
-            else:
-                files = list(self.directory.glob('**/*.' + filetype))
+        if workers is None:
+            workers = self.workers
+
+        if metadata_index:
+            self.open_metadata_index(None if metadata_index is True else metadata_index)
+
+        discovery_options = {
+            'recursive': recursive,
+            'filetype': filetype,
+            'include': include,
+            'exclude': exclude,
+            'min_size': None if min_kb is None else min_kb * 1024,
+            'max_size': None if max_kb is None else max_kb * 1024,
+        }
+        if sample is None:
+            discovered = list(self._discover_files(**discovery_options))
+        elif stratify:
+            discovered = helpers.stratified_sample(
+                self._discover_files(**discovery_options),
+                int(sample),
+                key=lambda discovered_file: discovered_file.path.parent,
+                rng=random.Random(seed),
+            )
         else:
-            if filetype == '*':
-                files = list(self.directory.glob('*.*'))
-            else:
-                files = list(self.directory.glob('*.' + filetype))
+            discovered = helpers.reservoir_sample(
+                self._discover_files(**discovery_options), int(sample), rng=random.Random(seed)
+            )
 
-        if len(files) > 0:
+        if len(discovered) > 0:
             if sort:
-                files.sort()
-
-            for file in tqdm(files, disable=self.disable_tqdm):
-                file = Path(file)
-
-                if fast:
-                    file_with_meta = {
-                        'path': file,
-                        'filename': file.name,
-                        'characters': False,
-                        'tokens': False,
-                        'transformed_text': False,
-                    }
-                else:
-                    file_with_meta = {
-                        'path': file,
-                        'filename': file.name,
-                        'characters': self.get_file_length(file),
-                        'tokens': self.get_file_tokens(file),
-                        'transformed_text': False,
-                    }
+                discovered.sort(key=lambda discovered_file: discovered_file.path)
+
+            files = [discovered_file.path for discovered_file in discovered]
+            signatures = [discovered_file.signature for discovered_file in discovered]
+            metadata = self._get_metadata(files, signatures, fast, workers)
+
+            for file, signature, file_metadata in zip(files, signatures, metadata, strict=True):
+                file_with_meta: dict[str, Any] = {'path': file, 'filename': file.name}
+                file_with_meta.update(file_metadata)
+
+                file_with_meta['transformed_text'] = False
 
-                self.files.append(file_with_meta)
-                self.filenames.append(file.name)
+                self.files.append(file_with_meta, signature)
+
+            self._load_options = {'discovery': discovery_options, 'sort': sort, 'fast': fast, 'sample': sample}
 
             # Initial population of self.aggregation
-            self.set_aggregation(self.files)
+            self.aggregation = [file_id for file_id in range(len(self.files)) if file_id not in self.tombstones]
+
+            if self.inverted_index is not None:
+                self.update_inverted_index(workers)
 
             # Initial checkpoint
             if not skip_checkpoint:
@@ -237,22 +823,174 @@ class TextDirectory:
                 f'{"" if recursive else " (searched non-recursively)"}.'
             )
 
+    def refresh(self, workers: int | None = None) -> RefreshResult:
+        """
+        Pick up files that were added, removed, or modified since the files were loaded.
+
+        New files are appended to the file records and to every state that has no filters applied (including the
+        current aggregation, if it is unfiltered). Removed files are tombstoned: their records stay, so that file ids
+        remain stable, but they are dropped from the aggregation and from all saved states. Modified files keep their
+        place in the aggregation; only their metadata is collected again.
+
+        :param workers: the number of parallel workers collecting metadata (default: self.workers)
+        :type workers: int
+        :return: the ids of the added, removed, and modified files
+        :type return: RefreshResult
+        """
+
+        if self._load_options is None:
+            raise ValueError('There is nothing to refresh; load the files with load_files() first.')
+
+        if self._load_options['sample'] is not None:
+            raise ValueError('A sample cannot be refreshed, since new files would not be sampled; use restat().')
+
+        if workers is None:
+            workers = self.workers
+
+        discovered = list(self._discover_files(**self._load_options['discovery']))
+        if self._load_options['sort']:
+            discovered.sort(key=lambda discovered_file: discovered_file.path)
+
+        known = {file['path']: file_id for file_id, file in enumerate(self.files) if file_id not in self.tombstones}
+        discovered_paths = {discovered_file.path for discovered_file in discovered}
+
+        removed = [file_id for path, file_id in known.items() if path not in discovered_paths]
+        modified: list[int] = []
+        modified_signatures: list[FileSignature] = []
+        new_files: list[Path] = []
+        new_signatures: list[FileSignature] = []
+
+        for path, signature in discovered:
+            if path not in known:
+                new_files.append(path)
+                new_signatures.append(signature)
+            elif signature != self.files.get_signature(known[path]):
+                modified.append(known[path])
+                modified_signatures.append(signature)
+
+        return self._apply_changes(removed, modified, modified_signatures, new_files, new_signatures, workers)
+
+    def restat(self, workers: int | None = None) -> RefreshResult:
+        """
+        Stat the loaded files again. The stat filters (file size, modification time) work with the signatures taken
+        when the files were discovered; this brings them up to date without searching the directory for new files.
+        Files whose size or modification time changed are treated as modified, files that are gone as removed (see
+        refresh()).
+
+        :param workers: the number of parallel workers (threads for the stat calls; default: self.workers)
+        :type workers: int
+        :return: the ids of the removed and modified files (no files are added)
+        :type return: RefreshResult
+        """
+
+        if self._load_options is None:
+            raise ValueError('There is nothing to restat; load the files with load_files() first.')
+
+        if workers is None:
+            workers = self.workers
+
+        file_ids = [file_id for file_id in range(len(self.files)) if file_id not in self.tombstones]
+        signatures = helpers.parallel_map(
+            _get_signature_if_exists, [self.files[file_id]['path'] for file_id in file_ids], workers, pool='thread'
+        )
+
+        removed: list[int] = []
+        modified: list[int] = []
+        modified_signatures: list[FileSignature] = []
+        for file_id, signature in zip(file_ids, signatures, strict=True):
+            discovered = self.files.get_signature(file_id)
+            if signature is None:
+                removed.append(file_id)
+            # Only size and mtime are compared: discovery takes the inode from os.scandir, which reports 0 on Windows
+            elif signature[:2] != discovered[:2]:
+                modified.append(file_id)
+                modified_signatures.append(signature._replace(inode=discovered.inode))
+
+        return self._apply_changes(removed, modified, modified_signatures, [], [], workers)
+
+    def _apply_changes(
+        self,
+        removed: list[int],
+        modified: list[int],
+        modified_signatures: list[FileSignature],
+        new_files: list[Path],
+        new_signatures: list[FileSignature],
+        workers: int,
+    ) -> RefreshResult:
+        """
+        Update the file records, the states, and the indexes for files that were removed, modified, or added.
+
+        :param removed: the ids of the removed files
+        :param modified: the ids of the modified files
+        :param modified_signatures: their new signatures
+        :param new_files: paths to the added files
+        :param new_signatures: their signatures
+        :param workers: the number of parallel workers collecting metadata
+        :return: the ids of the added, removed, and modified files
+        """
+
+        assert self._load_options is not None
+
+        metadata = self._get_metadata(
+            [self.files[file_id]['path'] for file_id in modified] + new_files,
+            modified_signatures + new_signatures,
+            self._load_options['fast'],
+            workers,
+        )
+
+        for file_id, signature, file_metadata in zip(modified, modified_signatures, metadata, strict=False):
+            self.files[file_id].update(dict.fromkeys(self.CACHED_FIELDS, False) | file_metadata)
+            self.files[file_id]['transformed_text'] = False
+            self.files.set_signature(file_id, signature)
+
+        for file_id in [*modified, *removed]:
+            if file_id in self.lsh_index:
+                self.lsh_index.remove(file_id)
+            # Their rows in the TF-IDF model are outdated; they are scored like unknown files until it is rebuilt
+            self._tfidf_rows.pop(file_id, None)
+
+        added = list(range(len(self.files), len(self.files) + len(new_files)))
+        for file, signature, file_metadata in zip(new_files, new_signatures, metadata[len(modified) :], strict=True):
+            self.files.append({'path': file, **file_metadata}, signature)
+
+        if removed:
+            self.tombstones.update(removed)
+            if self.metadata_index is not None:
+                self.metadata_index.remove(self._index_key(self.files[file_id]['path']) for file_id in removed)
+
+        # File ids are stable, so remapping the states means dropping the removed and adding the new files
+        removed_ids = set(removed)
+        self.aggregation_states = [
+            AggregationState(
+                PackedIds.pack(
+                    [file_id for file_id in state.aggregation if file_id not in removed_ids]
+                    + (added if not state.applied_filters else [])
+                ),
+                state.applied_filters,
+            )
+            for state in self.aggregation_states
+        ]
+        self.aggregation = [file_id for file_id in self.aggregation if file_id not in removed_ids]
+        if not self.applied_filters:
+            self.aggregation.extend(added)
+
+        if self.inverted_index is not None:
+            self.update_inverted_index(workers)
+
+        return RefreshResult(added, removed, modified)
+
     @filter
     def filter_by_max_chars(self, max_chars: int = 100) -> None:
         """
         :param max_chars: the maximum number of characters a file can have
         :type max_chars: int
         :human_name: Maximum characters
+        :cost: metadata
         """
 
-        self._require_metadata('characters')
-
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if file['characters'] <= int(max_chars):
-                new_aggregation.append(file)
+        self._ensure_metadata('characters')
 
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self.files.select(self.aggregation, 'characters', maximum=int(max_chars))
 
     @filter
     def filter_by_min_chars(self, min_chars: int = 100) -> None:
@@ -260,16 +998,12 @@ class TextDirectory:
         :param min_chars: the minimum number of characters a file can have
         :type min_chars: int
         :human_name: Minimum characters
+        :cost: metadata
         """
 
-        self._require_metadata('characters')
+        self._ensure_metadata('characters')
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if file['characters'] >= int(min_chars):
-                new_aggregation.append(file)
-
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self.files.select(self.aggregation, 'characters', minimum=int(min_chars))
 
     @filter
     def filter_by_max_tokens(self, max_tokens: int = 100) -> None:
@@ -277,16 +1011,12 @@ class TextDirectory:
         :param max_tokens: the maximum number of tokens a file can have
         :type max_tokens: int
         :human_name: Maximum tokens
+        :cost: metadata
         """
 
-        self._require_metadata('tokens')
-
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if file['tokens'] <= int(max_tokens):
-                new_aggregation.append(file)
+        self._ensure_metadata('tokens')
 
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self.files.select(self.aggregation, 'tokens', maximum=int(max_tokens))
 
     @filter
     def filter_by_min_tokens(self, min_tokens: int = 1) -> None:
@@ -294,16 +1024,12 @@ class TextDirectory:
         :param min_tokens: the minimum number of tokens a file can have
         :type min_tokens: int
         :human_name: Minimum tokens
+        :cost: metadata
         """
 
-        self._require_metadata('tokens')
-
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if file['tokens'] >= int(min_tokens):
-                new_aggregation.append(file)
+        self._ensure_metadata('tokens')
 
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self.files.select(self.aggregation, 'tokens', minimum=int(min_tokens))
 
     @filter
     def filter_by_contains(self, contains: str) -> None:
@@ -311,16 +1037,10 @@ class TextDirectory:
         :param contains: A string that needs to be present in the file
         :type contains: str
         :human_name: Contains string
+        :cost: content
         """
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            with open(file['path'], encoding=self.encoding, errors='ignore') as f:
-                fr = f.read()
-                if contains in fr:
-                    new_aggregation.append(file)
-
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self._scan_content([self._contains_predicate(contains)])[0]
 
     @filter
     def filter_by_not_contains(self, not_contains: str) -> None:
@@ -328,16 +1048,128 @@ class TextDirectory:
         :param not_contains: A string that is not allowed to be present in the file
         :type not_contains: str
         :human_name: Does not contain string
+        :cost: content
         """
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            with open(file['path'], encoding=self.encoding, errors='ignore') as f:
-                fr = f.read()
-                if not_contains not in fr:
-                    new_aggregation.append(file)
+        self.aggregation = self._scan_content([self._not_contains_predicate(not_contains)])[0]
+
+    @filter
+    def filter_by_contains_any(
+        self, keywords: Iterable[str] | None = None, keywords_file: str | Path | None = None
+    ) -> None:
+        """
+        :param keywords: strings of which at least one needs to be present in the file
+        :type keywords: list
+        :param keywords_file: a file with further keywords, one per line (see helpers.load_keywords)
+        :type keywords_file: str
+        :human_name: Contains any keyword
+        :cost: content
+        """
+
+        self.aggregation = self._scan_content([self._contains_any_predicate(keywords, keywords_file)])[0]
+
+    @filter
+    def filter_by_contains_all(
+        self, keywords: Iterable[str] | None = None, keywords_file: str | Path | None = None
+    ) -> None:
+        """
+        :param keywords: strings that all need to be present in the file
+        :type keywords: list
+        :param keywords_file: a file with further keywords, one per line (see helpers.load_keywords)
+        :type keywords_file: str
+        :human_name: Contains all keywords
+        :cost: content
+        """
+
+        self.aggregation = self._scan_content([self._contains_all_predicate(keywords, keywords_file)])[0]
+
+    @filter
+    def filter_by_contains_none(
+        self, keywords: Iterable[str] | None = None, keywords_file: str | Path | None = None
+    ) -> None:
+        """
+        :param keywords: strings of which none is allowed to be present in the file
+        :type keywords: list
+        :param keywords_file: a file with further keywords, one per line (see helpers.load_keywords)
+        :type keywords_file: str
+        :human_name: Contains none of the keywords
+        :cost: content
+        """
+
+        self.aggregation = self._scan_content([self._contains_none_predicate(keywords, keywords_file)])[0]
+
+    @filter
+    def filter_by_regex(self, pattern: str, ignore_case: bool = False) -> None:
+        """
+        Keep the files in which a regular expression matches. Files are read in overlapping chunks (see
+        search.file_matches), so that large files are never loaded at once; with workers > 1, they are searched in
+        parallel.
+
+        :param pattern: the regular expression
+        :type pattern: str
+        :param ignore_case: match case-insensitively
+        :type ignore_case: bool
+        :human_name: Matches regular expression
+        :cost: content
+        """
+
+        self.aggregation = self._scan_content([self._regex_predicate(pattern, ignore_case)])[0]
 
-        self.set_aggregation(new_aggregation)
+    @filter
+    def filter_by_not_regex(self, pattern: str, ignore_case: bool = False) -> None:
+        """
+        Keep the files in which a regular expression does not match (see filter_by_regex).
+
+        :param pattern: the regular expression
+        :type pattern: str
+        :param ignore_case: match case-insensitively
+        :type ignore_case: bool
+        :human_name: Does not match regular expression
+        :cost: content
+        """
+
+        self.aggregation = self._scan_content([self._not_regex_predicate(pattern, ignore_case)])[0]
+
+    @filter
+    def filter_by_term(self, term: str) -> None:
+        """
+        Keep the files that contain a word (case-insensitive, whole words only). Needs an inverted index.
+
+        :param term: the word
+        :type term: str
+        :human_name: Contains term (index)
+        :cost: index
+        """
+
+        self._filter_by_inverted_index(self._get_inverted_index().search_term(term))
+
+    @filter
+    def filter_by_phrase(self, phrase: str) -> None:
+        """
+        Keep the files that contain a sequence of words (case-insensitive, ignoring punctuation). Needs an inverted
+        index.
+
+        :param phrase: the words
+        :type phrase: str
+        :human_name: Contains phrase (index)
+        :cost: index
+        """
+
+        self._filter_by_inverted_index(self._get_inverted_index().search_phrase(phrase))
+
+    @filter
+    def filter_by_query(self, query: str) -> None:
+        """
+        Keep the files that match a boolean query of terms and "quoted phrases" combined with AND, OR, NOT, and
+        parentheses, e.g. 'ship AND (space OR "deep sea") NOT whale'. Needs an inverted index.
+
+        :param query: the query
+        :type query: str
+        :human_name: Query (index)
+        :cost: index
+        """
+
+        self._filter_by_inverted_index(self._get_inverted_index().search(query))
 
     @filter
     def filter_by_filename_not_contains(self, not_contains: str) -> None:
@@ -345,14 +1177,11 @@ class TextDirectory:
         :param not_contains: A string that needs not to be present in the filename
         :type not_contains: str
         :human_name: Filename does not contain string
+        :cost: filename
         """
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if not_contains not in file['path'].name:
-                new_aggregation.append(file)
-
-        self.set_aggregation(new_aggregation)
+        names = self.files.names
+        self.aggregation = [file_id for file_id in self.aggregation if not_contains not in names[file_id]]
 
     @filter
     def filter_by_filename_contains(self, contains: str) -> None:
@@ -360,20 +1189,18 @@ class TextDirectory:
         :param contains: A string that needs to be present in the filename
         :type contains: str
         :human_name: Filename contains string
+        :cost: filename
         """
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if contains in file['path'].name:
-                new_aggregation.append(file)
-
-        self.set_aggregation(new_aggregation)
+        names = self.files.names
+        self.aggregation = [file_id for file_id in self.aggregation if contains in names[file_id]]
 
     @filter
     def filter_by_filenames(self, filenames: list[str]) -> None:
         """
         :param filenames: A list of filenames to include
         :type filenames: list
+        :cost: filename
         """
 
         # A single filename is accepted too; without this it would be treated as a
@@ -381,12 +1208,9 @@ class TextDirectory:
         if isinstance(filenames, str):
             filenames = [filenames]
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if file['filename'] in filenames:
-                new_aggregation.append(file)
-
-        self.set_aggregation(new_aggregation)
+        names = self.files.names
+        wanted = set(filenames)
+        self.aggregation = [file_id for file_id in self.aggregation if names[file_id] in wanted]
 
     @filter
     def filter_by_random_sampling(self, n: int | str, replace: bool = False) -> None:
@@ -396,6 +1220,7 @@ class TextDirectory:
         :param replace: Should valued be replaced
         :type replace: bool
         :human_name: Random sampling
+        :cost: barrier
         """
 
         if replace:
@@ -409,75 +1234,307 @@ class TextDirectory:
         :param sigmas: The number of stds that qualifies an outlier.
         :type sigmas: int
         :human_name: Character outliers
+        :cost: barrier
         """
 
-        self._require_metadata('characters')
+        self._ensure_metadata('characters')
 
-        chars_list = [file['characters'] for file in self.get_aggregation()]
-        std = statistics.pstdev(chars_list)
-        mean = statistics.fmean(chars_list)
-        min = round(mean - sigmas * std, 1)
-        max = round(mean + sigmas * std, 1)
+        mean, std, min, max = helpers.outlier_bounds(self._get_metric_values('characters'), sigmas, 'sigma')
+        min = round(min, 1)
+        max = round(max, 1)
 
-        self.filter_by_min_chars(min)
-        self.filter_by_max_chars(max)
+        self.aggregation = self.files.select(self.aggregation, 'characters', int(min), int(max))
 
         return std, mean, min, max
 
+    @filter
+    def filter_by_percentile(
+        self, metric: str = 'tokens', lower: float = 5.0, upper: float = 95.0
+    ) -> tuple[float, float]:
+        """
+        Keep the files between two percentiles of a metric, e.g. the 5th to the 95th percentile by tokens.
+
+        :param metric: [characters, tokens, size, ttr] the metric
+        :type metric: str
+        :param lower: the lower percentile (0 to 100)
+        :type lower: float
+        :param upper: the upper percentile (0 to 100)
+        :type upper: float
+        :return: the values of the lower and the upper percentile
+        :type return: tuple
+        :human_name: Percentile range
+        :cost: barrier
+        """
+
+        self._ensure_metric(metric)
+
+        values = sorted(self._get_metric_values(metric))
+        minimum, maximum = helpers.percentile(values, float(lower)), helpers.percentile(values, float(upper))
+
+        self.aggregation = self.files.select(self.aggregation, metric, minimum, maximum)
+
+        return minimum, maximum
+
+    @filter
+    def filter_by_outliers(
+        self, metric: str = 'tokens', threshold: float = 3.0, method: str = 'mad'
+    ) -> tuple[float, ...]:
+        """
+        Drop the files whose metric lies more than threshold spreads from the center, e.g. beyond 3 MAD.
+
+        :param metric: [characters, tokens, size, ttr] the metric
+        :type metric: str
+        :param threshold: the number of spreads that qualifies an outlier
+        :type threshold: float
+        :param method: [mad, sigma] median and (scaled) median absolute deviation, or mean and standard deviation
+        :type method: str
+        :return: the center, the spread, and the lowest and highest value that are kept
+        :type return: tuple
+        :human_name: Outliers
+        :cost: barrier
+        """
+
+        self._ensure_metric(metric)
+
+        bounds = helpers.outlier_bounds(self._get_metric_values(metric), float(threshold), method)
+
+        self.aggregation = self.files.select(self.aggregation, metric, bounds[2], bounds[3])
+
+        return bounds
+
+    def _ensure_metric(self, metric: str) -> None:
+        """
+        :param metric: a metric of the distribution filters (see DISTRIBUTION_METRICS)
+        """
+
+        if metric not in self.DISTRIBUTION_METRICS:
+            raise ValueError(f'Unknown metric {metric!r}; expected one of {list(self.DISTRIBUTION_METRICS)}.')
+
+        if metric == 'ttr':
+            self._ensure_type_token_ratios()
+        else:
+            self._ensure_metadata(metric)
+
+    def _get_metric_values(self, metric: str) -> list[float]:
+        """
+        :param metric: a metric whose values the files in the aggregation have
+        :return: the values, read straight from the column
+        """
+        return list(map(self.files.get_column(metric).__getitem__, self.aggregation))
+
+    def _ensure_type_token_ratios(self) -> None:
+        """Derive the type-token ratios the files in the aggregation lack from their type and token counts."""
+        self._ensure_metadata('types')
+
+        for file_id in dict.fromkeys(self.aggregation):
+            file = self.files[file_id]
+            if file.get('ttr', False) is False:
+                file['ttr'] = round(file['types'] / file['tokens'], 2) if file['tokens'] else 0.0
+
     @filter
     def filter_by_max_filesize(self, max_kb: int = 100) -> None:
         """
-        :param max_mb: The maximum number of kB a file is allowed to have.
-        :type max_mb: int
+        Sizes are taken when the files are discovered; see restat().
+
+        :param max_kb: The maximum number of kB a file is allowed to have.
+        :type max_kb: int
         :human_name: Maximum filesize
+        :cost: stat
         """
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if os.stat(file['path']).st_size / 1024 <= max_kb:
-                new_aggregation.append(file)
+        self._ensure_metadata('size')
 
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self.files.select(self.aggregation, 'size', maximum=max_kb * 1024)
 
     @filter
     def filter_by_min_filesize(self, min_kb: int = 10) -> None:
         """
-        :param max_mb: The minimum number of kB a file is allowed to have.
-        :type max_mb: int
+        Sizes are taken when the files are discovered; see restat().
+
+        :param min_kb: The minimum number of kB a file is allowed to have.
+        :type min_kb: int
         :human_name: Minimum Filesize
+        :cost: stat
         """
 
-        new_aggregation: list[dict[str, Any]] = []
-        for file in self.get_aggregation():
-            if os.stat(file['path']).st_size / 1024 >= min_kb:
-                new_aggregation.append(file)
+        self._ensure_metadata('size')
 
-        self.set_aggregation(new_aggregation)
+        self.aggregation = self.files.select(self.aggregation, 'size', minimum=min_kb * 1024)
 
     @filter
-    def filter_by_similar_documents(self, reference_file: str | Path, threshold: float = 0.8) -> None:
+    def filter_by_mtime(
+        self, min_mtime: float | str | datetime | None = None, max_mtime: float | str | datetime | None = None
+    ) -> None:
         """
+        Modification times are taken when the files are discovered; see restat().
+
+        :param min_mtime: the earliest modification time (a timestamp, a datetime, or an ISO 8601 string)
+        :type min_mtime: float
+        :param max_mtime: the latest modification time (a timestamp, a datetime, or an ISO 8601 string)
+        :type max_mtime: float
+        :human_name: Modification time
+        :cost: stat
+        """
+
+        self.aggregation = self.files.select(
+            self.aggregation,
+            'mtime_ns',
+            minimum=None if min_mtime is None else helpers.to_nanoseconds_bound(helpers.to_timestamp(min_mtime)),
+            maximum=None if max_mtime is None else helpers.to_nanoseconds_bound(helpers.to_timestamp(max_mtime), True),
+        )
+
+    @filter
+    def filter_by_similar_documents(
+        self, reference_file: str | Path, threshold: float = 0.8, method: str = 'difflib'
+    ) -> None:
+        """
+        With method='minhash', the threshold is the estimated Jaccard similarity of the character shingles of both
+        texts. The MinHash signatures of the files are computed once and kept in the file records (and the metadata
+        index), and candidates are looked up in an LSH index instead of comparing every file.
+
         :param reference_file: Path to the reference file
         :type reference_file: str
         :param threshold: A value between 0.0 and 1.0 indicating the max. difference between the file and the reference.
         :type threshold: float
+        :param method: [difflib, minhash] how the similarity is measured
+        :type method: str
         :human_name: Similar documents
+        :cost: similarity
+        """
+
+        if method == 'minhash':
+            if not 0.0 <= threshold <= 1.0:
+                raise ValueError(f'The threshold must be between 0.0 and 1.0, got {threshold!r}.')
+
+            self._ensure_minhashes()
+            reference = minhash_file(reference_file, encoding=self.encoding)
+
+            if threshold >= LSH_MIN_THRESHOLD:
+                matches = self.lsh_index.query(reference, threshold)
+            else:
+                matches = {
+                    file_id
+                    for file_id in set(self.aggregation)
+                    if estimate_jaccard(reference, self.lsh_index.signatures[file_id]) >= threshold
+                }
+
+            self.aggregation = [file_id for file_id in self.aggregation if file_id in matches]
+            return
+
+        self.aggregation = self._scan_content([self._similar_documents_predicate(reference_file, threshold, method)])[0]
+
+    @filter
+    def filter_by_most_similar(self, reference_file: str | Path, k: int = 100) -> None:
+        """
+        Keep the k files most similar to a reference file (by TF-IDF cosine similarity; see most_similar). A TF-IDF
+        model of the aggregation is built if there is none.
+
+        :param reference_file: Path to the reference file
+        :type reference_file: str
+        :param k: the number of files to keep
+        :type k: int
+        :human_name: Most similar documents
+        :cost: barrier
+        """
+
+        if self.tfidf is None:
+            self.build_tfidf()
+
+        most_similar = {file_id for file_id, _ in self.most_similar(reference_file, int(k))}
+        self.aggregation = [file_id for file_id in self.aggregation if file_id in most_similar]
+
+    @filter
+    def filter_by_near_duplicates(self, threshold: float = 0.8) -> None:
+        """
+        Keep one file (the first in the aggregation) of every cluster of near-duplicates, i.e. of files whose
+        estimated Jaccard similarity (see filter_by_similar_documents with method='minhash') is at least threshold.
+
+        :param threshold: the similarity from which on two files are near-duplicates
+        :type threshold: float
+        :human_name: Near-duplicates
+        :cost: barrier
         """
 
         if not 0.0 <= threshold <= 1.0:
             raise ValueError(f'The threshold must be between 0.0 and 1.0, got {threshold!r}.')
 
-        new_aggregation: list[dict[str, Any]] = []
-        with open(reference_file, encoding=self.encoding, errors='ignore') as rf:
-            reference = rf.read()
-            for file in self.get_aggregation():
-                with open(file['path'], encoding=self.encoding, errors='ignore') as ft:
-                    target = ft.read()
-                    d = difflib.SequenceMatcher(None, reference, target)
-                    if d.ratio() >= threshold:
-                        new_aggregation.append(file)
+        self._ensure_minhashes()
 
-        self.set_aggregation(new_aggregation)
+        file_ids = list(dict.fromkeys(self.aggregation))
+        positions = {file_id: position for position, file_id in enumerate(file_ids)}
+        signatures = self.lsh_index.signatures
+
+        if threshold >= LSH_MIN_THRESHOLD:
+            pairs: Iterable[tuple[int, int]] = self.lsh_index.candidate_pairs(file_ids)
+        else:
+            pairs = combinations(file_ids, 2)
+
+        # Union-find over the positions in the aggregation; the root of a cluster is its first file
+        parents = list(range(len(file_ids)))
+
+        def find(position: int) -> int:
+            while parents[position] != position:
+                parents[position] = parents[parents[position]]
+                position = parents[position]
+            return position
+
+        for a, b in pairs:
+            if estimate_jaccard(signatures[a], signatures[b]) >= threshold:
+                root_a, root_b = find(positions[a]), find(positions[b])
+                parents[max(root_a, root_b)] = min(root_a, root_b)
+
+        representatives = {file_id for position, file_id in enumerate(file_ids) if find(position) == position}
+        self.aggregation = [file_id for file_id in self.aggregation if file_id in representatives]
+
+    @filter
+    def filter_by_unique_content(self, strategy: str = 'first') -> None:
+        """
+        Remove byte-identical files. Files are grouped by size first, so that files with a unique size are never
+        read; the others are hashed in parallel. Hashes are kept in the file records.
+
+        :param strategy: [first, last, drop] keep the first or the last file of every group of duplicates, or drop
+            all files that have a duplicate
+        :type strategy: str
+        :human_name: Unique content
+        :cost: barrier
+        """
+
+        if strategy not in ('first', 'last', 'drop'):
+            raise ValueError(f'Unknown strategy {strategy!r}; use first, last, or drop.')
+
+        sizes = self.files.signatures['size']
+        by_size: dict[int, list[int]] = {}
+        for file_id in dict.fromkeys(self.aggregation):
+            by_size.setdefault(sizes[file_id], []).append(file_id)
+
+        candidates = [file_id for group in by_size.values() if len(group) > 1 for file_id in group]
+        missing = [file_id for file_id in candidates if self.files[file_id]['hash'] is False]
+
+        if missing:
+            hashes = helpers.parallel_map(
+                hash_file, [self.files[file_id]['path'] for file_id in missing], workers=self.workers, pool=self.pool
+            )
+            for file_id, file_hash in zip(
+                missing, tqdm(hashes, total=len(missing), disable=self.disable_tqdm), strict=True
+            ):
+                self.files[file_id]['hash'] = file_hash
+
+            self._store_cached_fields(missing)
+
+        by_content: dict[tuple[int, str], list[int]] = {}
+        for file_id in candidates:
+            by_content.setdefault((sizes[file_id], self.files[file_id]['hash']), []).append(file_id)
+
+        removed: set[int] = set()
+        for group in by_content.values():
+            if strategy == 'first':
+                removed.update(group[1:])
+            elif strategy == 'last':
+                removed.update(group[:-1])
+            elif len(group) > 1:
+                removed.update(group)
+
+        self.aggregation = [file_id for file_id in self.aggregation if file_id not in removed]
 
     @filter
     def filter_by_type_token_ratio(self, min_ttr: float = 0.0, max_ttr: float = 1.0) -> None:
@@ -487,17 +1544,247 @@ class TextDirectory:
         :param max_ttr: The maximum TTR
         :type max_ttr: float
         :human_name: Type-Token Ratio
+        :cost: metadata
+        """
+
+        self._ensure_type_token_ratios()
+
+        self.aggregation = self.files.select(self.aggregation, 'ttr', min_ttr, max_ttr)
+
+    @filter
+    def filter_by_mattr(self, min_mattr: float = 0.0, max_mattr: float = 1.0, window: int = 500) -> None:
+        """
+        The moving-average type-token ratio does not depend on the length of a text. Files are streamed, so that
+        long files need not fit in memory.
+
+        :param min_mattr: The minimum MATTR
+        :type min_mattr: float
+        :param max_mattr: The maximum MATTR
+        :type max_mattr: float
+        :param window: The number of tokens per window
+        :type window: int
+        :human_name: Moving-average Type-Token Ratio
+        :cost: content
+        """
+
+        self.aggregation = self._scan_content([self._mattr_predicate(min_mattr, max_mattr, window)])[0]
+
+    def _encode_for_byte_search(self, string: str) -> bytes | None:
+        """
+        :param string: a string to search for
+        :return: the encoded string if searching the raw bytes finds the same files as searching the decoded text
+        """
+
+        # UTF-8 is self-synchronizing, so an encoded string cannot match across character boundaries; files that are
+        # not valid UTF-8 are checked again on a miss (see file_contains_utf8). Newlines are translated when
+        # decoding, so strings containing them need the decoded text.
+        if codecs.lookup(self.encoding).name != 'utf-8' or '\r' in string or '\n' in string:
+            return None
+
+        try:
+            return string.encode('utf-8')
+        except UnicodeEncodeError:
+            return None
+
+    def _contains_predicate(self, contains: str) -> ContentPredicate:
+        needle = self._encode_for_byte_search(contains)
+        if needle is not None:
+            return PathPredicate(partial(file_contains_utf8, needle=needle))
+
+        return lambda text: contains in text
+
+    def _not_contains_predicate(self, not_contains: str) -> ContentPredicate:
+        needle = self._encode_for_byte_search(not_contains)
+        if needle is not None:
+            return PathPredicate(partial(file_contains_utf8, needle=needle), expected=False)
+
+        return lambda text: not_contains not in text
+
+    def _regex_predicate(self, pattern: str, ignore_case: bool = False) -> ContentPredicate:
+        compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        return PathPredicate(partial(file_matches, pattern=compiled, encoding=self.encoding))
+
+    def _not_regex_predicate(self, pattern: str, ignore_case: bool = False) -> ContentPredicate:
+        compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        return PathPredicate(partial(file_matches, pattern=compiled, encoding=self.encoding), expected=False)
+
+    def _get_keyword_automaton(
+        self, keywords: Iterable[str] | None, keywords_file: str | Path | None
+    ) -> KeywordAutomaton:
+        # A single keyword is accepted too, and empty arguments are skipped (e.g. 'filter_by_contains_any,,words.txt')
+        if isinstance(keywords, str):
+            keywords = [keywords]
+
+        all_keywords = [keyword for keyword in keywords or [] if keyword]
+        if keywords_file:
+            all_keywords.extend(helpers.load_keywords(keywords_file, encoding=self.encoding))
+
+        return KeywordAutomaton(all_keywords)
+
+    def _contains_any_predicate(
+        self, keywords: Iterable[str] | None = None, keywords_file: str | Path | None = None
+    ) -> ContentPredicate:
+        return self._get_keyword_automaton(keywords, keywords_file).contains_any
+
+    def _contains_all_predicate(
+        self, keywords: Iterable[str] | None = None, keywords_file: str | Path | None = None
+    ) -> ContentPredicate:
+        return self._get_keyword_automaton(keywords, keywords_file).contains_all
+
+    def _contains_none_predicate(
+        self, keywords: Iterable[str] | None = None, keywords_file: str | Path | None = None
+    ) -> ContentPredicate:
+        automaton = self._get_keyword_automaton(keywords, keywords_file)
+        return lambda text: not automaton.contains_any(text)
+
+    def _similar_documents_predicate(
+        self, reference_file: str | Path, threshold: float = 0.8, method: str = 'difflib'
+    ) -> ContentPredicate:
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f'The threshold must be between 0.0 and 1.0, got {threshold!r}.')
+
+        if method not in ('difflib', 'minhash'):
+            raise ValueError(f'Unknown similarity method {method!r}; use difflib or minhash.')
+
+        with open(reference_file, encoding=self.encoding, errors='ignore') as rf:
+            reference = rf.read()
+
+        if method == 'minhash':
+            reference_signature = minhash(reference)
+            return lambda text: estimate_jaccard(reference_signature, minhash(text)) >= threshold
+
+        return lambda text: difflib.SequenceMatcher(None, reference, text).ratio() >= threshold
+
+    def _ensure_minhashes(self) -> None:
+        """Compute the MinHash signatures the files in the aggregation lack, and add all of them to the LSH index."""
+        file_ids = list(dict.fromkeys(self.aggregation))
+        missing = [file_id for file_id in file_ids if self.files[file_id].get('minhash', False) is False]
+
+        if missing:
+            signatures = helpers.parallel_map(
+                partial(minhash_file, encoding=self.encoding),
+                [self.files[file_id]['path'] for file_id in missing],
+                workers=self.workers,
+                pool=self.pool,
+            )
+            for file_id, signature in zip(
+                missing, tqdm(signatures, total=len(missing), disable=self.disable_tqdm), strict=True
+            ):
+                self.files[file_id]['minhash'] = signature
+
+            self._store_cached_fields(missing)
+
+        for file_id in file_ids:
+            if file_id not in self.lsh_index:
+                self.lsh_index.add(file_id, self.files[file_id]['minhash'])
+
+    def _store_cached_fields(self, file_ids: list[int]) -> None:
+        """
+        Write values computed after loading (see CACHED_FIELDS) to the metadata index, if one is open.
+
+        :param file_ids: the files whose values changed
+        """
+
+        if self.metadata_index is None:
+            return
+
+        fields = [*METADATA_FIELDS, *self.metadata_extractors]
+        entries = []
+        for file_id in file_ids:
+            file = self.files[file_id]
+            # Files loaded with fast=True have no complete metadata to cache yet
+            if any(file.get(field, False) is False for field in fields):
+                continue
+
+            metadata = {field: file.get(field, False) for field in [*fields, *self.CACHED_FIELDS]}
+            entries.append((self._index_key(file['path']), self.files.get_signature(file_id), metadata))
+
+        self.metadata_index.store(entries)
+
+    def _type_token_ratio_predicate(self, min_ttr: float = 0.0, max_ttr: float = 1.0) -> ContentPredicate:
+        return lambda text: min_ttr <= helpers.type_token_ratio(text) <= max_ttr
+
+    def _mattr_predicate(self, min_mattr: float = 0.0, max_mattr: float = 1.0, window: int = 500) -> ContentPredicate:
+        if int(window) < 1:
+            raise ValueError(f'The window needs at least one token, not {window}.')
+
+        return PathPredicate(
+            partial(
+                _mattr_within,
+                minimum=float(min_mattr),
+                maximum=float(max_mattr),
+                window=int(window),
+                encoding=self.encoding,
+            )
+        )
+
+    def _scan_content(self, predicates: list[ContentPredicate]) -> list[list[int]]:
+        """
+        Read every file in the aggregation once and evaluate a chain of predicates on its text.
+
+        A file that fails a predicate is not passed to the following ones, just as if the filters ran one after the
+        other. Files are only decoded if a predicate needs the text; PathPredicates get the path instead.
+
+        :param predicates: functions that take a text (or PathPredicates) and return whether the file passes
+        :type predicates: list
+        :return: the aggregation after each predicate
+        :type return: list
         """
 
-        new_aggregation: list[dict[str, Any]] = []
+        aggregations: list[list[int]] = [[] for _ in predicates]
+
+        # Chains that need no decoded text run in the worker pool
+        path_predicates = [predicate for predicate in predicates if isinstance(predicate, PathPredicate)]
+        if self.workers > 1 and len(path_predicates) == len(predicates):
+            count = partial(_count_passed_path_predicates, predicates=path_predicates)
+            paths = [file['path'] for file in self.get_aggregation()]
+            passed_counts = helpers.parallel_map(count, paths, workers=self.workers, pool=self.pool)
+
+            for file_id, passed in zip(self.aggregation, passed_counts, strict=True):
+                for aggregation in aggregations[:passed]:
+                    aggregation.append(file_id)
+
+            return aggregations
+
         for file in self.get_aggregation():
-            with open(file['path'], encoding=self.encoding, errors='ignore') as f:
-                ttr = helpers.type_token_ratio(f.read())
+            path = file['path']
+            text = None
 
-            if min_ttr <= ttr <= max_ttr:
-                new_aggregation.append(file)
+            for predicate, aggregation in zip(predicates, aggregations, strict=True):
+                if isinstance(predicate, PathPredicate):
+                    passed = predicate.function(path) == predicate.expected
+                else:
+                    if text is None:
+                        with open(path, encoding=self.encoding, errors='ignore') as f:
+                            text = f.read()
+                    passed = predicate(text)
+
+                if not passed:
+                    break
+                aggregation.append(file.file_id)
 
-        self.set_aggregation(new_aggregation)
+        return aggregations
+
+    def filter_content(self, filters: list[Any]) -> None:
+        """
+        Run several content filters in a single pass: every file is read once, and all filters are evaluated on its
+        text. A checkpoint is recorded for every filter, as if they ran one after the other.
+
+        :param filters: content filters (see CONTENT_PREDICATES) and their arguments
+        :type filters: list
+        """
+
+        for filter, *_ in filters:
+            if filter not in self.CONTENT_PREDICATES:
+                raise NameError(f'{filter!r} is not a content filter. Available: {list(self.CONTENT_PREDICATES)}')
+
+        # Built before reading anything, so that invalid arguments raise without recording a checkpoint
+        predicates = [getattr(self, self.CONTENT_PREDICATES[filter])(*args) for filter, *args in filters]
+
+        for (filter, *_), aggregation in zip(filters, self._scan_content(predicates), strict=True):
+            self.aggregation = aggregation
+            self.applied_filters.append(filter)
+            self.save_aggregation_state()
 
     def stage_transformation(self, transformation: list[Any]) -> None:
         """
@@ -538,35 +1825,224 @@ class TextDirectory:
         :return: the transformed text
         """
 
-        transformed_text = text
+        return transformations.run_transformations(text, self.staged_transformations)
+
+    def _read_text(self, file: FileRecord) -> str:
+        """
+        :param file: a file record
+        :return: the text of the file on disk
+        """
+        with file['path'].open(encoding=self.encoding, errors='ignore') as f:
+            return f.read()
 
-        for transformation, *args in self.staged_transformations:
-            transformation_method = getattr(transformations, transformation)
-            transformed_text = transformation_method(transformed_text, *args)
+    def _transform_aggregation(
+        self,
+        write: Callable[[Any, str], None],
+        workers: int | None,
+        ordered: bool,
+        queue_size: int,
+        chunk_size: int | None = None,
+    ) -> None:
+        """
+        Run the staged transformations on the files in the aggregation: the files are read ahead in a thread,
+        transformed by a pool of workers, and handed to write (in a writer thread) as they are done.
+
+        :param write: called with every file (or chunk) and its transformed text
+        :param workers: the number of parallel transformation workers (default: self.workers)
+        :param ordered: call write in the order of the aggregation
+        :param queue_size: the number of texts each stage of the pipeline may hold
+        :param chunk_size: transform chunks of the files of about this many characters instead of whole files
+        """
 
-        return transformed_text
+        items: Iterable[Any] = self.get_aggregation()
+        read: Callable[[FileRecord], str] | None = self._read_text
 
-    def run_filters(self, filters: list[Any]) -> None:
+        if chunk_size is not None:
+            # The chunks are read as the reader thread iterates over them, so that only a few are held at once
+            items = (
+                chunk
+                for file in self.get_aggregation()
+                for chunk in helpers.iter_file_chunks(file['path'], self.encoding, chunk_size)
+            )
+            read = None
+
+        engine.run_pipeline(
+            items,
+            read,
+            partial(transformations.run_transformations, staged_transformations=list(self.staged_transformations)),
+            write,
+            workers=self.workers if workers is None else workers,
+            ordered=ordered,
+            queue_size=queue_size,
+            pool=self.pool,
+        )
+
+    def run_filters(self, filters: list[Any], optimize: bool = False) -> None:
         """
         :param filters: A list of tuples with filters and their arguments.
         :type filters: list
+        :param optimize: run the filters in the order chosen by plan_filters instead of the given order
+        :type optimize: bool
         """
 
         available_filters = helpers.get_available_filters()
 
-        for filter, *args in filters:
+        for filter, *_ in filters:
             if filter not in available_filters:
                 raise NameError(f'{filter!r} is not a valid filter. Available: {available_filters}')
 
-            filter_method = getattr(self, filter)
-            filter_method(*args)
+        if optimize:
+            filters = [step.filter for step in self.plan_filters(filters)]
+
+        self._run_filter_sequence(filters)
+
+    def _is_fusable(self, filter: list[Any]) -> bool:
+        """Whether a filter can run as part of a fused content scan (see filter_content)."""
+        name, *args = filter
 
-    def transform_to_files(self, output_directory: str | Path) -> None:
+        # MinHash similarity uses the cached signatures and the LSH index instead of the text
+        if name == 'filter_by_similar_documents' and 'minhash' in args:
+            return False
+
+        # Type-token ratios come from the type and token counts collected with the metadata
+        if name == 'filter_by_type_token_ratio':
+            return False
+
+        return name in self.CONTENT_PREDICATES
+
+    def _run_filter_sequence(self, filters: list[Any]) -> None:
+        """Run filters in the given order; consecutive content filters share a single read of every file."""
+        for fusable, group in groupby(filters, key=self._is_fusable):
+            group_filters = list(group)
+
+            if fusable and len(group_filters) > 1:
+                self.filter_content(group_filters)
+                continue
+
+            for filter, *args in group_filters:
+                getattr(self, filter)(*args)
+
+    def stage_filter(self, filter: list[Any]) -> None:
+        """
+        Stage a filter, so that it runs as part of an optimized plan with run_staged_filters.
+
+        :param filter: the filter that should be staged and its parameters
+        :type filter: list
+        """
+
+        available_filters = helpers.get_available_filters()
+
+        if filter[0] in available_filters:
+            self.staged_filters.append(filter)
+        else:
+            raise NameError(f'{filter[0]!r} is not a valid filter. Available: {available_filters}')
+
+    def plan_filters(self, filters: list[Any] | None = None) -> list[FilterStep]:
+        """
+        Order filters so that cheap ones run first: filename filters, then size filters, then metadata filters,
+        then filters that read the files, and similarity filters last. Filters whose result depends on the whole
+        aggregation (e.g. random sampling) are barriers: nothing is moved across them.
+
+        The estimated I/O of a step is the number of bytes it may read, i.e. an upper bound that assumes that the
+        steps before it keep every file.
+
+        :param filters: the filters and their arguments (default: the staged filters)
+        :type filters: list
+        :return: the plan
+        :type return: list
+        """
+
+        if filters is None:
+            filters = self.staged_filters
+
+        sizes = self.files.signatures['size']
+        aggregation = list(dict.fromkeys(self.aggregation))
+        content_io = sum(map(sizes.__getitem__, aggregation))
+        characters = self.files.integers['characters']
+        missing_metadata_io = sum(sizes[file_id] for file_id in aggregation if characters[file_id] == -1)
+
+        def rank(cost: str) -> float:
+            # Collecting missing metadata reads the files, but only once for all following metadata filters
+            if cost == 'metadata' and missing_metadata_io:
+                return helpers.FILTER_COSTS.index('content') - 0.5
+            return helpers.FILTER_COSTS.index(cost)
+
+        ordered: list[tuple[list[Any], str]] = []
+        segment: list[tuple[list[Any], str]] = []
+        for filter in filters:
+            cost = helpers.get_filter_cost(filter[0])
+            if cost == 'barrier':
+                ordered.extend(sorted(segment, key=lambda item: rank(item[1])))
+                ordered.append((filter, cost))
+                segment = []
+            else:
+                segment.append((filter, cost))
+        ordered.extend(sorted(segment, key=lambda item: rank(item[1])))
+
+        plan: list[FilterStep] = []
+        metadata_collected = False
+        previous_fusable = False
+        for filter, cost in ordered:
+            if self._is_fusable(filter) and previous_fusable:
+                # Fused with the filter before it, so the files are not read again
+                estimated_io = 0
+            elif cost in ('content', 'similarity'):
+                estimated_io = content_io
+            elif cost == 'metadata' and not metadata_collected:
+                estimated_io = missing_metadata_io
+                metadata_collected = True
+            else:
+                estimated_io = 0
+
+            plan.append(FilterStep(filter, cost, estimated_io))
+            previous_fusable = self._is_fusable(filter)
+
+        return plan
+
+    def explain(self, filters: list[Any] | None = None) -> str:
+        """
+        :param filters: the filters and their arguments (default: the staged filters)
+        :type filters: list
+        :return: a description of the plan, with the estimated I/O of every step
+        :type return: str
+        """
+
+        plan = self.plan_filters(filters)
+
+        lines = [f'Filter plan for {len(self.aggregation)} files ({len(plan)} filters):']
+        for i, step in enumerate(plan, start=1):
+            name, *args = step.filter
+            call = f'{name}({", ".join(map(repr, args))})'
+            lines.append(f'{i}. {call} [{step.cost}] est. I/O: {helpers.format_size(step.estimated_io)}')
+        lines.append(f'Estimated I/O (upper bound): {helpers.format_size(sum(step.estimated_io for step in plan))}')
+
+        return '\n'.join(lines)
+
+    def run_staged_filters(self) -> None:
+        """Run the staged filters in the order chosen by plan_filters, and destage them."""
+        plan = self.plan_filters()
+        self.staged_filters = []
+
+        self._run_filter_sequence([step.filter for step in plan])
+
+    def transform_to_files(
+        self,
+        output_directory: str | Path,
+        workers: int | None = None,
+        ordered: bool = True,
+        queue_size: int = engine.DEFAULT_QUEUE_SIZE,
+    ) -> None:
         """
         Runs all transformations and stores the transformed texts in individual files.
 
         :param output_directory: the path/filename to write to
         :type output_directory: str
+        :param workers: the number of parallel transformation workers (default: self.workers)
+        :type workers: int
+        :param ordered: keep the order of the aggregation; otherwise texts are written as soon as they are ready
+        :type ordered: bool
+        :param queue_size: the number of texts each stage of the pipeline may hold
+        :type queue_size: int
         """
 
         output_directory = Path(output_directory)
@@ -574,7 +2050,7 @@ class TextDirectory:
         if not output_directory.is_dir():
             raise NotADirectoryError(f'The output directory {output_directory} does not exist.')
 
-        for file in self.get_aggregation():
+        def write(file: FileRecord, text: str) -> None:
             # The directory structure below the input directory is mirrored, so that files
             # sharing a filename in different subdirectories do not overwrite each other
             try:
@@ -585,60 +2061,133 @@ class TextDirectory:
             output_path = output_directory / relative_path
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with file['path'].open(encoding=self.encoding, errors='ignore') as f:
-                with open(output_path, 'w', encoding=self.encoding) as output_file:
-                    output_file.write(self.run_transformations(f.read()))
+            with open(output_path, 'w', encoding=self.encoding) as output_file:
+                output_file.write(text)
 
-    def transform_to_memory(self) -> None:
-        """Runs all transformations and stores the transformed texts in memory."""
-        for file in self.get_aggregation():
-            with file['path'].open(encoding=self.encoding, errors='ignore') as f:
-                text = self.run_transformations(f.read())
-                file['transformed_text'] = text
+        self._transform_aggregation(write, workers, ordered, queue_size)
+
+    def transform_to_memory(
+        self,
+        workers: int | None = None,
+        ordered: bool = True,
+        queue_size: int = engine.DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """
+        Runs all transformations and stores the transformed texts in memory.
+
+        :param workers: the number of parallel transformation workers (default: self.workers)
+        :type workers: int
+        :param ordered: keep the order of the aggregation; otherwise texts are written as soon as they are ready
+        :type ordered: bool
+        :param queue_size: the number of texts each stage of the pipeline may hold
+        :type queue_size: int
+        """
+
+        def write(file: FileRecord, text: str) -> None:
+            file['transformed_text'] = text
+
+        self._transform_aggregation(write, workers, ordered, queue_size)
 
     def clear_transformation(self) -> None:
         """Destage all transformations and clear memory."""
         self.staged_transformations = []
-        for file in self.files:
-            file['transformed_text'] = False
+        self.files.texts.clear()
 
-    def aggregate_to_file(self, filename: str | Path = 'aggregated.txt') -> None:
+    def get_text_store_stats(self) -> TextStoreStats:
+        """
+        :return: the hits, misses, and spills of the transformed texts, and the bytes they occupy in memory and on disk
+        :type return: TextStoreStats
+        """
+        return self.files.texts.stats()
+
+    def aggregate_to_file(
+        self,
+        filename: str | Path = 'aggregated.txt',
+        workers: int | None = None,
+        ordered: bool = True,
+        queue_size: int = engine.DEFAULT_QUEUE_SIZE,
+        streaming: bool = False,
+        chunk_size: int = helpers.FILE_CHUNK_SIZE,
+    ) -> None:
         """
         :param filename: the path/filename to write to
         :type filename: str
+        :param workers: the number of parallel transformation workers (default: self.workers)
+        :type workers: int
+        :param ordered: keep the order of the aggregation; otherwise texts are written as soon as they are ready
+        :type ordered: bool
+        :param queue_size: the number of texts (or chunks) each stage of the pipeline may hold
+        :type queue_size: int
+        :param streaming: read and transform the files in chunks, so that the memory needed does not depend on the
+            size of the files; the staged transformations need to be chunk-safe (see transformations.is_chunk_safe)
+        :type streaming: bool
+        :param chunk_size: the number of characters read at once when streaming; chunks are only split at whitespace,
+            and a file with more than 64 * chunk_size characters without whitespace raises a ValueError
+        :type chunk_size: int
         """
+
+        if streaming:
+            if not transformations.is_chunk_safe(self.staged_transformations):
+                unsafe = [
+                    name
+                    for name, *_ in self.staged_transformations
+                    if name not in transformations.CHUNK_SAFE_TRANSFORMATIONS
+                ]
+                raise ValueError(
+                    'The staged transformations cannot be streamed; '
+                    f'{unsafe or "their arguments or order"} need the whole text of a file.'
+                )
+
+            if not ordered:
+                raise ValueError('Streamed chunks need to be written in order; use ordered=True.')
+
         with open(filename, 'w', encoding=self.encoding) as aggregation_file:
-            for file in self.get_aggregation():
-                with file['path'].open(encoding=self.encoding, errors='ignore') as f:
-                    text = self.run_transformations(f.read())
-                    aggregation_file.write(text)
 
-    def aggregate_to_memory(self) -> str:
+            def write(item: Any, text: str) -> None:
+                aggregation_file.write(text)
+
+            self._transform_aggregation(write, workers, ordered, queue_size, chunk_size if streaming else None)
+
+    def aggregate_to_memory(
+        self,
+        workers: int | None = None,
+        ordered: bool = True,
+        queue_size: int = engine.DEFAULT_QUEUE_SIZE,
+    ) -> str:
         """
+        :param workers: the number of parallel transformation workers (default: self.workers)
+        :type workers: int
+        :param ordered: keep the order of the aggregation; otherwise texts are written as soon as they are ready
+        :type ordered: bool
+        :param queue_size: the number of texts each stage of the pipeline may hold
+        :type queue_size: int
         :return: a string containing the aggregated text files
         :type: str
         """
 
         # Collected in a list: repeatedly concatenating the aggregate is quadratic
-        texts = []
-        for file in self.get_aggregation():
-            with file['path'].open(encoding=self.encoding, errors='ignore') as f:
-                text = self.run_transformations(f.read())
-                file['transformed_text'] = text
-                texts.append(text)
+        texts: list[str] = []
+
+        def write(file: FileRecord, text: str) -> None:
+            file['transformed_text'] = text
+            texts.append(text)
+
+        self._transform_aggregation(write, workers, ordered, queue_size)
 
         return ''.join(texts)
 
     def print_aggregation(self) -> None:
         """Print the aggregated files as a table."""
-        print(helpers.tabulate_flat_list_of_dicts(list(self.get_aggregation())))
+        print(
+            helpers.tabulate_flat_list_of_dicts([file.to_dict(load_spilled=False) for file in self.get_aggregation()])
+        )
         print(f'\nStaged Transformations: {self.staged_transformations}')
 
     def print_saved_states(self) -> None:
         """Print all saved states."""
         print('Saved States:')
         for i, state in enumerate(self.aggregation_states):
-            print(f'[{i}] - {len(state[0])} files after applying {state[1]}')
+            print(f'[{i}] - {len(state[0])} files after applying {state[1]} ({state[0].nbytes} bytes)')
 
     def print_pipeline(self) -> None:
         """Print the current pipeline."""
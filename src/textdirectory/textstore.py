@@ -0,0 +1,168 @@
+"""Text store module: transformed texts kept within a memory budget, with the rest spilled to disk."""
+
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+
+class TextStoreStats(NamedTuple):
+    """Counters of a TextStore."""
+
+    # Reads served from memory, and reads that had to load a spilled text
+    hits: int
+    misses: int
+    # Texts written to disk to stay within the budget
+    spills: int
+    texts: int
+    memory_bytes: int
+    disk_bytes: int
+
+
+class TextStore:
+    """Texts by key (e.g. file id), kept in memory up to a budget.
+
+    The most recently used texts stay in memory. When the budget is exceeded, the least recently used ones are
+    compressed (zlib) and written to a temporary directory; reading a spilled text loads it back into memory.
+    Without a budget, all texts stay in memory. The temporary directory is removed with the store.
+    """
+
+    def __init__(self, memory_budget: int | None = None, directory: str | Path | None = None) -> None:
+        """
+        :param memory_budget: the number of bytes the texts in memory may occupy (default: no limit)
+        :type memory_budget: int
+        :param directory: where to create the temporary directory for spilled texts (default: the system default)
+        :type directory: str
+        """
+
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+        self.memory_bytes = 0
+        self._memory: OrderedDict[int, str] = OrderedDict()
+        # The sizes of the spilled texts on disk; a text can be both in memory and on disk
+        self._disk: dict[int, int] = {}
+        self._spill_directory: tempfile.TemporaryDirectory[str] | None = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._memory.keys() | self._disk.keys())
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._memory or key in self._disk
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(sorted(self._memory.keys() | self._disk.keys()))
+
+    def __repr__(self) -> str:
+        return f'TextStore({len(self)} texts, {self.memory_bytes} bytes in memory, {len(self._disk)} on disk)'
+
+    def _get_path(self, key: int) -> Path:
+        if self._spill_directory is None:
+            self._spill_directory = tempfile.TemporaryDirectory(prefix='textdirectory_', dir=self.directory)
+
+        return Path(self._spill_directory.name, f'{key}.z')
+
+    def _evict(self) -> None:
+        """Move the least recently used texts out of memory until the budget is met."""
+        if self.memory_budget is None:
+            return
+
+        while self._memory and self.memory_bytes > self.memory_budget:
+            key, text = self._memory.popitem(last=False)
+            self.memory_bytes -= sys.getsizeof(text)
+
+            # Texts that were spilled before are unchanged since; they need not be written again
+            if key not in self._disk:
+                data = zlib.compress(text.encode('utf-8', errors='surrogatepass'), 1)
+                self._get_path(key).write_bytes(data)
+                self._disk[key] = len(data)
+                self.spills += 1
+
+    def get(self, key: int) -> str:
+        """
+        :param key: the key of a text
+        :type key: int
+        :return: the text
+        :type return: str
+        """
+
+        with self._lock:
+            if key in self._memory:
+                self.hits += 1
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            if key not in self._disk:
+                raise KeyError(key)
+
+            self.misses += 1
+            text = zlib.decompress(self._get_path(key).read_bytes()).decode('utf-8', errors='surrogatepass')
+            self._memory[key] = text
+            self.memory_bytes += sys.getsizeof(text)
+            self._evict()
+
+            return text
+
+    def peek(self, key: int) -> str | None:
+        """
+        :param key: the key of a text
+        :type key: int
+        :return: the text if it is in memory, else None; the text is not read back from disk, and neither the
+            counters nor the order of use change
+        :type return: str
+        """
+        return self._memory.get(key)
+
+    def set(self, key: int, text: str) -> None:
+        """
+        :param key: the key of the text
+        :type key: int
+        :param text: the text
+        :type text: str
+        """
+
+        with self._lock:
+            self.discard(key)
+            self._memory[key] = text
+            self.memory_bytes += sys.getsizeof(text)
+            self._evict()
+
+    def discard(self, key: int) -> None:
+        """
+        :param key: the key of a text; nothing happens if there is no such text
+        :type key: int
+        """
+
+        with self._lock:
+            if key in self._memory:
+                self.memory_bytes -= sys.getsizeof(self._memory.pop(key))
+
+            if self._disk.pop(key, None) is not None:
+                self._get_path(key).unlink()
+
+    def clear(self) -> None:
+        """Remove all texts (and the spilled files)."""
+        with self._lock:
+            self._memory.clear()
+            self._disk.clear()
+            self.memory_bytes = 0
+
+            if self._spill_directory is not None:
+                self._spill_directory.cleanup()
+                self._spill_directory = None
+
+    def stats(self) -> TextStoreStats:
+        """
+        :return: the hit, miss, and spill counters, and how many texts and bytes the store holds
+        :type return: TextStoreStats
+        """
+        return TextStoreStats(
+            self.hits, self.misses, self.spills, len(self), self.memory_bytes, sum(self._disk.values())
+        )
@@ -0,0 +1,272 @@
+"""TF-IDF module: a sparse TF-IDF matrix for similarity queries."""
+
+import base64
+import heapq
+import json
+import math
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from textdirectory.invertedindex import tokenize
+
+
+def count_terms(path: str | Path, encoding: str = 'utf8') -> Counter[str]:
+    """
+    :param path: path to a textfile
+    :type path: str
+    :param encoding: the encoding of the file
+    :type encoding: str
+    :return: the frequencies of the (lowercased word) terms of the file
+    :type return: Counter
+    """
+
+    with open(path, encoding=encoding, errors='ignore') as f:
+        return Counter(tokenize(f.read()))
+
+
+def _encode_array(values: 'array[Any]') -> str:
+    return base64.b64encode(zlib.compress(values.tobytes(), 1)).decode('ascii')
+
+
+def _decode_array(typecode: str, data: str) -> 'array[Any]':
+    values = array(typecode)
+    values.frombytes(zlib.decompress(base64.b64decode(data)))
+    return values
+
+
+class TfidfModel:
+    """L2-normalized TF-IDF vectors of a set of documents, stored as a sparse matrix in CSR form.
+
+    Rows are documents (identified by keys, e.g. relative paths), columns are the terms of the vocabulary. The model
+    is built in one pass over the term counts of the documents, so that the files are read once. Similarities are
+    sparse dot products over a column index, i.e. only documents sharing terms with a query are touched.
+    """
+
+    DEFAULT_FILENAME = '.textdirectory_tfidf.json'
+    FORMAT_VERSION = 1
+
+    def __init__(self) -> None:
+        self.vocabulary: dict[str, int] = {}
+        self.document_frequencies = array('I')
+        self.keys: list[str] = []
+        # Optional fingerprints of the documents (e.g. file signatures), stored with the model
+        self.signatures: list[list[int]] = []
+        self.indptr = array('Q', [0])
+        self.indices = array('I')
+        self.data = array('d')
+        self._columns: dict[int, tuple[array[int], array[float]]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __repr__(self) -> str:
+        return f'TfidfModel({len(self.keys)} documents, {len(self.vocabulary)} terms, {len(self.data)} non-zeros)'
+
+    @classmethod
+    def build(cls, documents: Iterable[tuple[str, Counter[str]]]) -> 'TfidfModel':
+        """
+        :param documents: (key, term frequencies) pairs, e.g. streamed from count_terms
+        :type documents: iterable
+        :return: the model
+        :type return: TfidfModel
+        """
+
+        model = cls()
+        vocabulary = model.vocabulary
+        frequencies = model.document_frequencies
+
+        # First the raw counts, so that every document is only needed once
+        for key, counts in documents:
+            model.keys.append(key)
+            for term, count in counts.items():
+                term_id = vocabulary.get(term)
+                if term_id is None:
+                    term_id = vocabulary[term] = len(vocabulary)
+                    frequencies.append(0)
+                frequencies[term_id] += 1
+                model.indices.append(term_id)
+                model.data.append(count)
+            model.indptr.append(len(model.indices))
+
+        # Smoothed inverse document frequencies, as in scikit-learn
+        idf = [math.log((1 + len(model.keys)) / (1 + frequency)) + 1 for frequency in frequencies]
+        for row in range(len(model.keys)):
+            start, end = model.indptr[row], model.indptr[row + 1]
+            weights = [model.data[i] * idf[model.indices[i]] for i in range(start, end)]
+            norm = math.sqrt(sum(weight * weight for weight in weights)) or 1.0
+            model.data[start:end] = array('d', (weight / norm for weight in weights))
+
+        return model
+
+    def vectorize(self, counts: Counter[str]) -> dict[int, float]:
+        """
+        :param counts: the term frequencies of a document; terms outside the vocabulary are ignored
+        :type counts: Counter
+        :return: the L2-normalized TF-IDF vector of the document, as a {term id: weight} dict
+        :type return: dict
+        """
+
+        document_count = len(self.keys)
+        vector = {
+            self.vocabulary[term]: count
+            * (math.log((1 + document_count) / (1 + self.document_frequencies[self.vocabulary[term]])) + 1)
+            for term, count in counts.items()
+            if term in self.vocabulary
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+
+        return {term_id: weight / norm for term_id, weight in vector.items()}
+
+    def get_row(self, row: int) -> dict[int, float]:
+        """
+        :param row: the row of a document
+        :type row: int
+        :return: the vector of the document, as a {term id: weight} dict
+        :type return: dict
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return dict(zip(self.indices[start:end], self.data[start:end], strict=True))
+
+    def _get_columns(self) -> dict[int, tuple['array[int]', 'array[float]']]:
+        """The transposed matrix: the rows and weights of every term, built on first use."""
+        if self._columns is None:
+            columns: defaultdict[int, tuple[array[int], array[float]]] = defaultdict(lambda: (array('I'), array('d')))
+            for row in range(len(self.keys)):
+                for i in range(self.indptr[row], self.indptr[row + 1]):
+                    rows, weights = columns[self.indices[i]]
+                    rows.append(row)
+                    weights.append(self.data[i])
+            self._columns = dict(columns)
+
+        return self._columns
+
+    def scores(self, vector: dict[int, float]) -> dict[int, float]:
+        """
+        :param vector: a vector as returned by vectorize
+        :type vector: dict
+        :return: the cosine similarity of the vector with every document sharing a term with it, by row
+        :type return: dict
+        """
+
+        columns = self._get_columns()
+        scores: defaultdict[int, float] = defaultdict(float)
+
+        for term_id, weight in vector.items():
+            rows, weights = columns.get(term_id, ((), ()))
+            for row, row_weight in zip(rows, weights, strict=True):
+                scores[row] += weight * row_weight
+
+        return dict(scores)
+
+    def most_similar(
+        self, vector: dict[int, float], k: int = 10, rows: Iterable[int] | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        :param vector: a vector as returned by vectorize
+        :type vector: dict
+        :param k: the number of documents to return
+        :type k: int
+        :param rows: only consider these rows (default: all)
+        :type rows: iterable
+        :return: the k most similar (row, cosine similarity) pairs, most similar first
+        :type return: list
+        """
+
+        scores = self.scores(vector)
+        if rows is not None:
+            wanted = set(rows)
+            scores = {row: score for row, score in scores.items() if row in wanted}
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def iter_similar_pairs(
+        self, threshold: float = 0.5, rows: Iterable[int] | None = None, block_size: int = 1000
+    ) -> Iterator[tuple[int, int, float]]:
+        """
+        All pairs of documents with a cosine similarity of at least threshold. The product of the matrix with its
+        transpose is computed in blocks of rows, so that only one block of scores is in memory at a time.
+
+        :param threshold: the minimum cosine similarity
+        :type threshold: float
+        :param rows: only consider these rows (default: all)
+        :type rows: iterable
+        :param block_size: the number of rows per block
+        :type block_size: int
+        :return: an iterator over (row, other row, similarity) triples with row < other row
+        :type return: iterator
+        """
+
+        selected = sorted(set(range(len(self.keys)) if rows is None else rows))
+        wanted = set(selected)
+        columns = self._get_columns()
+
+        for block_start in range(0, len(selected), block_size):
+            # The block of rows by term, so that every column is visited once per block
+            block: defaultdict[int, list[tuple[int, float]]] = defaultdict(list)
+            for row in selected[block_start : block_start + block_size]:
+                for term_id, weight in self.get_row(row).items():
+                    block[term_id].append((row, weight))
+
+            scores: defaultdict[tuple[int, int], float] = defaultdict(float)
+            for term_id, entries in block.items():
+                column_rows, column_weights = columns[term_id]
+                for row, weight in entries:
+                    for other, other_weight in zip(column_rows, column_weights, strict=True):
+                        if other > row and other in wanted:
+                            scores[row, other] += weight * other_weight
+
+            for (row, other), score in sorted(scores.items()):
+                if score >= threshold:
+                    yield row, other, score
+
+    def save(self, path: str | Path) -> None:
+        """
+        Store the model as JSON (with the matrix compressed), so that it can be loaded without reading the documents.
+
+        :param path: the file to write
+        :type path: str
+        """
+
+        state = {
+            'version': self.FORMAT_VERSION,
+            'keys': self.keys,
+            'signatures': self.signatures,
+            'vocabulary': list(self.vocabulary),
+            'document_frequencies': _encode_array(self.document_frequencies),
+            'indptr': _encode_array(self.indptr),
+            'indices': _encode_array(self.indices),
+            'data': _encode_array(self.data),
+        }
+
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path: str | Path) -> 'TfidfModel':
+        """
+        :param path: a file written by save
+        :type path: str
+        :return: the model
+        :type return: TfidfModel
+        """
+
+        with open(path, encoding='utf8') as f:
+            state = json.load(f)
+
+        if state.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f'{path} is not a TF-IDF model of version {cls.FORMAT_VERSION}.')
+
+        model = cls()
+        model.keys = state['keys']
+        model.signatures = state['signatures']
+        model.vocabulary = {term: term_id for term_id, term in enumerate(state['vocabulary'])}
+        model.document_frequencies = _decode_array('I', state['document_frequencies'])
+        model.indptr = _decode_array('Q', state['indptr'])
+        model.indices = _decode_array('I', state['indices'])
+        model.data = _decode_array('d', state['data'])
+
+        return model
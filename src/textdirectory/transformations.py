@@ -11,6 +11,27 @@ from textdirectory.helpers import count_non_alphanum, estimate_spacy_max_length
 
 _SPACY_MODELS: dict[tuple[str, tuple[str, ...]], Any] = {}
 
+# Transformations that map every character on its own; they can run on any piece of a text
+CHARACTER_TRANSFORMATIONS = frozenset(
+    {
+        'transformation_lowercase',
+        'transformation_uppercase',
+        'transformation_remove_nl',
+        'transformation_remove_non_ascii',
+        'transformation_to_leetspeak',
+        'transformation_replace_digits',
+    }
+)
+# Transformations whose matches do not span line breaks or whitespace; they can run on any run of whole lines
+LINE_TRANSFORMATIONS = frozenset(
+    {
+        'transformation_remove_non_alphanumerical',
+        'transformation_expand_english_contractions',
+        'transformation_replace_string',
+    }
+)
+CHUNK_SAFE_TRANSFORMATIONS = CHARACTER_TRANSFORMATIONS | LINE_TRANSFORMATIONS
+
 
 def _load_spacy_model(model_name: str, disable: tuple[str, ...] = ()) -> Any:
     """Load and cache a spaCy model; raise a helpful error when the nlp extra is missing.
@@ -43,6 +64,52 @@ def _load_spacy_model(model_name: str, disable: tuple[str, ...] = ()) -> Any:
     return _SPACY_MODELS[key]
 
 
+def is_chunk_safe(staged_transformations: list[list[Any]]) -> bool:
+    """
+    :param staged_transformations: the names of transformations and their arguments
+    :type staged_transformations: list
+    :return: whether running the transformations on chunks that end at line breaks (see helpers.iter_file_chunks)
+        gives the same text as running them on the whole text
+    :type return: bool
+    """
+
+    lines_intact = True
+
+    for transformation, *args in staged_transformations:
+        if transformation in LINE_TRANSFORMATIONS:
+            # Once the line breaks are gone, the chunk boundaries are in the middle of lines
+            if not lines_intact:
+                return False
+            # An empty string matches at both ends of every chunk, and whitespace can span a chunk boundary
+            if transformation == 'transformation_replace_string' and (
+                not args or not str(args[0]) or re.search(r'\s', str(args[0]))
+            ):
+                return False
+        elif transformation not in CHARACTER_TRANSFORMATIONS:
+            return False
+
+        if transformation == 'transformation_remove_nl':
+            lines_intact = False
+
+    return True
+
+
+def run_transformations(text: str, staged_transformations: list[list[Any]]) -> str:
+    """
+    :param text: the text to run the transformations on
+    :type text: str
+    :param staged_transformations: the names of transformations and their arguments
+    :type staged_transformations: list
+    :return: the transformed text
+    :type return: str
+    """
+
+    for transformation, *args in staged_transformations:
+        text = globals()[transformation](text, *args)
+
+    return text
+
+
 def transformation_postag(text: str, spacy_model: str = 'en_core_web_sm', *args: Any) -> str:
     """
     :param text: the text to run the transformation on
@@ -34,3 +34,33 @@ def td(testdata_dir):
     td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
     td.load_files(recursive=True, sort=True, filetype='txt')
     return td
+
+
+@pytest.fixture
+def make_td(tmp_path):
+    """A factory that writes texts ({filename: text}) to tmp_path and returns a TextDirectory over them.
+
+    The files are loaded with the given load_files options, unless load is False.
+    """
+    from textdirectory.textdirectory import TextDirectory
+
+    def make_td(texts, load=True, **load_options):
+        for name, text in texts.items():
+            (tmp_path / name).write_text(text, encoding='utf8')
+
+        td = TextDirectory(directory=tmp_path, disable_tqdm=True)
+        if load:
+            td.load_files(**load_options)
+        return td
+
+    return make_td
+
+
+@pytest.fixture
+def filenames():
+    """A function returning the filenames currently in the aggregation of a TextDirectory."""
+
+    def filenames(td):
+        return [file['filename'] for file in td.get_aggregation()]
+
+    return filenames
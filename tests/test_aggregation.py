@@ -1,5 +1,7 @@
 """Tests for aggregating a TextDirectory to memory and to files."""
 
+from textdirectory import TextDirectory
+
 
 def expected_aggregate(testdata_dir):
     """Build the expected aggregate independently of TextDirectory internals."""
@@ -23,3 +25,23 @@ def test_simple_aggregation_file(td, tmp_path):
     td.aggregate_to_file(output_file)
 
     assert 'condimentum ultricies aliquam' in output_file.read_text()
+
+
+def test_parallel_aggregation_keeps_the_order(td, testdata_dir):
+    """Transforming in several workers produces the same aggregate."""
+    td.stage_transformation(['transformation_uppercase'])
+
+    assert td.aggregate_to_memory(workers=3, queue_size=2) == expected_aggregate(testdata_dir).upper()
+    assert [file['transformed_text'] for file in td.get_aggregation()][0] == td.get_text(td.aggregation[0])
+
+
+def test_parallel_transformation_in_processes(testdata_dir, tmp_path):
+    """The staged transformations can run in a process pool."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True, workers=2, pool='process')
+    td.load_files()
+    td.stage_transformation(['transformation_lowercase'])
+    td.aggregate_to_file(tmp_path / 'aggregated.txt', ordered=False)
+
+    assert sorted((tmp_path / 'aggregated.txt').read_text(encoding='utf8')) == sorted(
+        expected_aggregate(testdata_dir).lower()
+    )
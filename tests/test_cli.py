@@ -115,3 +115,11 @@ def test_cli_empty_directory_fails_cleanly(tmp_path):
     result = runner.invoke(cli.main, ['--directory', str(tmp_path)])
     assert result.exit_code == 1
     assert 'no files' in result.output
+
+
+def test_cli_jobs(testdata_dir):
+    """--jobs loads the files with several workers."""
+    runner = CliRunner()
+    result = runner.invoke(cli.main, ['--directory', str(testdata_dir), '--jobs', '2'])
+    assert result.exit_code == 0
+    assert 'Lorem' in result.output
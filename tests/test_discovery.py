@@ -0,0 +1,112 @@
+"""Tests for file discovery."""
+
+import os
+
+import pytest
+
+from textdirectory import discovery
+from textdirectory.discovery import discover_files
+from textdirectory.textdirectory import TextDirectory
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A tree with several extensions and a junk directory."""
+    (tmp_path / 'node_modules' / 'deep').mkdir(parents=True)
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'a.txt').write_text('a', encoding='utf8')
+    (tmp_path / 'b.md').write_text('b' * 2048, encoding='utf8')
+    (tmp_path / 'c.csv').write_text('c', encoding='utf8')
+    (tmp_path / 'docs' / 'draft_d.txt').write_text('d', encoding='utf8')
+    (tmp_path / 'node_modules' / 'deep' / 'e.txt').write_text('e', encoding='utf8')
+    return tmp_path
+
+
+def names(discovered):
+    """The sorted filenames of discovered files."""
+    return sorted(discovered_file.path.name for discovered_file in discovered)
+
+
+def test_discover_files_matches_glob(testdata_dir):
+    """Discovery finds the same files as the recursive glob it replaced."""
+    discovered = sorted(discovered_file.path for discovered_file in discover_files(testdata_dir))
+    assert discovered == sorted(testdata_dir.glob('**/*.txt'))
+
+
+def test_discover_files_multiple_extensions(tree):
+    """Several extensions can be given as a list or as a comma separated string."""
+    assert names(discover_files(tree, filetype=['txt', 'md'])) == ['a.txt', 'b.md', 'draft_d.txt', 'e.txt']
+    assert names(discover_files(tree, filetype='txt,md', recursive=False)) == ['a.txt', 'b.md']
+
+
+def test_discover_files_prunes_excluded_directories(tree, monkeypatch):
+    """Excluded directories are never entered."""
+    entered = []
+    original_scandir = os.scandir
+
+    def recording_scandir(path):
+        entered.append(os.path.basename(path))
+        return original_scandir(path)
+
+    monkeypatch.setattr(discovery.os, 'scandir', recording_scandir)
+
+    assert names(discover_files(tree, exclude=['node_modules'])) == ['a.txt', 'draft_d.txt']
+    assert 'node_modules' not in entered
+    assert 'deep' not in entered
+
+
+def test_discover_files_include_and_size(tree):
+    """Include globs and size bounds are applied during the walk."""
+    assert names(discover_files(tree, filetype='*', include=['docs/*'])) == ['draft_d.txt']
+    assert names(discover_files(tree, filetype='*', min_size=1024)) == ['b.md']
+
+
+def test_discovered_signature_is_the_stat(tree):
+    """The signature carries the stat data collected during the walk."""
+    (discovered_file,) = discover_files(tree, recursive=False, filetype='csv')
+    assert discovered_file.signature.size == 1
+    assert discovered_file.signature.mtime_ns == os.stat(tree / 'c.csv').st_mtime_ns
+
+
+def test_load_files_with_discovery_options(tree):
+    """load_files passes extensions, globs, and size limits on to the discovery."""
+    td = TextDirectory(directory=tree, disable_tqdm=True)
+    td.load_files(filetype=['txt', 'md'], exclude=['node_modules', 'draft_*'], max_kb=1)
+
+    assert [file['filename'] for file in td.files] == ['a.txt']
+
+
+def test_load_files_sample(testdata_dir):
+    """Only the sampled files are loaded (and scanned); the seed makes the sample reproducible."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    td.load_files(sample=4, seed=3)
+
+    other = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    other.load_files(sample=4, seed=3)
+
+    assert len(td.files) == len(td.aggregation) == 4
+    assert all(file['characters'] is not False for file in td.get_aggregation())
+    assert td.filenames == other.filenames
+
+
+def test_load_files_stratified_sample(tree):
+    """A stratified sample draws from every directory in proportion to its files."""
+    for i in range(7):
+        (tree / f'{i}.txt').write_text('x', encoding='utf8')
+    (tree / 'docs' / 'more_d.txt').write_text('d', encoding='utf8')
+
+    td = TextDirectory(directory=tree, disable_tqdm=True)
+    td.load_files(sample=5, stratify=True, seed=0, exclude=['node_modules'])
+
+    parents = [file['path'].parent for file in td.get_aggregation()]
+    assert parents.count(tree) == 4
+    assert parents.count(tree / 'docs') == 1
+
+
+def test_sampled_files_cannot_be_refreshed(testdata_dir):
+    """Refreshing would add new files in full, so it is refused."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    td.load_files(sample=2)
+
+    with pytest.raises(ValueError):
+        td.refresh()
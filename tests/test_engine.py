@@ -0,0 +1,75 @@
+"""Tests for the pipeline engine."""
+
+import threading
+import time
+
+import pytest
+
+from textdirectory import engine
+
+
+def slow_double(value):
+    """A transformation that finishes the later items first."""
+    time.sleep(0.001 * (10 - value % 10))
+    return value * 2
+
+
+def test_run_pipeline_keeps_the_order():
+    """Ordered results are written in the order of the items, whatever finishes first."""
+    written = []
+    engine.run_pipeline(range(30), str, int, lambda item, result: written.append((item, result)))
+    assert written == [(i, i) for i in range(30)]
+
+    written = []
+    engine.run_pipeline(range(30), lambda i: i, slow_double, lambda *pair: written.append(pair), workers=4)
+    assert written == [(i, i * 2) for i in range(30)]
+
+
+def test_run_pipeline_unordered():
+    """Unordered results are complete, but written as they are ready."""
+    written = []
+    engine.run_pipeline(
+        range(30), lambda i: i, slow_double, lambda *pair: written.append(pair), workers=4, ordered=False, queue_size=4
+    )
+    assert sorted(written) == [(i, i * 2) for i in range(30)]
+
+
+def test_run_pipeline_in_a_process_pool():
+    """Module-level transformations can run in processes."""
+    written = []
+    engine.run_pipeline(
+        range(8), lambda i: i, slow_double, lambda *pair: written.append(pair), workers=2, pool='process'
+    )
+    assert written == [(i, i * 2) for i in range(8)]
+
+
+def test_run_pipeline_bounds_the_reader():
+    """The reader stays at most a few queues ahead of the writer."""
+    read = []
+    written = []
+
+    def write(item, result):
+        written.append(item)
+        assert len(read) - len(written) <= 3 * 2 + 2
+
+    engine.run_pipeline(range(50), lambda i: read.append(i) or i, lambda i: i, write, queue_size=2)
+    assert written == list(range(50))
+
+
+@pytest.mark.parametrize('stage', ['read', 'transform', 'write'])
+def test_run_pipeline_raises_the_errors_of_every_stage(stage):
+    """An exception in any stage stops the pipeline and is raised; no thread is left running."""
+
+    def fail_at_five(value):
+        if value == 5:
+            raise RuntimeError(stage)
+        return value
+
+    stages = {'read': lambda i: i, 'transform': lambda i: i, 'write': lambda item, result: None}
+    stages[stage] = fail_at_five if stage != 'write' else lambda item, result: fail_at_five(item)
+    threads = threading.active_count()
+
+    with pytest.raises(RuntimeError, match=stage):
+        engine.run_pipeline(range(100), stages['read'], stages['transform'], stages['write'], queue_size=2)
+
+    assert threading.active_count() == threads
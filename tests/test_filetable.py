@@ -0,0 +1,110 @@
+"""Tests for the columnar file table."""
+
+import copy
+from pathlib import Path
+
+import pytest
+
+from textdirectory.filetable import FileRecord, FileTable
+from textdirectory.metadataindex import FileSignature
+
+
+@pytest.fixture
+def table():
+    """A table with three files in two directories."""
+    table = FileTable()
+    table.append({'path': Path('corpus/a.txt'), 'characters': 10, 'tokens': 2, 'transformed_text': False})
+    table.append({'path': Path('corpus/b.txt'), 'characters': 500, 'tokens': 90, 'transformed_text': False})
+    table.append({'path': Path('corpus/sub/c.txt'), 'characters': False, 'tokens': False}, FileSignature(1, 2, 3))
+    return table
+
+
+def test_records_behave_like_dicts(table):
+    """Records expose the keys and values of the former dict records."""
+    record = table[0]
+
+    assert record['path'] == Path('corpus/a.txt')
+    assert record['filename'] == 'a.txt'
+    assert record['characters'] == 10
+    assert record['size'] is False
+    assert record['transformed_text'] is False
+    assert list(record)[:3] == ['path', 'filename', 'characters']
+
+
+def test_records_write_through_to_the_columns(table):
+    """Setting a key on a record updates the table, including new keys."""
+    table[2]['characters'] = 42
+    table[2]['hash'] = 'ab' * 16
+    table[1]['language'] = 'en'
+
+    assert table.integers['characters'][2] == 42
+    assert table[2]['hash'] == 'ab' * 16
+    assert table[1]['language'] == 'en'
+    assert table[0]['language'] is False
+
+
+def test_copies_are_plain_dicts(table):
+    """Copies of records are detached dicts that still compare equal."""
+    record_copy = copy.deepcopy(table[1])
+
+    assert type(record_copy) is dict
+    assert record_copy == table[1]
+    assert table.index(record_copy) == 1
+
+
+def test_directories_are_shared(table):
+    """Files in the same directory share a single directory string."""
+    assert table.directories == ['corpus', str(Path('corpus/sub'))]
+    assert list(table.parents) == [0, 0, 1]
+
+
+def test_select_by_range(table):
+    """Range selection keeps the order of the given ids."""
+    assert table.select([1, 0], 'characters', minimum=10, maximum=500) == [1, 0]
+    assert table.select([0, 1], 'tokens', minimum=3) == [1]
+    assert table.select([0, 1], 'tokens', maximum=2) == [0]
+
+
+def test_signatures_are_stored(table):
+    """Signatures roundtrip through the table."""
+    assert table.get_signature(2) == FileSignature(1, 2, 3)
+
+    table.set_signature(0, FileSignature(4, 5, 6))
+    assert table.get_signature(0) == FileSignature(4, 5, 6)
+
+
+def test_mtime_comes_from_the_signature(table):
+    """The modification time is read from the signature and cannot be set."""
+    assert table[0]['mtime'] is False
+    assert table[2]['mtime'] == 2e-9
+    assert table.select([0, 1, 2], 'mtime_ns', minimum=2) == [2]
+
+    with pytest.raises(TypeError):
+        table[2]['mtime'] = 0
+
+
+def test_text_directory_uses_the_file_table(td):
+    """TextDirectory keeps its records in a FileTable."""
+    assert isinstance(td.files, FileTable)
+    assert isinstance(td.files[0], FileRecord)
+    assert td.filenames == [file['filename'] for file in td.files]
+
+
+def test_hashes_of_the_wrong_size_are_rejected(table):
+    """A hash of another size would shift the hashes of the following records."""
+    table[2]['hash'] = 'cd' * 16
+
+    with pytest.raises(ValueError):
+        table[1]['hash'] = 'abcd'
+
+    assert len(table.hashes) == 3 * 16
+    assert table[2]['hash'] == 'cd' * 16
+
+
+def test_slices_and_integer_columns(table):
+    """Slices return lists of records like the former list; integer columns only take integers."""
+    assert [record['filename'] for record in table[:2]] == ['a.txt', 'b.txt']
+    assert [record.file_id for record in table[::-2]] == [2, 0]
+
+    with pytest.raises(TypeError, match='integer column'):
+        table[0]['tokens'] = 1.5
@@ -112,6 +112,47 @@ def test_filter_by_chars_outliers(td):
     assert len(td.aggregation) == 9
 
 
+def test_filter_by_chars_outliers_records_one_checkpoint(td):
+    """The outlier filter records a single checkpoint and returns its statistics."""
+    std, mean, minimum, maximum = td.filter_by_chars_outliers(1)
+
+    assert len(td.aggregation_states) == 2
+    assert td.applied_filters == ['filter_by_chars_outliers']
+    assert minimum == round(mean - std, 1)
+
+
+def test_filter_by_percentile(td):
+    """Files outside the percentile range of the metric are dropped."""
+    assert td.filter_by_percentile('tokens', 10, 90) == pytest.approx((4, 123))
+    assert len(td.aggregation) == 9
+    assert max(file['tokens'] for file in td.get_aggregation()) == 100
+    assert len(td.aggregation_states) == 2
+
+
+def test_filter_by_outliers_mad(td):
+    """Files further than threshold scaled MADs from the median are dropped."""
+    center, spread, _, maximum = td.filter_by_outliers('tokens', 3)
+
+    assert center == 12
+    assert spread == pytest.approx(1.4826 * 8)
+    assert all(file['tokens'] <= maximum for file in td.get_aggregation())
+    assert len(td.aggregation) == 6
+
+
+def test_filter_by_percentile_ttr(td):
+    """Type-token ratios are computed once and kept in the records."""
+    td.filter_by_percentile('ttr', 0, 50)
+
+    assert len(td.aggregation) == 5
+    assert all(isinstance(file['ttr'], float) for file in td.files)
+
+
+def test_distribution_filters_reject_unknown_metrics(td):
+    """Only the distribution metrics can be used."""
+    with pytest.raises(ValueError):
+        td.filter_by_outliers('lines')
+
+
 def test_filter_by_filenames(td):
     """Test the by filenames filter."""
     td.filter_by_filenames(['Text_A.txt'])
@@ -153,3 +194,182 @@ def test_filter_by_type_token_ratio(td):
     """Test the TTR filter."""
     td.filter_by_type_token_ratio(0.4, 0.8)
     assert len(td.aggregation) == 3
+
+
+def test_filter_by_type_token_ratio_uses_the_metadata(td, monkeypatch):
+    """The TTR filter works from the type and token counts of the scan, without reading the files."""
+    monkeypatch.setattr('builtins.open', None)
+    td.filter_by_type_token_ratio(0.4, 0.8)
+
+    assert sorted(file['filename'] for file in td.get_aggregation()) == ['Text_2_B.txt', 'Text_2_C.txt', 'Text_2_D.txt']
+
+
+def test_filter_by_mattr(td):
+    """Files are kept by their moving-average TTR, also when they are shorter than the window."""
+    td.filter_by_mattr(0.0, 0.96, window=10)
+
+    assert sorted(file['filename'] for file in td.get_aggregation()) == [
+        'Text_2_B.txt',
+        'Text_2_C.txt',
+        'Text_2_D.txt',
+        'Text_2_E.txt',
+    ]
+
+    with pytest.raises(ValueError):
+        td.filter_by_mattr(window=0)
+
+
+def test_filter_content_matches_separate_filters(td, testdata_dir):
+    """A fused content scan records the same checkpoints as running the filters one by one."""
+    filters = [
+        ['filter_by_not_contains', 'spaceship'],
+        ['filter_by_type_token_ratio', 0.4, 1.0],
+        ['filter_by_similar_documents', testdata_dir / 'Text_A.txt', 0.3],
+    ]
+
+    td.filter_content(filters)
+    fused = list(td.aggregation_states)
+
+    td.load_aggregation_state(0)
+    for filter, *args in filters:
+        getattr(td, filter)(*args)
+
+    assert fused[1:] == td.aggregation_states[4:]
+    assert td.applied_filters == [filter for filter, *_ in filters]
+
+
+def test_filter_content_reads_every_file_once(td, monkeypatch):
+    """Every file is decoded once, however many content filters are fused."""
+    opened = []
+    real_open = open
+    monkeypatch.setattr(
+        'builtins.open', lambda path, *args, **kwargs: opened.append(path) or real_open(path, *args, **kwargs)
+    )
+
+    td.filter_content(
+        [['filter_by_contains_none', ['x']], ['filter_by_contains_any', ['Lorem', 'a']], ['filter_by_type_token_ratio']]
+    )
+
+    assert len(opened) == len(set(opened)) == 10
+
+
+def test_filter_content_rejects_other_filters(td):
+    """Only content filters can be fused; nothing is recorded when the arguments are invalid."""
+    with pytest.raises(NameError):
+        td.filter_content([['filter_by_max_chars', 10]])
+
+    with pytest.raises(ValueError):
+        td.filter_content([['filter_by_contains', 'a'], ['filter_by_similar_documents', 'Text_A.txt', 1.5]])
+
+    assert len(td.aggregation_states) == 1
+
+
+def test_filter_by_contains_any(td):
+    """Files containing at least one keyword are kept."""
+    td.filter_by_contains_any(['spaceship', 'Lorem'])
+    assert filenames(td) == ['Text_2_B.txt', 'Text_2_C.txt', 'Text_C.txt', 'Text_E.txt']
+
+
+def test_filter_by_contains_all(td):
+    """Files containing every keyword are kept."""
+    td.filter_by_contains_all(['Lorem', 'ipsum'])
+    assert filenames(td) == ['Text_2_B.txt', 'Text_2_C.txt']
+
+
+def test_filter_by_contains_none(td, tmp_path):
+    """Keywords can be loaded from a file."""
+    keywords_file = tmp_path / 'keywords.txt'
+    keywords_file.write_text('# stop words\nspaceship\n\nLorem\n')
+
+    td.filter_by_contains_none(keywords_file=keywords_file)
+    assert len(td.aggregation) == 6
+
+
+def test_filter_by_contains_byte_search(td, monkeypatch):
+    """UTF-8 needles without newlines are searched in the raw bytes, with the same result as the decoded search."""
+    td.filter_by_contains('spaceship')
+    td.filter_by_not_contains('Lorem')
+    byte_search = td.aggregation_states[1:]
+
+    monkeypatch.setattr(td, '_encode_for_byte_search', lambda string: None)
+    td.load_aggregation_state(0)
+    td.filter_by_contains('spaceship')
+    td.filter_by_not_contains('Lorem')
+
+    assert td.aggregation_states[3:] == byte_search
+
+
+def test_filter_by_contains_handles_empty_files(tmp_path):
+    """Empty files cannot be memory-mapped, but are searched all the same."""
+    from textdirectory.textdirectory import TextDirectory
+
+    (tmp_path / 'empty.txt').write_text('')
+    (tmp_path / 'full.txt').write_text('Grüße aus Köln')
+    td = TextDirectory(directory=tmp_path, disable_tqdm=True)
+    td.load_files()
+
+    td.filter_by_contains('Köln')
+    assert filenames(td) == ['full.txt']
+
+    td.load_aggregation_state(0)
+    td.filter_by_not_contains('Köln')
+    assert filenames(td) == ['empty.txt']
+
+
+def test_filter_by_regex(td):
+    """Regular expressions are matched anywhere in the file, optionally ignoring case."""
+    td.filter_by_regex(r'space\w+')
+    assert filenames(td) == ['Text_E.txt']
+
+    td.load_aggregation_state(0)
+    td.filter_by_regex(r'^lorem', ignore_case=True)
+    assert filenames(td) == ['Text_2_B.txt', 'Text_2_C.txt', 'Text_C.txt']
+
+
+def test_filter_by_not_regex(td):
+    """Files without a match are kept."""
+    td.filter_by_not_regex(r'\d')
+    assert len(td.aggregation) == 9
+
+
+def test_content_filters_in_parallel(testdata_dir):
+    """Byte and regex searches run in the worker pool, with the same result."""
+    from textdirectory.textdirectory import TextDirectory
+
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True, workers=2, pool='thread')
+    td.load_files()
+    td.run_filters([['filter_by_not_regex', r'\d'], ['filter_by_contains', 'Lorem']])
+
+    assert filenames(td) == ['Text_2_B.txt', 'Text_2_C.txt', 'Text_C.txt']
+    assert len(td.aggregation_states[1].aggregation) == 9
+
+
+@pytest.fixture
+def duplicates(tmp_path):
+    """A corpus with two identical files, a same-sized different file, and a file with a unique size."""
+    from textdirectory.textdirectory import TextDirectory
+
+    for name, text in (('a.txt', 'same text'), ('b.txt', 'other one'), ('c.txt', 'same text'), ('d.txt', 'unique')):
+        (tmp_path / name).write_text(text, encoding='utf8')
+
+    td = TextDirectory(directory=tmp_path, disable_tqdm=True)
+    td.load_files(fast=True)
+    return td
+
+
+@pytest.mark.parametrize(
+    ('strategy', 'expected'),
+    [('first', ['a.txt', 'b.txt', 'd.txt']), ('last', ['b.txt', 'c.txt', 'd.txt']), ('drop', ['b.txt', 'd.txt'])],
+)
+def test_filter_by_unique_content(duplicates, strategy, expected):
+    """Byte-identical files are removed according to the strategy."""
+    duplicates.filter_by_unique_content(strategy)
+    assert filenames(duplicates) == expected
+
+
+def test_filter_by_unique_content_only_hashes_same_sized_files(duplicates):
+    """Files with a unique size are not read; the computed hashes are kept in the records."""
+    duplicates.filter_by_unique_content()
+
+    assert [file['hash'] is not False for file in duplicates.files] == [True, True, True, False]
+    assert duplicates.files[0]['hash'] == duplicates.files[2]['hash']
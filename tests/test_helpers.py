@@ -1,5 +1,9 @@
 """Tests for the helpers module."""
 
+import random
+from collections import Counter
+from datetime import datetime, timezone
+
 import pytest
 
 from textdirectory import TextDirectory, helpers
@@ -71,6 +75,50 @@ def test_type_token_ratio_empty_text():
     assert helpers.type_token_ratio('') == 0.0
 
 
+def test_count_types_and_tokens():
+    """Types are the distinct tokens."""
+    assert helpers.count_types_and_tokens('a b a c a') == (3, 5)
+    assert helpers.count_types_and_tokens('') == (0, 0)
+
+
+def test_moving_average_type_token_ratio():
+    """MATTR averages the ratios of all windows; short texts get their plain ratio."""
+    # Windows: (a b a) 2/3, (b a c) 3/3, (a c c) 2/3
+    assert helpers.moving_average_type_token_ratio(iter('abacc'), window=3) == pytest.approx(7 / 9)
+    assert helpers.moving_average_type_token_ratio('aab', window=10) == pytest.approx(2 / 3)
+    assert helpers.moving_average_type_token_ratio([], window=10) == 0.0
+
+    with pytest.raises(ValueError):
+        helpers.moving_average_type_token_ratio('ab', window=0)
+
+
+def test_iter_file_tokens_across_chunks(tmp_path):
+    """Tokens spanning two chunks are not split."""
+    path = tmp_path / 'long.txt'
+    text = 'alpha beta gamma delta epsilon ' * 50
+    path.write_text(text, encoding='utf8')
+
+    assert list(helpers.iter_file_tokens(path, chunk_size=7)) == helpers.simple_tokenizer(text)
+
+
+def test_iter_file_chunks(tmp_path):
+    """Chunks end at line breaks, else at whitespace, and join to the text of the file."""
+    path = tmp_path / 'text.txt'
+    path.write_text('one two\nthree four five\nsix', encoding='utf8')
+
+    assert list(helpers.iter_file_chunks(path, chunk_size=10)) == ['one two\n', 'three four ', 'five\n', 'six']
+
+    # Reads without whitespace are never split, but carried over until there is a safe place to cut
+    path.write_text('x' * 25 + ' y', encoding='utf8')
+    assert list(helpers.iter_file_chunks(path, chunk_size=10)) == ['x' * 25 + ' ', 'y']
+
+    path.write_text('x' * 25, encoding='utf8')
+    assert list(helpers.iter_file_chunks(path, chunk_size=10)) == ['x' * 25]
+
+    with pytest.raises(ValueError):
+        list(helpers.iter_file_chunks(path, chunk_size=10, max_chunk_size=20))
+
+
 def test_coerce_args_by_signature():
     """String args are coerced to the types the target signature suggests."""
     coerced = helpers.coerce_args_by_signature(TextDirectory.filter_by_max_chars, ['50'])
@@ -148,3 +196,111 @@ def test_get_available_transformations_human():
     """Test the get_available_transformations helper with human names."""
     available_transformations = helpers.get_available_transformations(get_human_name=True)
     assert ('transformation_crude_spellchecker', 'transformation_crude_spellchecker') in available_transformations
+
+
+@pytest.mark.parametrize('pool', ['process', 'thread'])
+def test_parallel_map_keeps_the_order(pool):
+    """Results arrive in the order of the items, whatever the pool."""
+    assert list(helpers.parallel_map(abs, range(-50, 0), workers=3, pool=pool)) == list(range(50, 0, -1))
+
+
+def test_parallel_map_rejects_unknown_pools():
+    """An unknown pool raises a ValueError."""
+    with pytest.raises(ValueError):
+        helpers.parallel_map(abs, [1], workers=2, pool='cluster')
+
+
+def test_get_filter_cost():
+    """Filters declare their cost class in the docstring; undeclared ones are barriers."""
+    assert helpers.get_filter_cost('filter_by_filename_contains') == 'filename'
+    assert helpers.get_filter_cost('filter_by_contains') == 'content'
+    assert helpers.get_filter_cost('filter_by_random_sampling') == 'barrier'
+
+
+def test_format_size():
+    """Sizes are formatted with a unit."""
+    assert helpers.format_size(100) == '100 B'
+    assert helpers.format_size(1536) == '1.5 kB'
+
+
+def test_to_timestamp():
+    """Timestamps, datetimes, and ISO strings are converted to timestamps."""
+    moment = datetime(2024, 1, 31, 12, tzinfo=timezone.utc)
+
+    assert helpers.to_timestamp(moment) == 1706702400
+    assert helpers.to_timestamp('2024-01-31T12:00+00:00') == 1706702400
+    assert helpers.to_timestamp('1706702400') == 1706702400
+
+
+def test_to_nanoseconds_bound():
+    """Bounds select exactly the nanoseconds whose seconds lie within them."""
+    nanoseconds = 1_712_345_678_123_456_789
+    seconds = nanoseconds / 1e9
+
+    lower = helpers.to_nanoseconds_bound(seconds)
+    upper = helpers.to_nanoseconds_bound(seconds, upper=True)
+    assert lower <= nanoseconds <= upper
+    assert (lower - 1) / 1e9 < seconds == lower / 1e9 == upper / 1e9 < (upper + 1) / 1e9
+
+
+def test_reservoir_sample():
+    """Samples have the requested size, no duplicates, and depend only on the seed."""
+    sample = helpers.reservoir_sample(iter(range(10_000)), 50, random.Random(1))
+
+    assert len(set(sample)) == 50
+    assert sample == helpers.reservoir_sample(range(10_000), 50, random.Random(1))
+    assert sorted(helpers.reservoir_sample(range(3), 50)) == [0, 1, 2]
+
+
+def test_reservoir_sample_is_uniform():
+    """Every item is about equally likely to be drawn, including the late ones."""
+    rng = random.Random(0)
+    counts = Counter(item for _ in range(2000) for item in helpers.reservoir_sample(range(20), 5, rng))
+
+    assert all(400 < counts[item] < 600 for item in range(20))
+
+
+def test_stratified_sample_is_proportional():
+    """The sample is split between the strata in proportion to their sizes."""
+    items = [('a', i) for i in range(60)] + [('b', i) for i in range(30)] + [('c', i) for i in range(10)]
+    sample = helpers.stratified_sample(items, 10, key=lambda item: item[0], rng=random.Random(2))
+
+    assert Counter(stratum for stratum, _ in sample) == {'a': 6, 'b': 3, 'c': 1}
+    assert len(set(sample)) == 10
+
+
+def test_stratified_sample_with_many_small_strata():
+    """Thousands of tiny strata are sampled within the budget; the large stratum still gets its share."""
+    items = [('big', i) for i in range(20_000)] + [(f'small_{i // 4}', i) for i in range(20_000)]
+    random.Random(0).shuffle(items)
+    sample = helpers.stratified_sample(items, 100, key=lambda item: item[0], rng=random.Random(3), budget=1000)
+
+    assert len(set(sample)) == 100
+    assert sum(stratum == 'big' for stratum, _ in sample) == 50
+
+
+def test_percentile():
+    """Percentiles are interpolated linearly between the closest values."""
+    assert helpers.percentile([1, 2, 3, 4], 50) == 2.5
+    assert helpers.percentile([1, 2, 3, 4], 100) == 4
+    assert helpers.percentile([7], 5) == 7
+
+    with pytest.raises(ValueError):
+        helpers.percentile([1, 2], 101)
+
+
+def test_outlier_bounds():
+    """Bounds are placed threshold spreads around the center."""
+    assert helpers.outlier_bounds([1, 2, 3, 4, 100], 2, 'mad') == pytest.approx((3, 1.4826, 0.0348, 5.9652))
+    assert helpers.outlier_bounds([2, 4, 4, 4, 5, 5, 7, 9], 1, 'sigma') == (5, 2, 3, 7)
+
+    with pytest.raises(ValueError):
+        helpers.outlier_bounds([1, 2], method='iqr')
+
+
+def test_load_keywords(tmp_path):
+    """Blank lines and comments are skipped; keywords are stripped."""
+    keywords_file = tmp_path / 'keywords.txt'
+    keywords_file.write_text('# comment\n  alpha \n\nbeta\n')
+
+    assert helpers.load_keywords(keywords_file) == ['alpha', 'beta']
@@ -0,0 +1,63 @@
+"""Tests for the compact id sets."""
+
+from textdirectory.idsets import Bitmap, PackedIds
+
+
+def test_bitmap_roundtrip():
+    """Ids come back sorted and deduplicated."""
+    bitmap = Bitmap.from_ids([9, 0, 3, 3, 1000])
+
+    assert bitmap.to_list() == [0, 3, 9, 1000]
+    assert len(bitmap) == 4
+    assert 9 in bitmap
+    assert 8 not in bitmap
+
+
+def test_bitmap_set_algebra():
+    """Union, intersection, and difference behave like sets."""
+    a = Bitmap.from_ids([1, 2, 3, 64])
+    b = Bitmap.from_ids([3, 4, 64])
+
+    assert (a | b).to_list() == [1, 2, 3, 4, 64]
+    assert (a & b).to_list() == [3, 64]
+    assert (a - b).to_list() == [1, 2]
+
+
+def test_empty_bitmap():
+    """An empty bitmap has no ids and no bytes."""
+    assert Bitmap.from_ids([]).to_list() == []
+    assert not Bitmap()
+    assert Bitmap().nbytes == 0
+
+
+def test_packed_ids_roundtrip():
+    """Packed ids unpack to the same sequence, whatever its order."""
+    for ids in ([], [5], [0, 1, 2, 300, 70000, 5000000], [3, 1, 2], [4, 4, 4]):
+        packed = PackedIds.pack(ids)
+
+        assert packed.to_list() == ids
+        assert packed == ids
+        assert len(packed) == len(ids)
+
+
+def test_packed_ids_are_compact():
+    """A run of a million neighbouring ids takes a few kilobytes."""
+    packed = PackedIds.pack(range(1_000_000))
+
+    assert packed.nbytes < 10_000
+    assert packed.to_list()[-1] == 999_999
+
+
+def test_packed_ids_behave_like_lists(td):
+    """Saved aggregations can be indexed, sliced, and concatenated like the lists stored before."""
+    packed = PackedIds.pack([2, 5, 9, 12])
+
+    assert packed[1] == 5
+    assert packed[-1] == 12
+    assert packed[:2] == [2, 5]
+    assert packed + [20] == [2, 5, 9, 12, 20]
+    assert [0] + packed == [0, 2, 5, 9, 12]
+
+    td.filter_by_max_tokens(10)
+    state = td.aggregation_states[-1]
+    assert state[0][0] == state.aggregation[:1][0] == td.aggregation[0]
@@ -0,0 +1,103 @@
+"""Tests for the inverted index."""
+
+import os
+
+import pytest
+
+from textdirectory.invertedindex import InvertedIndex, tokenize
+from textdirectory.metadataindex import get_signature
+from textdirectory.textdirectory import TextDirectory
+
+
+@pytest.fixture
+def corpus(make_td):
+    """A small corpus of three files, loaded, with an inverted index."""
+    td = make_td(
+        {
+            'a.txt': 'The spaceship flew to Mars.',
+            'b.txt': 'A ship in the deep sea; the whale and the ship.',
+            'c.txt': 'Deep space and a sea of stars.',
+        }
+    )
+    td.open_inverted_index()
+    return td
+
+
+def test_tokenize():
+    """Terms are lowercased word tokens."""
+    assert tokenize("She's the ONE.") == ['she', 's', 'the', 'one']
+
+
+def test_update_only_reads_changed_files(tmp_path):
+    """Unchanged files are skipped; missing files are removed from the index."""
+    (tmp_path / 'a.txt').write_text('alpha beta')
+    (tmp_path / 'b.txt').write_text('gamma')
+    files = [(name, tmp_path / name, get_signature(tmp_path / name)) for name in ('a.txt', 'b.txt')]
+
+    with InvertedIndex(tmp_path / 'index.sqlite') as index:
+        assert index.update(files).indexed == ['a.txt', 'b.txt']
+        assert index.update(files).indexed == []
+
+        update = index.update(files[:1])
+        assert update.removed == ['b.txt']
+        assert len(index) == 1
+        assert index.search_term('gamma') == set()
+
+
+def test_filter_by_term(corpus, filenames):
+    """Terms match whole words, case-insensitively."""
+    corpus.filter_by_term('SHIP')
+    assert filenames(corpus) == ['b.txt']
+
+
+def test_filter_by_phrase(corpus, filenames):
+    """Phrases match words next to each other, in order."""
+    corpus.filter_by_phrase('deep sea')
+    assert filenames(corpus) == ['b.txt']
+
+
+def test_filter_by_query(corpus, filenames):
+    """Boolean queries with AND, OR, NOT, parentheses, and phrases."""
+    corpus.filter_by_query('(ship OR stars) NOT whale')
+    assert filenames(corpus) == ['c.txt']
+
+    corpus.load_aggregation_state(0)
+    corpus.filter_by_query('sea "the spaceship" OR mars')
+    assert filenames(corpus) == ['a.txt']
+
+    corpus.load_aggregation_state(0)
+    corpus.filter_by_query('the AND sea')
+    assert filenames(corpus) == ['b.txt']
+
+
+def test_invalid_query_raises(corpus):
+    """Malformed queries raise a ValueError and record no state."""
+    for query in ('(ship OR sea', 'ship OR', 'ship )'):
+        with pytest.raises(ValueError):
+            corpus.filter_by_query(query)
+
+    assert len(corpus.aggregation_states) == 1
+
+
+def test_index_filters_need_an_index(testdata_dir):
+    """Without an inverted index, the index filters raise."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    td.load_files()
+
+    with pytest.raises(ValueError):
+        td.filter_by_term('spaceship')
+
+
+def test_refresh_updates_the_index(corpus, filenames):
+    """Added, modified, and removed files are reflected in the index."""
+    directory = corpus.directory
+    (directory / 'd.txt').write_text('Another ship.', encoding='utf8')
+    (directory / 'b.txt').unlink()
+    (directory / 'c.txt').write_text('A whale.', encoding='utf8')
+    stat = os.stat(directory / 'c.txt')
+    os.utime(directory / 'c.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    corpus.refresh()
+    corpus.filter_by_query('ship OR whale')
+
+    assert filenames(corpus) == ['c.txt', 'd.txt']
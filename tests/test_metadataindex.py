@@ -0,0 +1,100 @@
+"""Tests for the persistent metadata index."""
+
+import os
+
+from textdirectory import textdirectory as td_module
+from textdirectory.metadataindex import FileSignature, MetadataIndex, get_signature
+from textdirectory.textdirectory import TextDirectory
+
+TEXTS = {'a.txt': 'alpha beta', 'b.txt': 'gamma', 'c.txt': 'delta epsilon zeta'}
+
+
+def count_scans(monkeypatch):
+    """Count the files that are actually scanned."""
+    scanned = []
+    original = td_module.scan_file
+
+    def counting_scan_file(path, *args, **kwargs):
+        scanned.append(path.name)
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(td_module, 'scan_file', counting_scan_file)
+    return scanned
+
+
+def test_warm_start_reuses_the_index(tmp_path, monkeypatch, make_td):
+    """Unchanged files are not scanned again, and their metadata is identical."""
+    cold = make_td(TEXTS, metadata_index=True)
+
+    scanned = count_scans(monkeypatch)
+    warm = TextDirectory(directory=tmp_path, disable_tqdm=True)
+    warm.load_files(metadata_index=True)
+
+    assert scanned == []
+    assert warm.files == cold.files
+
+
+def test_changed_files_are_rescanned(tmp_path, monkeypatch, make_td):
+    """Only files whose signature changed are scanned again."""
+    make_td(TEXTS, metadata_index=True)
+
+    (tmp_path / 'b.txt').write_text('gamma gamma gamma gamma', encoding='utf8')
+    stat = os.stat(tmp_path / 'b.txt')
+    os.utime(tmp_path / 'b.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    scanned = count_scans(monkeypatch)
+    td = TextDirectory(directory=tmp_path, disable_tqdm=True)
+    td.load_files(metadata_index=True)
+
+    assert scanned == ['b.txt']
+    assert td.files[1]['tokens'] == 4
+
+
+def test_index_file_is_not_loaded_as_text(tmp_path, make_td):
+    """The sidecar index in the corpus root is not picked up by the '*' filetype."""
+    td = make_td(TEXTS, filetype='*', metadata_index=True)
+
+    assert (tmp_path / MetadataIndex.DEFAULT_FILENAME).exists()
+    assert [file['filename'] for file in td.files] == ['a.txt', 'b.txt', 'c.txt']
+
+
+def test_metadata_index_store_and_remove(tmp_path):
+    """Entries roundtrip through the index and can be removed."""
+    (tmp_path / 'a.txt').write_text('alpha', encoding='utf8')
+    signature = get_signature(tmp_path / 'a.txt')
+
+    with MetadataIndex(tmp_path / 'index.sqlite') as index:
+        index.store([('a.txt', signature, {'tokens': 1})])
+        assert index.load() == {'a.txt': (signature, {'tokens': 1})}
+
+        index.remove(['a.txt'])
+        assert len(index) == 0
+
+
+def test_metadata_index_loads_only_the_requested_keys(tmp_path):
+    """Looking up keys returns just their entries, across several batches."""
+    signature = FileSignature(1, 2, 3)
+
+    with MetadataIndex(tmp_path / 'index.sqlite') as index:
+        index.store((f'{i}.txt', signature, {'tokens': i}) for i in range(1200))
+        loaded = index.load([f'{i}.txt' for i in range(0, 1200, 2)] + ['missing.txt'])
+
+    assert len(loaded) == 600
+    assert loaded['1198.txt'] == (signature, {'tokens': 1198})
+
+
+def test_unserializable_extractor_results_are_not_cached(tmp_path, monkeypatch, make_td):
+    """Results JSON cannot store are left out of the index, and their files are scanned again."""
+    td = make_td(TEXTS, load=False)
+    td.register_metadata_extractor('letters', set)
+    td.load_files(metadata_index=True)
+    td.metadata_index.close()
+    assert td.files[0]['letters'] == set('alpha beta')
+
+    scanned = count_scans(monkeypatch)
+    td = TextDirectory(directory=tmp_path, disable_tqdm=True)
+    td.register_metadata_extractor('letters', set)
+    td.load_files(metadata_index=True)
+
+    assert scanned == ['a.txt', 'b.txt', 'c.txt']
+    assert td.files[1]['letters'] == set('gamma')
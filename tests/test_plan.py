@@ -0,0 +1,73 @@
+"""Tests for staged filters and the filter plan."""
+
+import pytest
+
+from textdirectory.textdirectory import TextDirectory
+
+
+def test_plan_runs_cheap_filters_first(td):
+    """Content filters move behind filename and size filters."""
+    plan = td.plan_filters([['filter_by_contains', 'x'], ['filter_by_max_filesize', 1], ['filter_by_filenames', 'a']])
+
+    assert [step.filter[0] for step in plan] == ['filter_by_filenames', 'filter_by_max_filesize', 'filter_by_contains']
+    assert [step.cost for step in plan] == ['filename', 'stat', 'content']
+    assert plan[0].estimated_io == 0
+    assert plan[2].estimated_io == sum(file['size'] for file in td.files)
+
+
+def test_plan_does_not_reorder_across_barriers(td):
+    """Nothing is moved across a random sampling."""
+    plan = td.plan_filters(
+        [['filter_by_contains', 'x'], ['filter_by_random_sampling', 2], ['filter_by_filename_contains', 'a']]
+    )
+
+    assert [step.filter[0] for step in plan] == [
+        'filter_by_contains',
+        'filter_by_random_sampling',
+        'filter_by_filename_contains',
+    ]
+
+
+def test_run_staged_filters_keeps_the_checkpoints(td):
+    """Staged filters run in plan order, each recording its checkpoint, and the result matches eager filtering."""
+    td.stage_filter(['filter_by_contains', 'Lorem'])
+    td.stage_filter(['filter_by_filename_contains', 'Text_2'])
+    td.run_staged_filters()
+
+    assert td.staged_filters == []
+    assert td.applied_filters == ['filter_by_filename_contains', 'filter_by_contains']
+    assert len(td.aggregation_states) == 3
+
+    optimized = td.aggregation
+    td.load_aggregation_state(0)
+    td.run_filters([['filter_by_contains', 'Lorem'], ['filter_by_filename_contains', 'Text_2']])
+    assert td.aggregation == optimized
+
+
+def test_explain(td):
+    """explain lists the steps in plan order with their estimated I/O."""
+    td.stage_filter(['filter_by_contains', 'Lorem'])
+    td.stage_filter(['filter_by_max_filesize', 1])
+
+    explanation = td.explain()
+
+    assert '1. filter_by_max_filesize(1) [stat] est. I/O: 0 B' in explanation
+    assert "2. filter_by_contains('Lorem') [content]" in explanation
+
+
+def test_lazy_metadata_filters_are_estimated_as_reads(testdata_dir):
+    """With metadata still to collect, metadata filters read files but still run before content filters."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    td.load_files(fast=True)
+
+    plan = td.plan_filters([['filter_by_contains', 'x'], ['filter_by_min_tokens', 1], ['filter_by_max_tokens', 9]])
+
+    assert [step.filter[0] for step in plan] == ['filter_by_min_tokens', 'filter_by_max_tokens', 'filter_by_contains']
+    assert plan[0].estimated_io > 0
+    assert plan[1].estimated_io == 0
+
+
+def test_stage_filter_rejects_unknown_names(td):
+    """Only filters can be staged."""
+    with pytest.raises(NameError):
+        td.stage_filter(['load_files'])
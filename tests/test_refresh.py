@@ -0,0 +1,116 @@
+"""Tests for refreshing a loaded TextDirectory."""
+
+import os
+
+import pytest
+
+from textdirectory.textdirectory import TextDirectory
+
+
+@pytest.fixture
+def corpus(make_td):
+    """A small corpus of three files, loaded."""
+    return make_td({'a.txt': 'alpha beta', 'b.txt': 'gamma', 'c.txt': 'delta epsilon zeta'})
+
+
+def test_refresh_picks_up_added_removed_and_modified_files(corpus, filenames):
+    """All three kinds of changes are detected and reported."""
+    directory = corpus.directory
+    (directory / 'd.txt').write_text('eta theta', encoding='utf8')
+    (directory / 'a.txt').unlink()
+    (directory / 'b.txt').write_text('gamma gamma gamma', encoding='utf8')
+    stat = os.stat(directory / 'b.txt')
+    os.utime(directory / 'b.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    result = corpus.refresh()
+
+    assert result.added == [3]
+    assert result.removed == [0]
+    assert result.modified == [1]
+    assert filenames(corpus) == ['b.txt', 'c.txt', 'd.txt']
+    assert corpus.files[1]['tokens'] == 3
+    assert repr(corpus).startswith('TextDirectory: 3 files')
+
+
+def test_refresh_keeps_the_saved_states(corpus, filenames):
+    """Saved states survive: removed files are dropped, filtered states do not gain new files."""
+    corpus.filter_by_min_tokens(2)
+    assert filenames(corpus) == ['a.txt', 'c.txt']
+
+    (corpus.directory / 'c.txt').unlink()
+    (corpus.directory / 'd.txt').write_text('eta theta', encoding='utf8')
+    corpus.refresh()
+
+    assert filenames(corpus) == ['a.txt']
+    assert len(corpus.aggregation_states[1].aggregation) == 1
+
+    corpus.load_aggregation_state(0)
+    assert filenames(corpus) == ['a.txt', 'b.txt', 'd.txt']
+
+
+def test_refresh_without_changes_is_a_no_op(corpus):
+    """Nothing changes when the directory did not change."""
+    assert corpus.refresh() == ([], [], [])
+    assert len(corpus.aggregation) == 3
+
+
+def test_refresh_before_loading_raises(tmp_path):
+    """There is nothing to refresh before files have been loaded."""
+    with pytest.raises(ValueError):
+        TextDirectory(directory=tmp_path).refresh()
+
+
+def test_stat_filters_use_the_discovered_signatures(corpus, filenames):
+    """The size and time filters work from memory until restat() is called."""
+    stat = os.stat(corpus.directory / 'a.txt')
+    os.utime(corpus.directory / 'c.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 3600 * 10**9))
+
+    corpus.filter_by_mtime(min_mtime=stat.st_mtime_ns / 1e9 + 1800)
+    assert filenames(corpus) == []
+
+    result = corpus.restat()
+    assert result == ([], [], [2])
+    assert corpus.files[2]['mtime'] == stat.st_mtime_ns / 1e9 + 3600
+
+    corpus.load_aggregation_state(0)
+    corpus.filter_by_mtime(min_mtime=stat.st_mtime_ns / 1e9 + 1800)
+    assert filenames(corpus) == ['c.txt']
+
+
+def test_mtime_bounds_round_trip(corpus, filenames):
+    """A record's own mtime selects it, although nanosecond timestamps do not fit a float exactly."""
+    path = corpus.directory / 'b.txt'
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, 1_712_345_678_123_456_789))
+    corpus.restat()
+
+    mtime = corpus.files[1]['mtime']
+    corpus.filter_by_mtime(min_mtime=mtime, max_mtime=mtime)
+    assert filenames(corpus) == ['b.txt']
+
+
+def test_restat_ignores_the_inode(corpus):
+    """Discovery reports no inodes on Windows (os.scandir); unchanged files are not rescanned for that."""
+    for file_id in range(3):
+        corpus.files.set_signature(file_id, corpus.files.get_signature(file_id)._replace(inode=0))
+
+    assert corpus.restat() == ([], [], [])
+
+
+def test_restat_drops_removed_files(corpus, filenames):
+    """Files that are gone are removed, but new files are not picked up."""
+    (corpus.directory / 'a.txt').unlink()
+    (corpus.directory / 'd.txt').write_text('eta theta', encoding='utf8')
+
+    assert corpus.restat() == ([], [0], [])
+    assert filenames(corpus) == ['b.txt', 'c.txt']
+
+
+def test_fast_loading_keeps_the_discovered_size(make_td, filenames):
+    """Without metadata, the size is still known from discovery."""
+    td = make_td({'a.txt': 'x' * 2048}, fast=True)
+    assert td.files[0]['size'] == 2048
+    assert td.files[0]['characters'] is False
+
+    td.filter_by_min_filesize(2)
+    assert filenames(td) == ['a.txt']
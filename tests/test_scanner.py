@@ -0,0 +1,66 @@
+"""Tests for the single-pass metadata scanner."""
+
+import pytest
+
+from textdirectory import helpers
+from textdirectory.scanner import scan_file
+from textdirectory.textdirectory import TextDirectory
+
+
+def test_scan_file_matches_the_separate_readers(td):
+    """The fused scan counts characters and tokens exactly like the per-field readers."""
+    for file in td.get_aggregation():
+        metadata = scan_file(file['path'])
+
+        assert metadata['characters'] == td.get_file_length(file['path'])
+        assert metadata['tokens'] == td.get_file_tokens(file['path'])
+        assert metadata['size'] == file['path'].stat().st_size
+
+
+def test_scan_file_normalizes_line_breaks(tmp_path):
+    """Windows line breaks are counted like in text mode."""
+    path = tmp_path / 'crlf.txt'
+    path.write_bytes(b'one two\r\nthree\r\n')
+
+    metadata = scan_file(path)
+
+    assert metadata['characters'] == len('one two\nthree\n')
+    assert metadata['tokens'] == 3
+    assert metadata['types'] == 3
+    assert metadata['lines'] == 2
+    assert metadata['size'] == 16
+
+
+def test_scan_file_hash_identifies_content(tmp_path):
+    """Identical content hashes identically."""
+    (tmp_path / 'a.txt').write_text('same', encoding='utf8')
+    (tmp_path / 'b.txt').write_text('same', encoding='utf8')
+    (tmp_path / 'c.txt').write_text('different', encoding='utf8')
+
+    hashes = [scan_file(tmp_path / name)['hash'] for name in ('a.txt', 'b.txt', 'c.txt')]
+
+    assert hashes[0] == hashes[1] != hashes[2]
+
+
+def test_registered_extractors_run_during_loading(testdata_dir):
+    """Registered extractors are stored in the file records."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    td.register_metadata_extractor('upper_count', lambda text: sum(c.isupper() for c in text))
+    td.load_files()
+
+    assert all(isinstance(file['upper_count'], int) for file in td.files)
+
+
+def test_extractors_cannot_shadow_built_in_keys(testdata_dir):
+    """Names of built-in keys are rejected, including the read-only mtime and the derived ttr and minhash."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+
+    for name in ('tokens', 'path', 'mtime', 'ttr', 'minhash'):
+        with pytest.raises(ValueError):
+            td.register_metadata_extractor(name, len)
+
+
+def test_count_tokens_matches_simple_tokenizer():
+    """count_tokens counts what simple_tokenizer returns."""
+    text = 'lorem ipsum, dolor! sit amet'
+    assert helpers.count_tokens(text) == len(helpers.simple_tokenizer(text))
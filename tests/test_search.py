@@ -0,0 +1,78 @@
+"""Tests for the search module."""
+
+import re
+
+import pytest
+
+from textdirectory.search import KeywordAutomaton, file_contains, file_contains_utf8, file_matches
+
+
+def test_automaton_finds_overlapping_keywords():
+    """Keywords that overlap or are suffixes of each other are all found."""
+    automaton = KeywordAutomaton(['he', 'she', 'his', 'hers'])
+
+    assert sorted(automaton.iter_matches('ushers')) == [(1, 'she'), (2, 'he'), (2, 'hers')]
+    assert automaton.find('this and that') == {'his'}
+
+
+def test_automaton_semantics():
+    """Any, all, and the handling of characters outside the keywords."""
+    automaton = KeywordAutomaton(['spaceship', 'ship'])
+
+    assert automaton.contains_any('a ship')
+    assert not automaton.contains_any('a sh!ip')
+    assert automaton.contains_all('the spaceship')
+    assert not automaton.contains_all('a ship')
+
+
+def test_automaton_rejects_empty_keywords():
+    """Empty keywords would match everything."""
+    with pytest.raises(ValueError):
+        KeywordAutomaton([])
+
+    with pytest.raises(ValueError):
+        KeywordAutomaton(['a', ''])
+
+
+def test_file_contains(tmp_path):
+    """Byte search in a memory-mapped file, including empty files."""
+    path = tmp_path / 'a.txt'
+    path.write_text('Grüße', encoding='utf8')
+    empty = tmp_path / 'empty.txt'
+    empty.write_bytes(b'')
+
+    assert file_contains(path, 'üß'.encode())
+    assert not file_contains(path, b'x')
+    assert not file_contains(empty, b'x')
+    assert file_contains(empty, b'')
+
+
+def test_byte_search_drops_invalid_bytes_like_decoding(tmp_path, make_td):
+    """Invalid UTF-8 bytes are dropped when decoding, so they may not break a match found in the decoded text."""
+    td = make_td({'valid.txt': 'foo bar'}, load=False)
+    (tmp_path / 'invalid.txt').write_bytes(b'foo\xffbar')
+    td.load_files()
+
+    assert file_contains_utf8(tmp_path / 'invalid.txt', b'foobar')
+    assert not file_contains_utf8(tmp_path / 'valid.txt', b'foobar')
+    assert not file_contains_utf8(tmp_path / 'invalid.txt', b'baz')
+
+    td.filter_by_contains('foobar')
+    assert [file['filename'] for file in td.get_aggregation()] == ['invalid.txt']
+
+    td.load_aggregation_state(0)
+    td.filter_by_not_contains('foobar')
+    assert [file['filename'] for file in td.get_aggregation()] == ['valid.txt']
+
+
+def test_file_matches_across_chunks(tmp_path):
+    """Matches spanning chunks are found; anchors only match where they would in the whole file."""
+    path = tmp_path / 'a.txt'
+    path.write_text('abcdefghij\nfoo bar\nbaz')
+
+    for chunk_size in (1, 3, 100):
+        assert file_matches(path, re.compile(r'j\nfoo'), chunk_size=chunk_size, overlap=8)
+        assert file_matches(path, re.compile(r'(?m)^foo bar$'), chunk_size=chunk_size, overlap=8)
+        assert not file_matches(path, re.compile(r'^foo'), chunk_size=chunk_size, overlap=8)
+        assert not file_matches(path, re.compile(r'bar$'), chunk_size=chunk_size, overlap=8)
+        assert not file_matches(path, re.compile(r'\bdef'), chunk_size=chunk_size, overlap=8)
@@ -0,0 +1,90 @@
+"""Tests for MinHash signatures, the LSH index, and the similarity filters."""
+
+import os
+
+import pytest
+
+from textdirectory.similarity import LSHIndex, estimate_jaccard, minhash
+from textdirectory.textdirectory import TextDirectory
+
+BASE = 'The quick brown fox jumps over the lazy dog near the river bank. ' * 10
+
+
+@pytest.fixture
+def corpus(make_td):
+    """A corpus with a cluster of three near-duplicates and two unrelated files."""
+    return make_td(
+        {
+            'a.txt': BASE,
+            'b.txt': BASE.replace('lazy', 'sleepy', 1),
+            'c.txt': BASE.upper(),
+            'd.txt': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 10,
+            'e.txt': 'Something else entirely, about ships and the deep sea.',
+        }
+    )
+
+
+def test_minhash_estimates_jaccard():
+    """Similar texts have similar signatures; signatures are stable and normalized."""
+    assert minhash(BASE) == minhash(BASE.upper().replace(' ', '  '))
+    assert estimate_jaccard(minhash(BASE), minhash(BASE.replace('lazy', 'sleepy', 2))) > 0.8
+    assert estimate_jaccard(minhash(BASE), minhash('Lorem ipsum dolor sit amet')) < 0.1
+
+
+def test_lsh_index():
+    """Queries find similar signatures; removed signatures are gone."""
+    index = LSHIndex()
+    index.add(1, minhash(BASE))
+    index.add(2, minhash('Lorem ipsum dolor sit amet'))
+
+    assert index.query(minhash(BASE.replace('lazy', 'sleepy', 1)), 0.8) == {1}
+
+    index.remove(1)
+    assert index.query(minhash(BASE)) == set()
+    assert len(index) == 1
+
+
+def test_filter_by_similar_documents_minhash(corpus, filenames):
+    """MinHash similarity finds the near-duplicates of a reference file."""
+    corpus.filter_by_similar_documents(corpus.directory / 'a.txt', 0.8, 'minhash')
+
+    assert filenames(corpus) == ['a.txt', 'b.txt', 'c.txt']
+    assert len(corpus.files[0]['minhash']) == 128
+
+
+def test_filter_by_similar_documents_minhash_low_threshold(corpus):
+    """Below the LSH threshold, all signatures are compared."""
+    corpus.filter_by_similar_documents(corpus.directory / 'a.txt', 0.0, 'minhash')
+    assert len(corpus.aggregation) == 5
+
+
+def test_filter_by_near_duplicates(corpus, filenames):
+    """One file of every cluster is kept: the first one."""
+    corpus.filter_by_near_duplicates(0.8)
+    assert filenames(corpus) == ['a.txt', 'd.txt', 'e.txt']
+
+
+def test_minhashes_are_cached_in_the_metadata_index(tmp_path, make_td):
+    """Signatures are stored in the metadata index and reused by the next run."""
+    td = make_td({'a.txt': BASE}, metadata_index=True)
+    td.filter_by_near_duplicates()
+    td.metadata_index.close()
+
+    td = TextDirectory(directory=tmp_path, disable_tqdm=True)
+    td.load_files(metadata_index=True)
+    assert td.files[0]['minhash'] == minhash(BASE)
+
+
+def test_refresh_invalidates_minhashes(corpus, filenames):
+    """A modified file gets a new signature."""
+    corpus.filter_by_near_duplicates()
+    path = corpus.directory / 'b.txt'
+    path.write_text('Now a completely different text about the deep sea and ships.', encoding='utf8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    corpus.refresh()
+    corpus.load_aggregation_state(0)
+    corpus.filter_by_near_duplicates()
+
+    assert filenames(corpus) == ['a.txt', 'b.txt', 'd.txt', 'e.txt']
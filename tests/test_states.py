@@ -66,7 +66,7 @@ def test_failed_filter_records_no_state(testdata_dir):
     states_before = len(td.aggregation_states)
 
     with pytest.raises(ValueError):
-        td.filter_by_max_chars(1)
+        td.filter_by_similar_documents(testdata_dir / 'Text_A.txt', threshold=1.5)
 
     assert len(td.aggregation_states) == states_before
     assert td.applied_filters == []
@@ -96,3 +96,43 @@ def test_print_saved_states(td, capsys):
     assert 'Saved States:' in out
     assert '[0]' in out
     assert '[1]' in out
+
+
+def test_state_set_algebra(td):
+    """Saved states can be combined; the result is saved as a new state."""
+    td.filter_by_max_chars(50)  # state 1
+    td.load_aggregation_state(0)
+    td.filter_by_filename_contains('Text_2')  # state 2
+
+    small = set(td.aggregation_states[1].aggregation)
+    level_2 = set(td.aggregation_states[2].aggregation)
+
+    td.subtract_aggregation_states(2, 1)
+    assert td.aggregation == sorted(level_2 - small)
+    assert td.current_state == 3
+    assert td.applied_filters == ['subtract_aggregation_states(2, 1)']
+
+    td.union_aggregation_states(1, 2)
+    assert td.aggregation == sorted(level_2 | small)
+
+    td.intersect_aggregation_states(1, 2)
+    assert td.aggregation == sorted(level_2 & small)
+
+
+def test_state_set_algebra_validates_states(td):
+    """Combining needs at least two existing states."""
+    with pytest.raises(ValueError):
+        td.union_aggregation_states(0)
+
+    with pytest.raises(ValueError):
+        td.union_aggregation_states(0, 99)
+
+
+def test_state_memory_report(td):
+    """The memory report lists every state with its packed size."""
+    td.filter_by_max_chars(50)
+
+    report = td.get_state_memory_report()
+
+    assert [row['files'] for row in report] == [10, 5]
+    assert all(0 < row['bytes'] <= row['list_bytes'] for row in report)
@@ -82,20 +82,28 @@ def test_load_files_fast_skip_checkpoint(testdata_dir):
     assert td.aggregation_states == []
 
 
-def test_metadata_filters_reject_fast_loaded_files(testdata_dir):
-    """Filters needing metadata raise in fast mode (regression: silently kept every file)."""
+def test_metadata_filters_collect_missing_metadata_lazily(td, testdata_dir):
+    """Filters needing metadata collect it on demand in fast mode (instead of raising)."""
+    fast = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    fast.load_files(recursive=True, filetype='txt', fast=True)
+
+    fast.filter_by_max_chars(50)
+    td.filter_by_max_chars(50)
+
+    assert fast.aggregation == td.aggregation
+    assert all(isinstance(file['characters'], int) for file in fast.get_aggregation())
+
+
+def test_lazy_metadata_is_only_collected_for_the_aggregation(testdata_dir):
+    """Files that were filtered out before are never scanned."""
     td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
     td.load_files(recursive=True, filetype='txt', fast=True)
 
-    for apply_filter in (
-        lambda: td.filter_by_max_chars(1),
-        lambda: td.filter_by_min_chars(1),
-        lambda: td.filter_by_max_tokens(1),
-        lambda: td.filter_by_min_tokens(1),
-        lambda: td.filter_by_chars_outliers(1),
-    ):
-        with pytest.raises(ValueError, match='fast=True'):
-            apply_filter()
+    td.filter_by_filename_contains('Text_2')
+    td.filter_by_min_tokens(1)
+
+    scanned = {file['filename'] for file in td.files if file['tokens'] is not False}
+    assert scanned == {'Text_2_A.txt', 'Text_2_B.txt', 'Text_2_C.txt', 'Text_2_D.txt', 'Text_2_E.txt'}
 
 
 def test_nested_iteration_is_independent(td):
@@ -195,3 +203,12 @@ def test_import_has_no_side_effects():
         check=True,
     )
     assert result.stdout == ''
+
+
+@pytest.mark.parametrize('pool', ['process', 'thread'])
+def test_load_files_in_parallel_matches_serial_loading(td, testdata_dir, pool):
+    """Loading with several workers yields the same records in the same order."""
+    parallel = TextDirectory(directory=testdata_dir, disable_tqdm=True, pool=pool)
+    parallel.load_files(recursive=True, sort=True, filetype='txt', workers=2)
+
+    assert parallel.files == td.files
@@ -0,0 +1,112 @@
+"""Tests for the memory-budgeted store of transformed texts."""
+
+import sys
+
+import pytest
+
+from textdirectory.filetable import SPILLED_TEXT
+from textdirectory.textstore import TextStore
+
+
+def test_store_without_budget_keeps_texts_in_memory():
+    """Without a budget, nothing is spilled and every read is a hit."""
+    store = TextStore()
+    for key in range(5):
+        store.set(key, 'text ' * 100)
+
+    assert store.get(3) == 'text ' * 100
+    assert len(store) == 5
+    assert 2 in store and 5 not in store
+    assert store.stats() == (1, 0, 0, 5, 5 * sys.getsizeof('text ' * 100), 0)
+    assert store._spill_directory is None
+
+
+def test_store_spills_least_recently_used_texts(tmp_path):
+    """Texts beyond the budget are compressed to disk, least recently used first, and read back unchanged."""
+    texts = {key: f'{key} ' + 'ünïcödé ' * 50 for key in range(4)}
+    store = TextStore(memory_budget=2 * sys.getsizeof(texts[0]), directory=tmp_path)
+    store.set(0, texts[0])
+    store.set(1, texts[1])
+    # 0 becomes the most recently used text, so 1 is spilled first
+    store.get(0)
+    store.set(2, texts[2])
+
+    assert list(store._memory) == [0, 2]
+    store.set(3, texts[3])
+    assert list(store._memory) == [2, 3]
+    assert store.stats().spills == 2
+    assert store.stats().disk_bytes > 0
+    assert store.memory_bytes <= store.memory_budget
+
+    assert store.get(1) == texts[1]
+    assert list(store._memory) == [3, 1]
+    assert [store.get(key) for key in store] == list(texts.values())
+
+    stats = store.stats()
+    # Only 1 was in memory when it was read again
+    assert stats.misses == 4
+    # 2 and 3 were spilled once each; 0 and 1 were already on disk when they were evicted again
+    assert stats.spills == 4
+
+
+def test_store_discard_and_clear(tmp_path):
+    """Discarding removes the text and its spilled copy; clearing removes the spill directory."""
+    store = TextStore(memory_budget=0, directory=tmp_path)
+    store.set(0, 'a')
+    store.set(1, 'b')
+    spill_directory = next(tmp_path.iterdir())
+
+    store.discard(0)
+    store.discard(42)
+    assert 0 not in store
+    assert [path.name for path in spill_directory.iterdir()] == ['1.z']
+
+    store.set(1, 'c')
+    assert store.get(1) == 'c'
+
+    store.clear()
+    assert len(store) == 0
+    assert not spill_directory.exists()
+
+    with pytest.raises(KeyError):
+        store.get(1)
+
+
+def test_transform_to_memory_within_budget(td):
+    """get_text reads spilled transformed texts back transparently."""
+    expected = [td.get_text(file_id).upper() for file_id in td.aggregation]
+    td.files.texts.memory_budget = 1000
+    td.stage_transformation(['transformation_uppercase'])
+    td.transform_to_memory()
+
+    assert [td.get_text(file_id) for file_id in td.aggregation] == expected
+
+    stats = td.get_text_store_stats()
+    assert stats.texts == 10
+    assert stats.spills > 0 and stats.misses > 0
+    assert stats.memory_bytes <= 1000
+
+    td.clear_transformation()
+    assert td.get_text_store_stats().texts == 0
+    assert td.files[0]['transformed_text'] is False
+
+
+def test_printing_and_comparing_records_do_not_read_spilled_texts(td, capsys):
+    """Tables and comparisons show spilled texts as placeholders instead of reading them back."""
+    td.files.texts.memory_budget = 200
+    td.stage_transformation(['transformation_uppercase'])
+    td.transform_to_memory()
+    misses = td.get_text_store_stats().misses
+
+    assert SPILLED_TEXT in str(td)
+    td.print_aggregation()
+    assert SPILLED_TEXT in capsys.readouterr().out
+    assert td.files == td.files
+    assert td.files[0] != td.files[1]
+    assert td.get_text_store_stats().misses == misses
+
+    # Finding a copy only reads back the text of the record it matches
+    copy = dict(td.files[3])
+    misses = td.get_text_store_stats().misses
+    assert td.files.index(copy) == 3
+    assert td.get_text_store_stats().misses <= misses + 1
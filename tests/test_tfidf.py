@@ -0,0 +1,100 @@
+"""Tests for the TF-IDF model and the similarity queries built on it."""
+
+import os
+from collections import Counter
+
+import pytest
+
+from textdirectory.textdirectory import TextDirectory
+from textdirectory.tfidf import TfidfModel
+
+
+@pytest.fixture
+def corpus(make_td):
+    """A corpus about ships, one about stars, and one about both."""
+    td = make_td(
+        {
+            'a.txt': 'The ship sails the deep sea. The ship carries whales.',
+            'b.txt': 'A ship on the sea, a whale in the sea.',
+            'c.txt': 'Stars and galaxies fill the night sky.',
+            'd.txt': 'The night sky over the sea, stars above a ship.',
+        }
+    )
+    td.build_tfidf()
+    return td
+
+
+def test_model_rows_are_normalized():
+    """Every row is a unit vector, and identical documents have a similarity of 1."""
+    model = TfidfModel.build([('a', Counter(['ship', 'sea', 'sea'])), ('b', Counter(['ship', 'sea', 'sea']))])
+
+    assert sum(weight**2 for weight in model.get_row(0).values()) == pytest.approx(1.0)
+    assert model.scores(model.get_row(0)) == pytest.approx({0: 1.0, 1: 1.0})
+
+
+def test_most_similar(corpus):
+    """The most similar files come first; the reference itself is left out."""
+    results = corpus.most_similar(2, k=2)
+
+    assert [file_id for file_id, _ in results] == [3, 0]
+    assert results[0][1] > results[1][1]
+
+
+def test_most_similar_to_an_external_file(corpus, tmp_path_factory):
+    """References outside the corpus are vectorized with the model's vocabulary."""
+    reference = tmp_path_factory.mktemp('reference') / 'reference.txt'
+    reference.write_text('galaxies and stars', encoding='utf8')
+
+    assert corpus.most_similar(reference, k=1)[0][0] == 2
+
+
+def test_filter_by_most_similar(corpus):
+    """The k most similar files are kept, in their original order."""
+    corpus.filter_by_most_similar(corpus.directory / 'c.txt', 1)
+    assert corpus.aggregation == [3]
+
+
+def test_similar_pairs(corpus):
+    """Blocked all-pairs similarities match the pairwise query."""
+    pairs = corpus.similar_pairs(threshold=0.0, block_size=1)
+
+    assert len(pairs) == 6
+    for file_id, other, score in pairs:
+        assert file_id < other
+        assert dict(corpus.most_similar(file_id, k=10))[other] == pytest.approx(score)
+
+
+def test_save_and_load(corpus):
+    """A saved model answers the same queries; changed files are left out."""
+    expected = corpus.most_similar(0, k=3)
+    corpus.save_tfidf()
+
+    td = TextDirectory(directory=corpus.directory, disable_tqdm=True)
+    td.load_files()
+    (corpus.directory / 'b.txt').write_text('changed', encoding='utf8')
+    td.files.set_signature(1, (0, 0, 0))
+    td.load_tfidf()
+
+    assert td.most_similar(0, k=3) == [pair for pair in expected if pair[0] != 1]
+
+
+def test_refresh_drops_the_rows_of_changed_files(corpus):
+    """Modified and removed files are no longer scored with their old vectors."""
+    path = corpus.directory / 'b.txt'
+    path.write_text('Nothing in common here.', encoding='utf8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (corpus.directory / 'c.txt').unlink()
+
+    assert corpus.refresh() == ([], [2], [1])
+    assert [file_id for file_id, _ in corpus.most_similar(0, k=3)] == [3]
+    assert all(1 not in pair[:2] for pair in corpus.similar_pairs(0.0))
+
+
+def test_queries_need_a_model(testdata_dir):
+    """Without a model, the queries raise."""
+    td = TextDirectory(directory=testdata_dir, disable_tqdm=True)
+    td.load_files()
+
+    with pytest.raises(ValueError):
+        td.most_similar(0)
@@ -2,6 +2,8 @@
 
 import pytest
 
+from textdirectory import TextDirectory, transformations
+
 
 def test_transform_to_memory(td):
     """Test the in memory transformation."""
@@ -84,3 +86,65 @@ def test_transform_to_files(td, tmp_path):
 
     assert 'stu' in (output_dir / 'Text_A.txt').read_text()
     assert 'ipsum' in (output_dir / 'Text_C.txt').read_text()
+
+
+def test_is_chunk_safe():
+    """Character- and line-level transformations are chunk-safe as long as the line breaks are kept."""
+    assert transformations.is_chunk_safe([['transformation_lowercase'], ['transformation_remove_non_alphanumerical']])
+    assert transformations.is_chunk_safe([['transformation_replace_string', 'a', 'b'], ['transformation_remove_nl']])
+
+    assert not transformations.is_chunk_safe([['transformation_remove_htmltags']])
+    assert not transformations.is_chunk_safe([['transformation_replace_string', 'a b', 'c']])
+    assert not transformations.is_chunk_safe([['transformation_replace_string', '', '|']])
+    assert not transformations.is_chunk_safe(
+        [['transformation_remove_nl'], ['transformation_expand_english_contractions']]
+    )
+
+
+def test_streaming_aggregation_matches_whole_files(tmp_path):
+    """Streaming in small chunks gives the same aggregate as transforming whole files."""
+    (tmp_path / 'corpus').mkdir()
+    (tmp_path / 'corpus' / 'a.txt').write_text("Don't panic! 42 towels\n" * 300, encoding='utf8')
+    (tmp_path / 'corpus' / 'b.txt').write_text('no line breaks but spaces ' * 50, encoding='utf8')
+    td = TextDirectory(directory=tmp_path / 'corpus', disable_tqdm=True)
+    td.load_files()
+    for transformation in (
+        ['transformation_expand_english_contractions'],
+        ['transformation_remove_non_alphanumerical'],
+        ['transformation_replace_digits', '#'],
+        ['transformation_uppercase'],
+    ):
+        td.stage_transformation(transformation)
+
+    td.aggregate_to_file(tmp_path / 'whole.txt')
+    td.aggregate_to_file(tmp_path / 'streamed.txt', streaming=True, chunk_size=100, workers=2, queue_size=2)
+
+    assert (tmp_path / 'streamed.txt').read_text(encoding='utf8') == (tmp_path / 'whole.txt').read_text(encoding='utf8')
+
+
+def test_streaming_does_not_split_words(tmp_path):
+    """Files without whitespace are not cut mid-word, so replacements spanning a read still apply."""
+    (tmp_path / 'corpus').mkdir()
+    (tmp_path / 'corpus' / 'a.txt').write_text('x' * 10 + 'abc' + 'y' * 10, encoding='utf8')
+    td = TextDirectory(directory=tmp_path / 'corpus', disable_tqdm=True)
+    td.load_files()
+    td.stage_transformation(['transformation_replace_string', 'abc', 'Q'])
+
+    td.aggregate_to_file(tmp_path / 'streamed.txt', streaming=True, chunk_size=12)
+    assert (tmp_path / 'streamed.txt').read_text(encoding='utf8') == 'x' * 10 + 'Q' + 'y' * 10
+
+    # Chunks grow to at most 64 * chunk_size characters while looking for whitespace
+    (tmp_path / 'corpus' / 'a.txt').write_text('x' * 200, encoding='utf8')
+    with pytest.raises(ValueError, match='without whitespace'):
+        td.aggregate_to_file(tmp_path / 'streamed.txt', streaming=True, chunk_size=2)
+
+
+def test_streaming_rejects_unsafe_transformations(td, tmp_path):
+    """Transformations that need the whole text cannot be streamed, and chunks need to stay in order."""
+    td.stage_transformation(['transformation_remove_htmltags'])
+    with pytest.raises(ValueError, match='transformation_remove_htmltags'):
+        td.aggregate_to_file(tmp_path / 'aggregated.txt', streaming=True)
+
+    td.clear_transformation()
+    with pytest.raises(ValueError):
+        td.aggregate_to_file(tmp_path / 'aggregated.txt', streaming=True, ordered=False)